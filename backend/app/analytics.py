@@ -1,24 +1,51 @@
+import logging
+import time
 import pandas as pd
 import numpy as np
+from app.trajectory import CHUNK_SIZE, solve_drag_coefficient
 
-# Constants for baseball physics
-BALL_MASS = 0.145  # kg
-BALL_DIAMETER = 0.073  # meters
-BALL_RADIUS = BALL_DIAMETER / 2
-BALL_AREA = np.pi * BALL_RADIUS ** 2  # m^2
-AIR_DENSITY = 1.2  # kg/m^3 (approximate, sea level, 20°C)
-GRAVITY = 9.8  # m/s^2
+logger = logging.getLogger(__name__)
 
 # Conversion factors
 MPH_TO_MPS = 0.44704
 FEET_TO_METERS = 0.3048
+GRAVITY = 9.8  # m/s^2
+# Statcast hit coordinates of home plate
+HC_HOME = (125.42, 198.27)
+
+
+def expected_distance(launch_speed, launch_angle) -> np.ndarray:
+    """Carry in feet of a ball in a vacuum from its launch speed (mph) and angle (degrees)."""
+    v0 = np.asarray(launch_speed, dtype=float) * MPH_TO_MPS  # m/s
+    theta = np.deg2rad(np.asarray(launch_angle, dtype=float))  # radians
+    return (v0 ** 2) * np.sin(2 * theta) / GRAVITY / FEET_TO_METERS
+
+
+def spray_angle(hc_x, hc_y) -> np.ndarray:
+    """Horizontal angle in degrees from home plate: 0 is straight away center, negative toward left field."""
+    x = np.asarray(hc_x, dtype=float) - HC_HOME[0]
+    y = HC_HOME[1] - np.asarray(hc_y, dtype=float)
+    return np.degrees(np.arctan2(x, y))
+
+
+def add_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the per-ball values stored alongside the raw columns (see migrations/versions/0005):
+    expected_distance and spray_angle. NaN where their inputs are missing.
+    """
+    df["expected_distance"] = expected_distance(df["launch_speed"], df["launch_angle"])
+    df["spray_angle"] = spray_angle(df["hc_x"], df["hc_y"])
+    return df
 
 
-def estimate_drag_coefficient(df: pd.DataFrame) -> pd.DataFrame:
+def estimate_drag_coefficient(df: pd.DataFrame, chunk_size: int = CHUNK_SIZE, verbose: bool = False) -> pd.DataFrame:
     """
     Estimate drag coefficient for each batted ball using launch_speed, launch_angle, and hit_distance_sc.
-    Uses a simplified physics model and filters for plausible values.
+    Solves for the Cd whose drag-aware trajectory carries the recorded distance (see app/trajectory.py).
+    Spin and lift are not modelled, so these are effective drag coefficients.
+    Logs a summary at INFO when verbose, otherwise at DEBUG.
     """
+    started = time.perf_counter()
     # Only use plausible batted balls
     mask = (
         df["launch_speed"].notnull() &
@@ -29,39 +56,89 @@ def estimate_drag_coefficient(df: pd.DataFrame) -> pd.DataFrame:
         (df["launch_angle"].between(10, 45))
     )
     df = df.copy()
-    df.loc[~mask, "drag_coefficient"] = np.nan
+    df["drag_coefficient"] = np.nan
     # Convert units
-    v0 = df.loc[mask, "launch_speed"] * MPH_TO_MPS  # m/s
-    theta = np.deg2rad(df.loc[mask, "launch_angle"])  # radians
-    d_actual = df.loc[mask, "hit_distance_sc"] * FEET_TO_METERS  # meters
-    # Expected distance in vacuum (no drag)
-    d_vacuum = (v0 ** 2) * np.sin(2 * theta) / GRAVITY
-    # Estimate drag coefficient (Cd) using a simplified model
-    with np.errstate(divide='ignore', invalid='ignore'):
-        cd = (2 * BALL_MASS * GRAVITY * (d_vacuum - d_actual)) / (AIR_DENSITY * BALL_AREA * d_actual * v0 ** 2)
-        # Only keep positive, plausible drag coefficients
-        cd = np.where((d_actual > 0) & (v0 > 0) & (d_actual < d_vacuum) & (cd > 0) & (cd < 1), cd, np.nan)
-    # Debug print for the first row
-    if len(v0) > 0:
-        print("--- Drag Coefficient Debug ---")
-        print(f"launch_speed (mph): {df.loc[mask, 'launch_speed'].iloc[0]}")
-        print(f"launch_speed (m/s): {v0.iloc[0]}")
-        print(f"launch_angle (deg): {df.loc[mask, 'launch_angle'].iloc[0]}")
-        print(f"launch_angle (rad): {theta.iloc[0]}")
-        print(f"hit_distance_sc (ft): {df.loc[mask, 'hit_distance_sc'].iloc[0]}")
-        print(f"hit_distance_sc (m): {d_actual.iloc[0]}")
-        print(f"d_vacuum (m): {d_vacuum.iloc[0]}")
-        print(f"BALL_MASS: {BALL_MASS}")
-        print(f"GRAVITY: {GRAVITY}")
-        print(f"AIR_DENSITY: {AIR_DENSITY}")
-        print(f"BALL_AREA: {BALL_AREA}")
-        print(f"Cd (calculated): {cd[0]}")
-        print("-----------------------------")
+    v0 = df.loc[mask, "launch_speed"].to_numpy(dtype=float) * MPH_TO_MPS  # m/s
+    theta = np.deg2rad(df.loc[mask, "launch_angle"].to_numpy(dtype=float))  # radians
+    d_actual = df.loc[mask, "hit_distance_sc"].to_numpy(dtype=float) * FEET_TO_METERS  # meters
+    cd = solve_drag_coefficient(v0, theta, d_actual, chunk_size=chunk_size)
     df.loc[mask, "drag_coefficient"] = cd
+    logger.log(
+        logging.INFO if verbose else logging.DEBUG,
+        "Estimated drag coefficient for %d of %d batted balls (%d eligible) in %.2fs",
+        int(np.isfinite(cd).sum()), len(df), int(mask.sum()), time.perf_counter() - started,
+    )
+    return df
+
+
+def calculate_xhr(df: pd.DataFrame, model) -> pd.DataFrame:
+    """
+    Add each batted ball's home run probability as "xhr", scored by a compiled xHR model (see app/xhr.py)
+    from launch_speed, launch_angle, hc_x/hc_y and stadium/home_team. NaN where launch data is missing.
+    """
+    df["xhr"] = model.score_frame(df)
     return df
 
 
-def calculate_xhr(df: pd.DataFrame) -> pd.DataFrame:
-    """Calculate expected home runs (xHR) based on launch angle and exit velocity (placeholder)."""
-    df["xhr"] = (df["launch_speed"] > 95) & (df["launch_angle"].between(20, 35))
-    return df 
\ No newline at end of file
+def bin_2d(
+    x: np.ndarray,
+    y: np.ndarray,
+    x_bin: float,
+    y_bin: float,
+    drag: np.ndarray = None,
+    home_run: np.ndarray = None,
+    shape: str = "grid",
+) -> pd.DataFrame:
+    """
+    Aggregate scatter points into rectangular ("grid") or hexagonal ("hex") bins.
+    Returns one row per non-empty bin with its center, point count, mean drag_coefficient and HR rate.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    x, y = x[keep], y[keep]
+    if len(x) == 0:
+        return pd.DataFrame(columns=["x", "y", "count", "drag_coefficient", "hr_rate"])
+
+    xs, ys = x / x_bin, y / y_bin
+    if shape == "hex":
+        # Two offset rectangular lattices; each point goes to the nearer lattice center
+        ix1, iy1 = np.round(xs), np.round(ys)
+        ix2, iy2 = np.floor(xs), np.floor(ys)
+        d1 = (xs - ix1) ** 2 + 3.0 * (ys - iy1) ** 2
+        d2 = (xs - ix2 - 0.5) ** 2 + 3.0 * (ys - iy2 - 0.5) ** 2
+        on_first = d1 <= d2
+        cx = np.where(on_first, ix1, ix2 + 0.5)
+        cy = np.where(on_first, iy1, iy2 + 0.5)
+    else:
+        cx = np.floor(xs) + 0.5
+        cy = np.floor(ys) + 0.5
+
+    # Centers sit on a half-integer lattice, so doubling them gives exact integer cell keys
+    kx, ky = np.rint(cx * 2).astype(np.int64), np.rint(cy * 2).astype(np.int64)
+    x_span, y_span = int(kx.max() - kx.min()) + 1, int(ky.max() - ky.min()) + 1
+    if x_span * y_span < 2 ** 62:
+        # One flat key per cell, ordered like (kx, ky): a 1-D unique is far cheaper than a row-wise one
+        flat, inverse = np.unique((kx - kx.min()) * y_span + (ky - ky.min()), return_inverse=True)
+        cells = np.column_stack([flat // y_span + kx.min(), flat % y_span + ky.min()])
+    else:
+        cells, inverse = np.unique(np.column_stack([kx, ky]), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    counts = np.bincount(inverse, minlength=len(cells))
+
+    result = pd.DataFrame({
+        "x": cells[:, 0] / 2.0 * x_bin,
+        "y": cells[:, 1] / 2.0 * y_bin,
+        "count": counts,
+    })
+    if drag is not None:
+        drag = np.asarray(drag, dtype=float)[keep]
+        has_drag = np.isfinite(drag)
+        drag_sum = np.bincount(inverse, weights=np.where(has_drag, drag, 0.0), minlength=len(cells))
+        drag_n = np.bincount(inverse, weights=has_drag, minlength=len(cells))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result["drag_coefficient"] = np.where(drag_n > 0, drag_sum / drag_n, np.nan)
+    if home_run is not None:
+        home_run = np.asarray(home_run, dtype=bool)[keep]
+        result["hr_rate"] = np.bincount(inverse, weights=home_run, minlength=len(cells)) / counts
+    return result
@@ -1,259 +1,878 @@
+import base64
+import contextlib
+import logging
+import os
 import pandas as pd
-from fastapi import APIRouter, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
 from datetime import datetime, date
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from ..models import StatcastEvent, engine
+from sqlalchemy import ARRAY, Float, Integer, and_, case, cast, func, or_, select, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import Select
+from ..models import DragSketch, StatcastEvent, StatcastDailyRollup, async_engine
+from ..analytics import bin_2d, calculate_xhr
+from ..cache import cache_key, row_count
+from ..columnar import columnar_store
+from ..concurrency import heavy_queries, run_cpu
+from ..metrics import phase, record_cache, record_rows
+from ..rollups import DRAG_SAMPLE
+from ..sketch import TDigest
+from ..shared import SHARED_DATASET_DIR, SharedDataset
+from ..snapshot import SnapshotDataset
+from ..xhr import batted_balls_statement
+from .serialization import (ENCODERS, IDENTITY, JSON_MEDIA_TYPE, RECORDS, Body, encode_json, frame_to_records,
+                            negotiate_encoding, negotiate_format, render_frame)
+from .streaming import STREAM_BATCH_SIZE, stream_statement, validate_stream_mode
 import numpy as np
-from typing import Optional
+from typing import Any, Awaitable, Callable, Optional
 
 router = APIRouter()
+DEFAULT_START_DATE = "2015-01-01"
+# Period groupings for /drag_vs_hr, /xhr_vs_actual and /dashboard
+GRANULARITIES = ("year", "month", "week", "day")
+# Keyset pages: rows per page when only a cursor is given, and the largest limit accepted
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "10000"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "50000"))
+PAGE_KEY = "id"
+# Most bins along either axis of a binned scatter, whether set by resolution or by a bin size
+MAX_BINS_PER_AXIS = 500
+logger = logging.getLogger(__name__)
 
-def fetch_exit_velocity_distance_data(start_date: str, end_date: Optional[str]):
+class BinningParams:
+    """Query parameters for endpoints that can return 2D-binned aggregates instead of raw points."""
+    def __init__(
+        self,
+        aggregate: str = Query(None, description="Bin points server-side: 'grid' (rectangles) or 'hex'"),
+        resolution: int = Query(60, ge=1, le=MAX_BINS_PER_AXIS, description="Target number of bins along each axis"),
+        x_bin_size: float = Query(None, gt=0, description="Bin width along x in axis units (overrides resolution)"),
+        y_bin_size: float = Query(None, gt=0, description="Bin height along y in axis units (overrides resolution)"),
+        x_min: float = Query(None, description="Zoom window: lower x bound"),
+        x_max: float = Query(None, description="Zoom window: upper x bound"),
+        y_min: float = Query(None, description="Zoom window: lower y bound"),
+        y_max: float = Query(None, description="Zoom window: upper y bound"),
+    ):
+        if aggregate is not None and aggregate not in ("grid", "hex"):
+            raise HTTPException(status_code=400, detail="aggregate must be 'grid' or 'hex'")
+        self.aggregate = aggregate
+        self.resolution = resolution
+        self.x_bin_size = x_bin_size
+        self.y_bin_size = y_bin_size
+        self.x_min, self.x_max = x_min, x_max
+        self.y_min, self.y_max = y_min, y_max
+
+    def params(self) -> dict:
+        """Normalized values for cache keys (empty when not aggregating)."""
+        if not self.aggregate:
+            return {}
+        return {key: value for key, value in vars(self).items() if value is not None}
+
+def encode_cursor(game_date, row_id) -> str:
+    return base64.urlsafe_b64encode(f"{pd.Timestamp(game_date).date().isoformat()},{int(row_id)}".encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        game_date, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(",")
+        return date.fromisoformat(game_date), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+class PageParams:
+    """
+    Keyset pagination on (game_date, id) for the row-level endpoints. Off unless limit or cursor is
+    given; each page then carries next_cursor (null on the last page) to pass back as cursor.
+    """
+    def __init__(
+        self,
+        limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Rows per page; returns one page with a next_cursor"),
+        cursor: str = Query(None, description="next_cursor from the previous page"),
+    ):
+        self.limit = limit if limit is not None or cursor is None else DEFAULT_PAGE_SIZE
+        self.cursor = cursor
+        self.after = decode_cursor(cursor) if cursor else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit is not None
+
+    def params(self) -> dict:
+        """Normalized values for cache keys (empty when not paginating)."""
+        return {"limit": self.limit, "cursor": self.cursor} if self.enabled else {}
+
+    def check(self, stream: Optional[str] = None, aggregate: Optional[str] = None):
+        if self.enabled and (stream or aggregate):
+            raise HTTPException(status_code=400, detail="limit/cursor cannot be combined with stream or aggregate")
+
+    def apply(self, statement: Select) -> Select:
+        """statement in (game_date, id) order after the cursor, plus one row to tell whether more follow."""
+        statement = statement.add_columns(StatcastEvent.id.label(PAGE_KEY))
+        if self.after is not None:
+            after_date, after_id = self.after
+            # The plain date bound lets PostgreSQL prune partitions before the row comparison
+            statement = statement.where(
+                StatcastEvent.game_date >= after_date,
+                tuple_(StatcastEvent.game_date, StatcastEvent.id) > (after_date, after_id)
+            )
+        return statement.order_by(StatcastEvent.game_date, StatcastEvent.id).limit(self.limit + 1)
+
+    def split(self, df: pd.DataFrame):
+        """(the page's rows without the key column, {"next_cursor": ...}) from an applied statement's result."""
+        more = len(df) > self.limit
+        df = df.iloc[:self.limit]
+        next_cursor = encode_cursor(df["game_date"].iloc[-1], df[PAGE_KEY].iloc[-1]) if more else None
+        return df.drop(columns=PAGE_KEY).reset_index(drop=True), {"next_cursor": next_cursor}
+
+def _span(values: pd.Series, lo: Optional[float], hi: Optional[float]) -> float:
+    lo = values.min() if lo is None else lo
+    hi = values.max() if hi is None else hi
+    return float(hi - lo) if len(values) else 0.0
+
+def _bin_size(span: float, resolution: int) -> float:
+    return span / resolution if span > 0 else 1.0
+
+def _check_bins(axis: str, span: float, bin_size: float):
+    """400 when bin_size would split span into more than MAX_BINS_PER_AXIS bins."""
+    bins = span / bin_size
+    if bins > MAX_BINS_PER_AXIS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{axis}_bin_size {bin_size:g} makes {bins:.0f} bins along {axis} (at most {MAX_BINS_PER_AXIS}); "
+                   f"use a larger bin size or a narrower {axis}_min/{axis}_max window"
+        )
+
+def aggregate_scatter(df: pd.DataFrame, x: str, y: str, binning: BinningParams, shape: str):
+    """Bin df[x] against df[y]; returns the per-bin count, mean drag_coefficient and HR rate plus metadata."""
+    window = pd.Series(True, index=df.index)
+    if binning.x_min is not None:
+        window &= df[x] >= binning.x_min
+    if binning.x_max is not None:
+        window &= df[x] <= binning.x_max
+    if binning.y_min is not None:
+        window &= df[y] >= binning.y_min
+    if binning.y_max is not None:
+        window &= df[y] <= binning.y_max
+    df = df[window]
+
+    x_span = _span(df[x], binning.x_min, binning.x_max)
+    y_span = _span(df[y], binning.y_min, binning.y_max)
+    x_bin = binning.x_bin_size or _bin_size(x_span, binning.resolution)
+    y_bin = binning.y_bin_size or _bin_size(y_span, binning.resolution)
+    if binning.x_bin_size:
+        _check_bins("x", x_span, x_bin)
+    if binning.y_bin_size:
+        _check_bins("y", y_span, y_bin)
+    if shape == "hex" and not binning.y_bin_size:
+        # Regular hexagons need rows sqrt(3) times taller than the column spacing
+        y_bin *= np.sqrt(3)
+    cells = bin_2d(
+        df[x].to_numpy(dtype=float),
+        df[y].to_numpy(dtype=float),
+        x_bin,
+        y_bin,
+        drag=df["drag_coefficient"].to_numpy(dtype=float) if "drag_coefficient" in df else None,
+        home_run=(df["events"] == "home_run").to_numpy() if "events" in df else None,
+        shape=shape,
+    )
+    meta = {"aggregate": shape, "x": x, "y": y, "x_bin_size": x_bin, "y_bin_size": y_bin, "points": int(len(df))}
+    return cells, meta
+
+def _if_none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # Weak comparison (RFC 9110): ignore W/ prefixes
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+def _render_body(render: Callable[[Any], Any], value) -> Body:
+    rendered = render(value)
+    if not isinstance(rendered, Body):
+        rendered = Body(encode_json(rendered), JSON_MEDIA_TYPE)
+    return rendered
+
+async def cached_body(cache, key: str, value, render: Callable[[Any], Any], variant: str, encoding: str) -> Body:
+    """
+    value (cached under key) rendered by render and compressed with encoding. The plain and each
+    compressed body are built once per cache entry and kept with it. Frame-based results are
+    rendered and compressed on the CPU executor; small payloads inline.
+    """
+    heavy = isinstance(value, (pd.DataFrame, tuple))
+    async def run(func, *args):
+        return await run_cpu(func, *args) if heavy else func(*args)
+    body = await cache.get_or_encode(key, value, representation(variant, IDENTITY), lambda: run(_render_body, render, value))
+    if encoding != IDENTITY:
+        plain = body
+        body = await cache.get_or_encode(key, value, representation(variant, encoding), lambda: run(plain.encode, encoding))
+    return body
+
+def representation(variant: str, encoding: str) -> str:
+    """Name of a cached body: the variant (e.g. the format), plus its content coding unless identity."""
+    return variant if encoding == IDENTITY else f"{variant};{encoding}"
+
+async def cached_response(
+    request: Request,
+    route: str,
+    params: dict,
+    compute: Callable[[], Awaitable[Any]],
+    render: Callable[[Any], Any],
+    variant: str = ""
+):
+    """
+    Serve await compute() through the app's ResponseCache, keyed by route and normalized params.
+    The ETag covers the key, the representation (variant, e.g. the format) and the load
+    watermark, so a matching If-None-Match is answered with 304 before any work is done.
+    The encoded body is cached too, in the content coding Accept-Encoding asks for, so a
+    repeat request sends stored bytes.
+    """
+    cache = request.app.state.CACHE
+    if cache.watermark_expired():
+        await run_in_threadpool(cache.watermark)
+    key = cache_key(route, params)
+    etag = cache.etag(key, variant)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+    if _if_none_match(request, etag):
+        record_cache("revalidated")
+        return Response(status_code=304, headers=headers)
+    with phase("transform"):
+        value = await cache.get_or_compute(key, compute)
+    rows = row_count(value)
+    if rows is not None:
+        record_rows(rows)
+    with phase("serialize"):
+        body = await cached_body(cache, key, value, render, variant, negotiate_encoding(request))
+    return body.response(headers)
+
+async def read_frame(statement: Select, heavy: bool = True) -> pd.DataFrame:
+    """
+    statement's rows as a DataFrame, from the columnar store when it is current and can evaluate
+    statement. Otherwise run it on the async engine, one STREAM_BATCH_SIZE partition at a time so
+    the event loop is free between batches. Heavy (raw-event) queries share HEAVY_QUERY_SLOTS.
+    """
+    frame = await run_cpu(columnar_store.query, statement)
+    if frame is not None:
+        return frame
+    async with heavy_queries if heavy else contextlib.nullcontext():
+        async with async_engine.connect() as conn:
+            result = await conn.stream(statement)
+            columns = list(result.keys())
+            frames = [await run_cpu(pd.DataFrame.from_records, rows, columns=columns)
+                      async for rows in result.partitions(STREAM_BATCH_SIZE)]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    if len(frames) == 1:
+        return frames[0]
+    return await run_cpu(pd.concat, frames, ignore_index=True)
+
+def date_params(start_dt: date, end_dt: date) -> dict:
+    return {"start_date": start_dt.isoformat(), "end_date": end_dt.isoformat()}
+
+def parse_date_range(start_date: str, end_date: Optional[str]):
+    # Use today's date if no end_date provided
+    if end_date is None:
+        end_date = date.today().strftime("%Y-%m-%d")
     try:
-        if end_date is None:
-            end_date = date.today().strftime("%Y-%m-%d")
         start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="dates must be YYYY-MM-DD")
+    return start_dt, end_dt
 
-        with Session(engine) as session:
-            query = session.query(
-                StatcastEvent.game_date,
-                StatcastEvent.launch_speed,
-                StatcastEvent.launch_angle,
-                StatcastEvent.hit_distance_sc,
-                StatcastEvent.bb_type,
-                StatcastEvent.drag_coefficient
-            ).filter(
-                StatcastEvent.game_date >= start_dt,
-                StatcastEvent.game_date <= end_dt,
-                StatcastEvent.launch_speed != None,
-                StatcastEvent.launch_angle != None,
-                StatcastEvent.hit_distance_sc != None,
-                StatcastEvent.bb_type != None,
-                StatcastEvent.drag_coefficient.isnot(None)
-            )
-            df = pd.read_sql(query.statement, session.bind)
+def parse_granularity(value: str) -> str:
+    if value not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+    return value
 
-        if df.empty:
-            return []
+def split_csv(value: Optional[str]) -> list:
+    return [item.strip() for item in value.split(",") if item.strip()] if value else []
 
-        # Drop any rows where drag_coefficient is null or NaN (defensive)
-        df = df[df["drag_coefficient"].notnull()]
+def render_frame_with_meta(value, fmt: str):
+    df, meta = value
+    return render_frame(df, fmt, meta)
 
-        # Replace NaN, inf, -inf with None for JSON serialization
-        df = df.replace([np.nan, np.inf, -np.inf], None)
+def exit_velocity_distance_statement(start_dt: date, end_dt: date, extra_columns=()):
+    return select(
+        StatcastEvent.game_date,
+        StatcastEvent.launch_speed,
+        StatcastEvent.launch_angle,
+        StatcastEvent.hit_distance_sc,
+        StatcastEvent.bb_type,
+        StatcastEvent.drag_coefficient,
+        *extra_columns
+    ).where(
+        StatcastEvent.game_date >= start_dt,
+        StatcastEvent.game_date <= end_dt,
+        StatcastEvent.launch_speed != None,
+        StatcastEvent.launch_angle != None,
+        StatcastEvent.hit_distance_sc != None,
+        StatcastEvent.bb_type != None,
+        StatcastEvent.drag_coefficient.isnot(None)
+    )
 
-        # Return all batted balls as list of dicts
-        return df.to_dict(orient="records")
-    except Exception as e:
-        import traceback
-        print("Error in fetch_exit_velocity_distance_data:", e)
-        traceback.print_exc()
-        return []
+async def fetch_exit_velocity_distance_data(start_date: str, end_date: Optional[str], extra_columns=()) -> pd.DataFrame:
+    start_dt, end_dt = parse_date_range(start_date, end_date)
+    df = await read_frame(exit_velocity_distance_statement(start_dt, end_dt, extra_columns))
+
+    # Drop any rows where drag_coefficient is null or NaN (defensive)
+    return df[df["drag_coefficient"].notnull()].reset_index(drop=True)
+
+def exit_velocity_distance_dataset() -> SnapshotDataset:
+    """
+    The default /exit_velocity_distance response (full history, raw points), kept as a Parquet snapshot.
+    With SHARED_DATASET_DIR set it is built by one worker and memory-mapped by the rest.
+    """
+    async def fetch(start_dt: date, end_dt: date) -> pd.DataFrame:
+        return await fetch_exit_velocity_distance_data(start_dt.isoformat(), end_dt.isoformat())
+    database = async_engine.url.render_as_string(hide_password=True)
+    start_dt = parse_date_range(DEFAULT_START_DATE, None)[0]
+    if SHARED_DATASET_DIR:
+        return SharedDataset(fetch, start_dt, database, render_bodies=exit_velocity_distance_bodies)
+    return SnapshotDataset(fetch, start_dt, database)
+
+def exit_velocity_distance_bodies(df: pd.DataFrame) -> dict:
+    """The default /exit_velocity_distance records body in every content coding we serve, by representation."""
+    plain = render_frame(df, RECORDS)
+    bodies = {}
+    for encoding in (IDENTITY, *ENCODERS):
+        body = plain.encode(encoding) if encoding != IDENTITY else plain
+        bodies[representation(RECORDS, encoding)] = (body.content, body.media_type, body.encoding)
+    return bodies
+
+async def warm_cache(cache, dataset: SnapshotDataset, full: bool = False) -> dict:
+    """
+    Bring the snapshot dataset up to date with the current load watermark (from the snapshot file and
+    only newer rows, unless full) and cache it as the default /exit_velocity_distance response,
+    with its records body encoded up front in every content coding we serve. A shared dataset
+    comes with those bodies already encoded and memory-mapped, so workers only attach them.
+    """
+    if full:
+        cache.clear()
+    watermark = await run_in_threadpool(cache.watermark, True)
+    start_dt, end_dt = parse_date_range(DEFAULT_START_DATE, None)
+    key = cache_key("exit_velocity_distance", date_params(start_dt, end_dt))
+    df = await cache.get_or_compute(key, lambda: dataset.refresh(watermark, full))
+    # Published bodies belong to the published frame only
+    mapped = dataset.bodies if isinstance(dataset, SharedDataset) and df is dataset.frame else {}
+    for encoding in (IDENTITY, *ENCODERS):
+        name = representation(RECORDS, encoding)
+        if name in mapped:
+            content, media_type, body_encoding = mapped[name]
+            cache.attach_mapped(key, df, name, Body(content, media_type, body_encoding))
+        else:
+            await cached_body(cache, key, df, lambda df: render_frame(df, RECORDS), RECORDS, encoding)
+    return dataset.status()
 
 @router.get("/exit_velocity_distance")
-def get_exit_velocity_distance(
+async def get_exit_velocity_distance(
     request: Request,
-    start_date: str = Query("2015-01-01", description="Start date in YYYY-MM-DD format"),
-    end_date: str = Query(None, description="End date in YYYY-MM-DD format (defaults to today)")
+    start_date: str = Query(DEFAULT_START_DATE, description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(None, description="End date in YYYY-MM-DD format (defaults to today)"),
+    binning: BinningParams = Depends(),
+    pages: PageParams = Depends(),
+    fmt: str = Query(None, alias="format", description="Response layout: records (default), columns, or arrow"),
+    stream: str = Query(None, description="Stream rows in batches as they are read: ndjson or arrow")
 ):
-    cache = request.app.state.CACHE
-    # Serve from cache if available and using default params
-    if start_date == "2015-01-01" and (end_date is None or end_date == date.today().strftime("%Y-%m-%d")) and "exit_velocity_distance" in cache:
-        return {"data": cache["exit_velocity_distance"]}
+    fmt = negotiate_format(request, fmt)
+    stream = validate_stream_mode(stream, binning.aggregate)
+    pages.check(stream, binning.aggregate)
+    start_dt, end_dt = parse_date_range(start_date, end_date)
+    start_date, end_date = start_dt.isoformat(), end_dt.isoformat()
+    params = {**date_params(start_dt, end_dt), **binning.params()}
+    if binning.aggregate:
+        async def compute():
+            df = await fetch_exit_velocity_distance_data(start_date, end_date, extra_columns=[StatcastEvent.events])
+            return await run_cpu(aggregate_scatter, df, "launch_speed", "hit_distance_sc", binning, binning.aggregate)
+        return await cached_response(request, "exit_velocity_distance", params, compute,
+                                     lambda value: render_frame_with_meta(value, fmt), variant=fmt)
+    if stream:
+        return stream_statement(exit_velocity_distance_statement(start_dt, end_dt), stream)
+    if pages.enabled:
+        async def compute():
+            df = await read_frame(pages.apply(exit_velocity_distance_statement(start_dt, end_dt)))
+            return await run_cpu(pages.split, df)
+        return await cached_response(request, "exit_velocity_distance", {**params, **pages.params()}, compute,
+                                     lambda value: render_frame_with_meta(value, fmt), variant=fmt)
+    dataset = request.app.state.DATASET
+    if start_dt == dataset.start_date and end_dt == date.today():
+        # Full history comes from the snapshot dataset, topped up with rows loaded since
+        cache = request.app.state.CACHE
+        compute = lambda: dataset.refresh(cache.watermark())
+    else:
+        compute = lambda: fetch_exit_velocity_distance_data(start_date, end_date)
     try:
-        data = fetch_exit_velocity_distance_data(start_date, end_date)
-        return {"data": data}
+        return await cached_response(request, "exit_velocity_distance", params, compute,
+                                     lambda df: render_frame(df, fmt), variant=fmt)
     except Exception as e:
-        import traceback
-        print("Error in /exit_velocity_distance:", e)
-        traceback.print_exc()
-        return {"error": str(e)}, 500
+        logger.exception("Error in /exit_velocity_distance")
+        return JSONResponse(status_code=500, content={"error": str(e)})
 
 @router.get("/timeline")
-def get_timeline():
+async def get_timeline():
     return {"data": "Timeline endpoint placeholder"}
 
 @router.get("/trig_explorer")
-def get_trig_explorer():
+async def get_trig_explorer():
     return {"data": "Trig explorer endpoint placeholder"}
 
 @router.get("/drag_vs_hr")
-def get_drag_vs_hr(
+async def get_drag_vs_hr(
     request: Request,
-    start_date: str = Query("2015-01-01", description="Start date in YYYY-MM-DD format"),
+    start_date: str = Query(DEFAULT_START_DATE, description="Start date in YYYY-MM-DD format"),
     end_date: str = Query(None, description="End date in YYYY-MM-DD format (defaults to today)"),
     granularity: str = Query("month", description="Grouping: year, month, week, or day")
 ):
-    cache = request.app.state.CACHE
-    # Serve from cache if available and using default params
-    if start_date == "2015-01-01" and (end_date is None or end_date == date.today().strftime("%Y-%m-%d")) and granularity == "month" and "drag_vs_hr" in cache:
-        return {"data": cache["drag_vs_hr"]}
-    # Use today's date if no end_date provided
-    if end_date is None:
-        end_date = date.today().strftime("%Y-%m-%d")
-    
-    # Parse dates
-    start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
-    end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
-
-    with Session(engine) as session:
-        query = session.query(
-            StatcastEvent.game_date,
-            StatcastEvent.drag_coefficient,
-            StatcastEvent.events,
-            StatcastEvent.bb_type
-        ).filter(
-            StatcastEvent.game_date >= start_dt,
-            StatcastEvent.game_date <= end_dt,
-            StatcastEvent.drag_coefficient != None,
-            StatcastEvent.drag_coefficient > 0.1,
-            StatcastEvent.drag_coefficient < 0.6,
-            (
-                (StatcastEvent.bb_type.in_(["fly_ball", "line_drive"])) |
-                (StatcastEvent.events == "home_run")
-            )
-        )
-        df = pd.read_sql(query.statement, session.bind)
+    start_dt, end_dt = parse_date_range(start_date, end_date)
+    granularity = parse_granularity(granularity)
+    params = {**date_params(start_dt, end_dt), "granularity": granularity}
+    return await cached_response(request, "drag_vs_hr", params,
+                                 lambda: drag_vs_hr_periods(start_dt, end_dt, granularity),
+                                 lambda data: {"data": data})
 
-    if df.empty:
-        return {"data": []}
+async def drag_vs_hr_periods(start_dt: date, end_dt: date, granularity: str) -> list:
+    # Periods are built from the daily rollup (a few thousand rows) rather than raw events
+    statement = select(
+        StatcastDailyRollup.game_date,
+        func.sum(StatcastDailyRollup.drag_sum).label("drag_sum"),
+        func.sum(StatcastDailyRollup.drag_count).label("drag_count"),
+        func.sum(StatcastDailyRollup.drag_home_runs).label("home_runs")
+    ).where(
+        StatcastDailyRollup.game_date >= start_dt,
+        StatcastDailyRollup.game_date <= end_dt,
+        StatcastDailyRollup.drag_count > 0
+    ).group_by(StatcastDailyRollup.game_date)
+    df = await read_frame(statement, heavy=False)
+    return await run_cpu(group_drag_vs_hr, df, granularity)
 
-    # Add period column based on granularity
-    date_col = pd.to_datetime(df["game_date"])
+def period_labels(game_dates: pd.Series, granularity: str) -> pd.Series:
+    date_col = pd.to_datetime(game_dates)
     if granularity == "year":
-        df["period"] = date_col.dt.to_period("Y").astype(str)
+        return date_col.dt.to_period("Y").astype(str)
     elif granularity == "month":
-        df["period"] = date_col.dt.to_period("M").astype(str)
+        return date_col.dt.to_period("M").astype(str)
     elif granularity == "day":
-        df["period"] = date_col.dt.date
-    else:  # default to week
-        df["period"] = date_col.dt.to_period("W").astype(str)
+        return date_col.dt.date
+    else:  # week
+        return date_col.dt.to_period("W").astype(str)
+
+def group_drag_vs_hr(df: pd.DataFrame, granularity: str) -> list:
+    if df.empty:
+        return []
+
+    df["period"] = period_labels(df["game_date"], granularity)
+    grouped = df.groupby("period")[["drag_sum", "drag_count", "home_runs"]].sum()
+    grouped["drag_coefficient"] = grouped["drag_sum"] / grouped["drag_count"]
+    grouped["home_runs"] = grouped["home_runs"].astype(int)
+    grouped = grouped[["drag_coefficient", "home_runs"]].reset_index().rename(columns={"period": granularity})
+    return grouped.to_dict(orient="records")
+
+@router.get("/xhr_vs_actual")
+async def get_xhr_vs_actual(
+    request: Request,
+    start_date: str = Query(DEFAULT_START_DATE, description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(None, description="End date in YYYY-MM-DD format (defaults to today)"),
+    granularity: str = Query("month", description="Grouping: year, month, week, or day")
+):
+    """Expected (summed xHR probability) vs actual home runs per period, over batted balls with launch data."""
+    model = request.app.state.XHR_MODEL
+    if model is None:
+        raise HTTPException(status_code=503, detail="No xHR model loaded; train one with python -m app.xhr")
+    start_dt, end_dt = parse_date_range(start_date, end_date)
+    granularity = parse_granularity(granularity)
+    # The model is part of the key so a retrained artifact never revalidates an old ETag
+    params = {**date_params(start_dt, end_dt), "granularity": granularity, "model": model.trained_at}
+
+    async def compute():
+        df = await read_frame(batted_balls_statement(start_dt, end_dt))
+        return await run_cpu(group_xhr_vs_actual, df, model, granularity)
 
+    return await cached_response(request, "xhr_vs_actual", params, compute,
+                                 lambda data: {"data": data, "model": model.status()})
+
+def group_xhr_vs_actual(df: pd.DataFrame, model, granularity: str) -> list:
+    if df.empty:
+        return []
+    df = calculate_xhr(df, model)
+    df["home_runs"] = df["events"] == "home_run"
+    df["period"] = period_labels(df["game_date"], granularity)
     grouped = df.groupby("period").agg(
-        drag_coefficient=("drag_coefficient", "mean"),
-        home_runs=("events", lambda x: (x == "home_run").sum())
-    ).reset_index().rename(columns={"period": granularity})
-    return {"data": grouped.to_dict(orient="records")} 
+        batted_balls=("xhr", "size"), home_runs=("home_runs", "sum"), xhr=("xhr", "sum")
+    )
+    grouped["home_runs"] = grouped["home_runs"].astype(int)
+    grouped["hr_minus_xhr"] = grouped["home_runs"] - grouped["xhr"]
+    grouped[["xhr", "hr_minus_xhr"]] = grouped[["xhr", "hr_minus_xhr"]].round(2)
+    return grouped.reset_index().rename(columns={"period": granularity}).to_dict(orient="records")
+
+def expected_vs_actual_distance_statement(start_dt: date, end_dt: date):
+    # expected_distance is stored at load time (analytics.add_derived_columns), so this is a plain read
+    return select(
+        StatcastEvent.game_date,
+        StatcastEvent.launch_speed,
+        StatcastEvent.launch_angle,
+        StatcastEvent.hit_distance_sc,
+        StatcastEvent.expected_distance
+    ).where(
+        StatcastEvent.game_date >= start_dt,
+        StatcastEvent.game_date <= end_dt,
+        StatcastEvent.launch_speed > 60,
+        StatcastEvent.hit_distance_sc > 50,
+        StatcastEvent.launch_angle >= 10,
+        StatcastEvent.launch_angle <= 45,
+        StatcastEvent.launch_speed != None,
+        StatcastEvent.launch_angle != None,
+        StatcastEvent.hit_distance_sc != None
+    )
 
 @router.get("/expected_vs_actual_distance")
-def get_expected_vs_actual_distance(
-    start_date: str = Query("2015-01-01", description="Start date in YYYY-MM-DD format"),
-    end_date: str = Query(None, description="End date in YYYY-MM-DD format (defaults to today)")
+async def get_expected_vs_actual_distance(
+    request: Request,
+    start_date: str = Query(DEFAULT_START_DATE, description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(None, description="End date in YYYY-MM-DD format (defaults to today)"),
+    pages: PageParams = Depends(),
+    fmt: str = Query(None, alias="format", description="Response layout: records (default), columns, or arrow"),
+    stream: str = Query(None, description="Stream rows in batches as they are read: ndjson or arrow")
 ):
-    # Physics constants
-    GRAVITY = 9.8  # m/s^2
-    MPH_TO_MPS = 0.44704
-    FEET_TO_METERS = 0.3048
+    fmt = negotiate_format(request, fmt)
+    stream = validate_stream_mode(stream)
+    pages.check(stream)
+    start_dt, end_dt = parse_date_range(start_date, end_date)
+    statement = expected_vs_actual_distance_statement(start_dt, end_dt)
+    if stream:
+        return stream_statement(statement, stream)
+    params = {**date_params(start_dt, end_dt), **pages.params()}
+    if pages.enabled:
+        async def compute():
+            return await run_cpu(pages.split, await read_frame(pages.apply(statement)))
+        return await cached_response(request, "expected_vs_actual_distance", params, compute,
+                                     lambda value: render_frame_with_meta(value, fmt), variant=fmt)
+    return await cached_response(request, "expected_vs_actual_distance", params, lambda: read_frame(statement),
+                                 lambda df: render_frame(df, fmt), variant=fmt)
 
-    # Use today's date if no end_date provided
-    if end_date is None:
-        end_date = date.today().strftime("%Y-%m-%d")
-    start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
-    end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
-
-    with Session(engine) as session:
-        query = session.query(
-            StatcastEvent.game_date,
-            StatcastEvent.launch_speed,
-            StatcastEvent.launch_angle,
-            StatcastEvent.hit_distance_sc
-        ).filter(
-            StatcastEvent.game_date >= start_dt,
-            StatcastEvent.game_date <= end_dt,
-            StatcastEvent.launch_speed > 60,
-            StatcastEvent.hit_distance_sc > 50,
-            StatcastEvent.launch_angle >= 10,
-            StatcastEvent.launch_angle <= 45,
-            StatcastEvent.launch_speed != None,
-            StatcastEvent.launch_angle != None,
-            StatcastEvent.hit_distance_sc != None
-        )
-        df = pd.read_sql(query.statement, session.bind)
+def parse_percentiles(value: str) -> list:
+    try:
+        percentiles = [float(item) for item in split_csv(value)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="percentiles must be comma-separated numbers")
+    if any(p < 0 or p > 100 for p in percentiles):
+        raise HTTPException(status_code=400, detail="percentiles must be between 0 and 100")
+    return sorted(set(percentiles))
 
-    if df.empty:
-        return {"data": []}
+def drag_stats_payload(count, lo, hi, mean, median, percentiles, values, counts, method: str) -> dict:
+    if not count:
+        return {"min": None, "max": None, "mean": None, "median": None, "count": 0, "percentiles": {},
+                "histogram": {"edges": [], "counts": []}, "method": method}
+    return {
+        "min": float(lo),
+        "max": float(hi),
+        "mean": float(mean),
+        "median": float(median),
+        "count": int(count),
+        "percentiles": {f"p{p:g}": float(v) for p, v in zip(percentiles, values)},
+        "histogram": {"edges": np.linspace(lo, hi, len(counts) + 1).tolist(), "counts": [int(c) for c in counts]},
+        "method": method,
+    }
 
-    # Calculate expected distance in vacuum
-    v0 = df["launch_speed"] * MPH_TO_MPS  # m/s
-    theta = np.deg2rad(df["launch_angle"])  # radians
-    d_vacuum = (v0 ** 2) * np.sin(2 * theta) / GRAVITY  # meters
-    df["expected_distance"] = d_vacuum / FEET_TO_METERS  # convert to feet
+async def sketch_drag_stats(start_dt: date, end_dt: date, bb_types: list, percentiles: list, bins: int) -> Optional[dict]:
+    """Stats from the merged per-day sketches; None when no sketches cover the range."""
+    query = select(DragSketch.sketch).where(DragSketch.game_date >= start_dt, DragSketch.game_date <= end_dt)
+    if bb_types:
+        query = query.where(DragSketch.bb_type.in_(bb_types))
+    async with async_engine.connect() as conn:
+        blobs = (await conn.execute(query)).scalars().all()
+    return await run_cpu(merged_sketch_stats, blobs, percentiles, bins)
 
-    # Return all hits as list of dicts
-    return {"data": df.to_dict(orient="records")} 
+def merged_sketch_stats(blobs: list, percentiles: list, bins: int) -> Optional[dict]:
+    digest = TDigest.merge((TDigest.from_bytes(blob) for blob in blobs), compression=None)
+    if not digest.count:
+        return None
+    values = digest.quantile([0.5] + [p / 100 for p in percentiles])
+    _, counts = digest.histogram(bins)
+    return drag_stats_payload(digest.count, digest.min, digest.max, digest.sum / digest.count,
+                              values[0], percentiles, values[1:], counts, "sketch")
+
+async def exact_drag_stats(start_dt: date, end_dt: date, bb_types: list, percentiles: list, bins: int) -> dict:
+    """Exact stats computed by the database (percentile_cont on PostgreSQL, ordered offsets elsewhere)."""
+    drag = StatcastEvent.drag_coefficient
+    where = [drag.isnot(None), StatcastEvent.game_date >= start_dt, StatcastEvent.game_date <= end_dt]
+    if bb_types:
+        where.append(StatcastEvent.bb_type.in_(bb_types))
+    quantiles = [0.5] + [p / 100 for p in percentiles]
+    postgres = async_engine.dialect.name == "postgresql"
+    async with heavy_queries, async_engine.connect() as conn:
+        count, lo, hi, mean = (await conn.execute(select(func.count(drag), func.min(drag), func.max(drag), func.avg(drag)).where(*where))).one()
+        if not count:
+            return drag_stats_payload(0, None, None, None, None, [], [], [], "exact")
+        if postgres:
+            values = (await conn.execute(
+                select(func.percentile_cont(postgresql.array(quantiles)).within_group(drag).cast(ARRAY(Float))).where(*where)
+            )).scalar()
+        else:
+            # percentile_cont's interpolation between the two neighbouring ranks
+            values = []
+            for q in quantiles:
+                position = q * (count - 1)
+                pair = (await conn.execute(select(drag).where(*where).order_by(drag).offset(int(position)).limit(2))).scalars().all()
+                upper = pair[1] if len(pair) > 1 else pair[0]
+                values.append(pair[0] + (upper - pair[0]) * (position - int(position)))
+        width = (hi - lo) / bins if hi > lo else 1.0
+        offset = (drag - lo) / width
+        bucket = cast(func.floor(offset) if postgres else offset, Integer)
+        bucket = case((bucket >= bins, bins - 1), else_=bucket)
+        counts = np.zeros(bins, dtype=np.int64)
+        for index, n in (await conn.execute(select(bucket, func.count()).where(*where).group_by(bucket))).all():
+            counts[int(index)] = n
+    return drag_stats_payload(count, lo, hi, mean, values[0], percentiles, values[1:], counts, "exact")
 
 @router.get("/drag_coefficient_stats")
-def get_drag_coefficient_stats():
-    import numpy as np
-    with Session(engine) as session:
-        query = session.query(StatcastEvent.drag_coefficient).filter(StatcastEvent.drag_coefficient != None)
-        df = pd.read_sql(query.statement, session.bind)
-    # Drop NaN
-    df = df[df["drag_coefficient"].notnull()]
-    if df.empty:
-        return {"min": None, "max": None, "mean": None, "median": None, "count": 0}
-    values = df["drag_coefficient"].astype(float).values
-    stats = {
-        "min": float(np.min(values)),
-        "max": float(np.max(values)),
-        "mean": float(np.mean(values)),
-        "median": float(np.median(values)),
-        "count": int(len(values)),
-    }
-    return stats 
+async def get_drag_coefficient_stats(
+    request: Request,
+    start_date: str = Query(DEFAULT_START_DATE, description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(None, description="End date in YYYY-MM-DD format (defaults to today)"),
+    bb_type: str = Query(None, description="Comma-separated batted ball types (e.g. 'fly_ball,line_drive')"),
+    percentiles: str = Query("5,25,50,75,95", description="Comma-separated percentiles (0-100) to report"),
+    bins: int = Query(20, ge=1, le=500, description="Number of equal-width histogram bins between min and max"),
+    exact: bool = Query(False, description="Compute percentiles and histogram in SQL from raw events instead of the per-day sketches")
+):
+    """min/max/mean/count are exact either way; median, percentiles and histogram are approximate unless exact=true."""
+    start_dt, end_dt = parse_date_range(start_date, end_date)
+    bb_types = sorted(set(split_csv(bb_type)))
+    percentile_values = parse_percentiles(percentiles)
+    params = {**date_params(start_dt, end_dt), "bb_type": bb_types, "percentiles": percentile_values, "bins": bins, "exact": exact}
+
+    async def compute():
+        stats = None if exact else await sketch_drag_stats(start_dt, end_dt, bb_types, percentile_values, bins)
+        # Fall back to SQL when the range has no sketches yet (e.g. before python -m app.rollups)
+        return stats or await exact_drag_stats(start_dt, end_dt, bb_types, percentile_values, bins)
+
+    return await cached_response(request, "drag_coefficient_stats", params, compute, lambda stats: stats)
+
+def pitch_vs_exit_velocity_statement(
+    start_dt: date,
+    end_dt: date,
+    pitch_type: Optional[str],
+    bb_type: Optional[str],
+    min_release_speed: float,
+    max_release_speed: float,
+    min_launch_speed: float,
+    max_launch_speed: float,
+    extra_columns=()
+):
+    statement = select(
+        StatcastEvent.release_speed,
+        StatcastEvent.launch_speed,
+        StatcastEvent.bb_type,
+        StatcastEvent.events,
+        StatcastEvent.pitch_type,
+        StatcastEvent.game_date,
+        *extra_columns
+    ).where(
+        StatcastEvent.release_speed != None,
+        StatcastEvent.launch_speed != None,
+        StatcastEvent.game_date >= start_dt,
+        StatcastEvent.game_date <= end_dt,
+        StatcastEvent.release_speed >= min_release_speed,
+        StatcastEvent.release_speed <= max_release_speed,
+        StatcastEvent.launch_speed >= min_launch_speed,
+        StatcastEvent.launch_speed <= max_launch_speed
+    )
+    # Pitch type filter
+    types = split_csv(pitch_type)
+    if types:
+        statement = statement.where(StatcastEvent.pitch_type.in_(types))
+    # Batted ball type filter
+    bb_types = split_csv(bb_type)
+    if bb_types:
+        statement = statement.where(StatcastEvent.bb_type.in_(bb_types))
+    else:
+        # Default: fly_ball, line_drive, or home_run
+        statement = statement.where(
+            (StatcastEvent.bb_type.in_(["fly_ball", "line_drive"])) |
+            (StatcastEvent.events == "home_run")
+        )
+    return statement
 
 @router.get("/pitch_vs_exit_velocity")
-def get_pitch_vs_exit_velocity(
-    start_date: str = Query("2015-01-01", description="Start date in YYYY-MM-DD format"),
+async def get_pitch_vs_exit_velocity(
+    request: Request,
+    start_date: str = Query(DEFAULT_START_DATE, description="Start date in YYYY-MM-DD format"),
     end_date: str = Query(None, description="End date in YYYY-MM-DD format (defaults to today)"),
     pitch_type: str = Query(None, description="Comma-separated pitch types (e.g. 'FF,SL')"),
     bb_type: str = Query(None, description="Comma-separated batted ball types (e.g. 'fly_ball,line_drive')"),
     min_release_speed: float = Query(30, description="Minimum pitch velocity (mph)"),
     max_release_speed: float = Query(110, description="Maximum pitch velocity (mph)"),
     min_launch_speed: float = Query(40, description="Minimum exit velocity (mph)"),
-    max_launch_speed: float = Query(130, description="Maximum exit velocity (mph)")
+    max_launch_speed: float = Query(130, description="Maximum exit velocity (mph)"),
+    binning: BinningParams = Depends(),
+    pages: PageParams = Depends(),
+    fmt: str = Query(None, alias="format", description="Response layout: records (default), columns, or arrow"),
+    stream: str = Query(None, description="Stream rows in batches as they are read: ndjson or arrow")
 ):
-    if end_date is None:
-        end_date = date.today().strftime("%Y-%m-%d")
-    start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
-    end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
-    with Session(engine) as session:
-        query = session.query(
-            StatcastEvent.release_speed,
-            StatcastEvent.launch_speed,
-            StatcastEvent.bb_type,
+    fmt = negotiate_format(request, fmt)
+    stream = validate_stream_mode(stream, binning.aggregate)
+    pages.check(stream, binning.aggregate)
+    start_dt, end_dt = parse_date_range(start_date, end_date)
+    statement = pitch_vs_exit_velocity_statement(
+        start_dt, end_dt, pitch_type, bb_type,
+        min_release_speed, max_release_speed, min_launch_speed, max_launch_speed,
+        extra_columns=[StatcastEvent.drag_coefficient] if binning.aggregate else ()
+    )
+    if stream:
+        return stream_statement(statement, stream)
+    if pages.enabled:
+        statement = pages.apply(statement)
+
+    def transform(df: pd.DataFrame):
+        # Drop NaN
+        df = df[df["release_speed"].notnull() & df["launch_speed"].notnull()]
+        if binning.aggregate:
+            return aggregate_scatter(df, "release_speed", "launch_speed", binning, binning.aggregate)
+        if pages.enabled:
+            return pages.split(df)
+        return df
+
+    async def compute():
+        return await run_cpu(transform, await read_frame(statement))
+
+    params = {
+        **date_params(start_dt, end_dt),
+        "pitch_type": sorted(set(split_csv(pitch_type))),
+        "bb_type": sorted(set(split_csv(bb_type))),
+        "release_speed": [min_release_speed, max_release_speed],
+        "launch_speed": [min_launch_speed, max_launch_speed],
+        **binning.params(),
+        **pages.params(),
+    }
+    with_meta = binning.aggregate or pages.enabled
+    render = (lambda value: render_frame_with_meta(value, fmt)) if with_meta else (lambda df: render_frame(df, fmt))
+    return await cached_response(request, "pitch_vs_exit_velocity", params, compute, render, variant=fmt)
+
+@router.get("/spray_chart")
+async def get_spray_chart(
+    request: Request,
+    start_date: str = Query(DEFAULT_START_DATE, description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(None, description="End date in YYYY-MM-DD format (defaults to today)"),
+    bb_type: str = Query(None, description="Comma-separated batted ball types (e.g. 'fly_ball,line_drive')"),
+    binning: BinningParams = Depends(),
+    fmt: str = Query(None, alias="format", description="Response layout: records (default), columns, or arrow")
+):
+    """Binned hc_x x hc_y hit locations; always aggregated (hex bins unless aggregate=grid)."""
+    fmt = negotiate_format(request, fmt)
+    start_dt, end_dt = parse_date_range(start_date, end_date)
+    bb_types = split_csv(bb_type)
+    shape = binning.aggregate or "hex"
+
+    async def compute():
+        statement = select(
+            StatcastEvent.hc_x,
+            StatcastEvent.hc_y,
             StatcastEvent.events,
-            StatcastEvent.pitch_type,
-            StatcastEvent.game_date
-        ).filter(
-            StatcastEvent.release_speed != None,
-            StatcastEvent.launch_speed != None,
+            StatcastEvent.drag_coefficient
+        ).where(
             StatcastEvent.game_date >= start_dt,
             StatcastEvent.game_date <= end_dt,
-            StatcastEvent.release_speed >= min_release_speed,
-            StatcastEvent.release_speed <= max_release_speed,
-            StatcastEvent.launch_speed >= min_launch_speed,
-            StatcastEvent.launch_speed <= max_launch_speed
+            StatcastEvent.hc_x != None,
+            StatcastEvent.hc_y != None
         )
-        # Pitch type filter
-        if pitch_type:
-            types = [pt.strip() for pt in pitch_type.split(",") if pt.strip()]
-            if types:
-                query = query.filter(StatcastEvent.pitch_type.in_(types))
-        # Batted ball type filter
-        if bb_type:
-            bb_types = [bt.strip() for bt in bb_type.split(",") if bt.strip()]
-            if bb_types:
-                query = query.filter(StatcastEvent.bb_type.in_(bb_types))
+        if bb_types:
+            statement = statement.where(StatcastEvent.bb_type.in_(bb_types))
+        df = await read_frame(statement)
+        return await run_cpu(aggregate_scatter, df, "hc_x", "hc_y", binning, shape)
+
+    binning.aggregate = shape
+    params = {**date_params(start_dt, end_dt), "bb_type": sorted(set(bb_types)), **binning.params()}
+    return await cached_response(request, "spray_chart", params, compute,
+                                 lambda value: render_frame_with_meta(value, fmt), variant=fmt)
+
+# Views /dashboard can return, each the aggregate its own endpoint serves (scatter views always binned)
+DASHBOARD_VIEWS = ("exit_velocity_distance", "drag_vs_hr", "drag_coefficient_stats", "pitch_vs_exit_velocity")
+FLY_LINE = ["fly_ball", "line_drive"]
+
+def dashboard_statement(start_dt: date, end_dt: date, views: list) -> Select:
+    """One scan for all views: the union of their columns, over rows any of them uses."""
+    e = StatcastEvent
+    needs = {
+        "exit_velocity_distance": ([e.launch_speed, e.launch_angle, e.hit_distance_sc, e.bb_type, e.drag_coefficient, e.events],
+                                   and_(e.launch_speed != None, e.launch_angle != None, e.hit_distance_sc != None,
+                                        e.bb_type != None, e.drag_coefficient != None)),
+        "drag_vs_hr": ([e.drag_coefficient, e.bb_type, e.events], DRAG_SAMPLE),
+        "drag_coefficient_stats": ([e.drag_coefficient], e.drag_coefficient != None),
+        "pitch_vs_exit_velocity": ([e.release_speed, e.launch_speed, e.bb_type, e.events, e.drag_coefficient],
+                                   and_(e.release_speed >= 30, e.release_speed <= 110, e.launch_speed >= 40, e.launch_speed <= 130,
+                                        e.bb_type.in_(FLY_LINE) | (e.events == "home_run"))),
+    }
+    columns = {"game_date": e.game_date}
+    for view in views:
+        columns.update((column.name, column) for column in needs[view][0])
+    return select(*columns.values()).where(
+        e.game_date >= start_dt,
+        e.game_date <= end_dt,
+        or_(*(needs[view][1] for view in views))
+    )
+
+def dashboard_views(df: pd.DataFrame, views: list, granularity: str, percentiles: list, bins: int, binning: BinningParams) -> dict:
+    """Every requested view from the one frame; each view's rows are a NumPy mask mirroring its endpoint's filters."""
+    result = {}
+    drag = df["drag_coefficient"] if "drag_coefficient" in df else None
+    home_run = df["events"] == "home_run" if "events" in df else None
+    fly_line = df["bb_type"].isin(FLY_LINE) if "bb_type" in df else None
+    if "exit_velocity_distance" in views:
+        rows = df[["launch_speed", "launch_angle", "hit_distance_sc", "bb_type", "drag_coefficient"]].notna().all(axis=1)
+        cells, meta = aggregate_scatter(df[rows], "launch_speed", "hit_distance_sc", binning, binning.aggregate)
+        result["exit_velocity_distance"] = {**meta, "data": frame_to_records(cells)}
+    if "drag_vs_hr" in views:
+        # rollups.DRAG_SAMPLE, summed per day as in statcast_daily_rollup
+        rows = (drag > 0.1) & (drag < 0.6) & (fly_line | home_run)
+        daily = pd.DataFrame({"game_date": df["game_date"], "drag_sum": drag, "drag_count": 1, "home_runs": home_run.astype(int)})[rows]
+        daily = daily.groupby("game_date", as_index=False).sum()
+        result["drag_vs_hr"] = {"data": group_drag_vs_hr(daily, granularity)}
+    if "drag_coefficient_stats" in views:
+        values = drag[drag.notna()].to_numpy(dtype=float)
+        if len(values):
+            lo, hi = values.min(), values.max()
+            # Linear interpolation between ranks, as percentile_cont does for exact=true
+            quantiles = np.percentile(values, [50] + percentiles)
+            width = (hi - lo) / bins if hi > lo else 1.0
+            counts = np.bincount(np.minimum(((values - lo) / width).astype(np.int64), bins - 1), minlength=bins)
+            result["drag_coefficient_stats"] = drag_stats_payload(len(values), lo, hi, values.mean(), quantiles[0],
+                                                                  percentiles, quantiles[1:], counts, "exact")
         else:
-            # Default: fly_ball, line_drive, or home_run
-            query = query.filter(
-                (StatcastEvent.bb_type.in_(["fly_ball", "line_drive"])) |
-                (StatcastEvent.events == "home_run")
-            )
-        df = pd.read_sql(query.statement, session.bind)
-    # Drop NaN
-    df = df[df["release_speed"].notnull() & df["launch_speed"].notnull()]
-    return {"data": df.to_dict(orient="records")} 
\ No newline at end of file
+            result["drag_coefficient_stats"] = drag_stats_payload(0, None, None, None, None, [], [], [], "exact")
+    if "pitch_vs_exit_velocity" in views:
+        # The endpoint's defaults: 30-110 mph pitches, 40-130 mph exit velocity, fly balls, line drives and HRs
+        rows = df["release_speed"].between(30, 110) & df["launch_speed"].between(40, 130) & (fly_line | home_run)
+        cells, meta = aggregate_scatter(df[rows], "release_speed", "launch_speed", binning, binning.aggregate)
+        result["pitch_vs_exit_velocity"] = {**meta, "data": frame_to_records(cells)}
+    return result
+
+@router.get("/dashboard")
+async def get_dashboard(
+    request: Request,
+    start_date: str = Query(DEFAULT_START_DATE, description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(None, description="End date in YYYY-MM-DD format (defaults to today)"),
+    views: str = Query(None, description=f"Comma-separated views to return (default all): {', '.join(DASHBOARD_VIEWS)}"),
+    granularity: str = Query("month", description="drag_vs_hr grouping: year, month, week, or day"),
+    percentiles: str = Query("5,25,50,75,95", description="drag_coefficient_stats percentiles (0-100)"),
+    bins: int = Query(20, ge=1, le=500, description="drag_coefficient_stats histogram bins"),
+    aggregate: str = Query("grid", description="Bin shape for the scatter views: 'grid' or 'hex'"),
+    resolution: int = Query(60, ge=1, le=MAX_BINS_PER_AXIS, description="Bins per axis for the scatter views")
+):
+    """
+    Several dashboard charts for one date range from a single scan of statcast_events. Each view is
+    what its own endpoint returns by default, except that the scatter views are binned (as with
+    aggregate=) and drag_coefficient_stats is exact.
+    """
+    start_dt, end_dt = parse_date_range(start_date, end_date)
+    granularity = parse_granularity(granularity)
+    requested = sorted(set(split_csv(views))) or list(DASHBOARD_VIEWS)
+    unknown = [view for view in requested if view not in DASHBOARD_VIEWS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown views {', '.join(unknown)}; expected some of {', '.join(DASHBOARD_VIEWS)}")
+    percentile_values = parse_percentiles(percentiles)
+    binning = BinningParams(aggregate, resolution, None, None, None, None, None, None)
+    params = {**date_params(start_dt, end_dt), "views": requested, "granularity": granularity,
+              "percentiles": percentile_values, "bins": bins, **binning.params()}
+
+    async def compute():
+        df = await read_frame(dashboard_statement(start_dt, end_dt, requested))
+        data = await run_cpu(dashboard_views, df, requested, granularity, percentile_values, bins, binning)
+        return {**date_params(start_dt, end_dt), "rows_scanned": int(len(df)), "views": data}
+
+    return await cached_response(request, "dashboard", params, compute, lambda payload: payload)
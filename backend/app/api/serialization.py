@@ -0,0 +1,207 @@
+import gzip
+import io
+import json
+import os
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from ..compact import DATE32, date32_days, expand_frame, widen_float32
+
+# Optional encoders: offered only when installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Supported response layouts for tabular endpoints
+RECORDS = "records"
+COLUMNS = "columns"
+ARROW = "arrow"
+FORMATS = (RECORDS, COLUMNS, ARROW)
+
+JSON_MEDIA_TYPE = "application/json"
+COLUMNS_MEDIA_TYPE = "application/vnd.deadball.columns+json"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+IDENTITY = "identity"
+# Bodies are compressed once per cache entry, so the levels favour size over speed
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "10"))
+# Smaller bodies are sent as they are; compressing them saves nothing worth the header
+MIN_COMPRESS_BYTES = 1024
+
+# Content codings we can produce, in order of preference when a client accepts several equally
+ENCODERS = {}
+if brotli is not None:
+    ENCODERS["br"] = lambda content: brotli.compress(content, quality=BROTLI_QUALITY)
+if zstandard is not None:
+    ENCODERS["zstd"] = lambda content: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(content)
+ENCODERS["gzip"] = lambda content: gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def negotiate_format(request: Request, fmt: Optional[str] = None) -> str:
+    """
+    Pick the response layout from an explicit ?format= value or the Accept header.
+    Records stay the default so existing clients are unaffected.
+    """
+    if fmt:
+        fmt = fmt.strip().lower()
+        if fmt not in FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format '{fmt}', expected one of {', '.join(FORMATS)}")
+        return fmt
+    accept = request.headers.get("accept", "")
+    if ARROW_STREAM_MEDIA_TYPE in accept:
+        return ARROW
+    if COLUMNS_MEDIA_TYPE in accept:
+        return COLUMNS
+    return RECORDS
+
+
+def negotiate_encoding(request: Request) -> str:
+    """Best content coding in ENCODERS that the Accept-Encoding header allows, or identity."""
+    weights = {}
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+    best, best_weight = IDENTITY, 0.0
+    for name in ENCODERS:
+        weight = weights.get(name, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+class Body:
+    """An encoded response body. Cached bodies are sent as they are, so a hit costs one copy."""
+    def __init__(self, content: bytes, media_type: str, encoding: str = IDENTITY):
+        self.content = content
+        self.media_type = media_type
+        self.encoding = encoding
+
+    def __len__(self) -> int:
+        return len(self.content)
+
+    def encode(self, encoding: str) -> "Body":
+        """This body compressed with encoding (itself when it is too small to bother)."""
+        if encoding == self.encoding or len(self.content) < MIN_COMPRESS_BYTES:
+            return self
+        return Body(ENCODERS[encoding](self.content), self.media_type, encoding)
+
+    def response(self, headers: Optional[dict] = None) -> Response:
+        headers = dict(headers or {})
+        if self.encoding != IDENTITY:
+            headers["Content-Encoding"] = self.encoding
+        # Response sets Content-Length from the content
+        return Response(content=self.content, media_type=self.media_type, headers=headers)
+
+
+def encode_json(payload) -> bytes:
+    """payload as JSON via orjson: NaN and inf become null, types orjson lacks go through jsonable_encoder."""
+    return orjson.dumps(payload, default=jsonable_encoder, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def _date_strings(values: np.ndarray) -> list:
+    # A season has a few hundred distinct dates, so format each once and share the strings
+    days, inverse = np.unique(values, return_inverse=True)
+    lookup = np.datetime_as_string(days, unit="D").astype(object)
+    lookup[np.isnat(days)] = None
+    return lookup[inverse.ravel()].tolist()
+
+
+def column_values(series: pd.Series):
+    """
+    One column, JSON-ready: numbers and booleans stay NumPy arrays, which orjson writes straight from
+    the buffer (NaN and inf as null); dates and strings become lists sharing one object per distinct value.
+    """
+    # Compact cache columns (see app/compact.py)
+    if series.dtype == np.float32:
+        return widen_float32(series.to_numpy())
+    if series.dtype == DATE32:
+        return _date_strings(date32_days(series))
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Code -1 (missing) picks the appended None
+        lookup = np.append(series.cat.categories.to_numpy(dtype=object), None)
+        return lookup[series.cat.codes.to_numpy()].tolist()
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return _date_strings(series.to_numpy(dtype="datetime64[D]"))
+    values = series.to_numpy()
+    if values.dtype.kind in "fiub":
+        # orjson only reads C-contiguous buffers
+        return np.ascontiguousarray(values)
+    # Object columns hold either strings or datetime.date values from the DB driver
+    first = series.first_valid_index()
+    if first is not None and isinstance(series[first], date):
+        return column_values(pd.to_datetime(series))
+    return series.to_numpy(dtype=object, na_value=None).tolist()
+
+
+def frame_to_columns(df: pd.DataFrame) -> dict:
+    """Column-oriented payload: one array per column, key names sent once."""
+    return {
+        "format": COLUMNS,
+        "count": int(len(df)),
+        "columns": list(df.columns),
+        "data": {col: column_values(df[col]) for col in df.columns},
+    }
+
+
+def frame_to_arrow(df: pd.DataFrame, meta: Optional[dict] = None) -> bytes:
+    """Encode a DataFrame as an Apache Arrow IPC stream."""
+    # date32 columns go across as they are; float32 is widened and dictionaries decoded so the
+    # schema matches what the uncompacted frame would give
+    widened = {name: widen_float32(df[name].to_numpy()) for name in df.columns if df[name].dtype == np.float32}
+    table = pa.Table.from_pandas(df.assign(**widened) if widened else df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+    if meta:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"deadball": json.dumps(meta)})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def frame_to_records(df: pd.DataFrame) -> list:
+    """Legacy row-oriented payload (one dict per row)."""
+    if df.empty:
+        return []
+    # Replace NaN, inf, -inf with None for JSON serialization
+    df = expand_frame(df).replace([np.nan, np.inf, -np.inf], None)
+    return df.to_dict(orient="records")
+
+
+def render_frame(df: pd.DataFrame, fmt: str, meta: Optional[dict] = None) -> Body:
+    """
+    Encode a DataFrame as the endpoint body in the negotiated layout.
+    Optional meta keys are added next to "data" (or to the Arrow schema metadata).
+    """
+    if fmt == ARROW:
+        return Body(frame_to_arrow(df, meta), ARROW_STREAM_MEDIA_TYPE)
+    if fmt == COLUMNS:
+        return Body(encode_json({**frame_to_columns(df), **(meta or {})}), COLUMNS_MEDIA_TYPE)
+    return Body(encode_json({**(meta or {}), "data": frame_to_records(df)}), JSON_MEDIA_TYPE)
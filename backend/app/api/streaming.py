@@ -0,0 +1,114 @@
+import io
+import os
+from datetime import date
+from typing import Callable, Iterator, Optional
+
+import pandas as pd
+import pyarrow as pa
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Date, Float, Integer, String
+from sqlalchemy.sql import Select
+
+from ..metrics import record_rows
+from ..models import engine
+from .serialization import ARROW_STREAM_MEDIA_TYPE, encode_json, frame_to_records
+
+NDJSON = "ndjson"
+ARROW = "arrow"
+STREAM_MODES = (NDJSON, ARROW)
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Rows fetched from the server-side cursor per batch; bounds memory per streaming request
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "20000"))
+
+_ARROW_TYPES = [(Float, pa.float64()), (Integer, pa.int64()), (Date, pa.date32()), (String, pa.string())]
+
+
+def validate_stream_mode(stream: Optional[str], aggregate: Optional[str] = None) -> Optional[str]:
+    if stream is None:
+        return None
+    stream = stream.strip().lower()
+    if stream not in STREAM_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported stream mode '{stream}', expected one of {', '.join(STREAM_MODES)}")
+    if aggregate:
+        raise HTTPException(status_code=400, detail="stream cannot be combined with aggregate")
+    return stream
+
+
+def iter_frames(statement: Select, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Execute statement on a server-side cursor and yield DataFrames of at most batch_size rows.
+    Always yields at least one (possibly empty) frame so consumers see the column layout.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+        columns = list(result.keys())
+        empty = True
+        for rows in result.partitions():
+            empty = False
+            record_rows(len(rows))
+            yield pd.DataFrame.from_records(rows, columns=columns)
+        if empty:
+            yield pd.DataFrame(columns=columns)
+
+
+def _format_dates(df: pd.DataFrame) -> pd.DataFrame:
+    for col in df.columns:
+        first = df[col].first_valid_index()
+        if df[col].dtype == object and first is not None and isinstance(df[col][first], date):
+            df[col] = pd.to_datetime(df[col]).dt.strftime("%Y-%m-%d")
+    return df
+
+
+def _ndjson_chunks(frames: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    for df in frames:
+        if df.empty:
+            continue
+        # Same row dicts and encoder as the records payload, so values read the same streamed or not
+        yield b"".join(encode_json(row) + b"\n" for row in frame_to_records(_format_dates(df)))
+
+
+def _arrow_schema(statement: Select, df: pd.DataFrame) -> pa.Schema:
+    # Prefer the declared SQL types so every batch (even all-null ones) shares one schema
+    declared = {}
+    for col in statement.selected_columns:
+        for sa_type, arrow_type in _ARROW_TYPES:
+            if isinstance(col.type, sa_type):
+                declared[col.name] = arrow_type
+                break
+    inferred = pa.Schema.from_pandas(df, preserve_index=False)
+    return pa.schema([
+        pa.field(field.name, declared.get(field.name, field.type if field.type != pa.null() else pa.float64()))
+        for field in inferred
+    ])
+
+
+def _arrow_chunks(frames: Iterator[pd.DataFrame], statement: Select) -> Iterator[bytes]:
+    sink = io.BytesIO()
+    writer = None
+    schema = None
+    for df in frames:
+        if writer is None:
+            schema = _arrow_schema(statement, df)
+            writer = pa.ipc.new_stream(sink, schema)
+        writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+
+def stream_statement(
+    statement: Select,
+    mode: str,
+    transform: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+) -> StreamingResponse:
+    """Stream statement's rows batch by batch as NDJSON lines or Arrow record batches."""
+    frames = iter_frames(statement)
+    if transform is not None:
+        frames = (transform(df) for df in frames)
+    if mode == ARROW:
+        return StreamingResponse(_arrow_chunks(frames, statement), media_type=ARROW_STREAM_MEDIA_TYPE)
+    return StreamingResponse(_ndjson_chunks(frames), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,265 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+import pandas as pd
+
+from app.compact import compact_value
+from app.concurrency import run_cpu
+from app.metrics import CACHE_BYTES, CACHE_ENTRIES, record_cache
+from app.watermark import read_watermark
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the estimated size of all cached values
+CACHE_MAX_BYTES = int(float(os.getenv("RESPONSE_CACHE_MAX_MB", "512")) * 1024 * 1024)
+# How long a watermark reading is trusted before the DB is asked again
+WATERMARK_TTL = float(os.getenv("CACHE_WATERMARK_TTL", "10"))
+_KEY_LOCKS = 64
+
+
+def cache_key(route: str, params: dict) -> str:
+    """Canonical key for a route and its normalized query parameters."""
+    return route + "?" + json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def row_count(value) -> Optional[int]:
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, tuple) and value and isinstance(value[0], pd.DataFrame):
+        return len(value[0])
+    if isinstance(value, list):
+        return len(value)
+    return None
+
+
+def estimate_nbytes(value: Any) -> int:
+    """Approximate in-memory size of a cached value."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (tuple, list)) and any(isinstance(item, pd.DataFrame) for item in value):
+        return sum(estimate_nbytes(item) for item in value)
+    return len(json.dumps(value, default=str))
+
+
+class CacheEntry:
+    def __init__(self, value: Any, watermark: str, nbytes: int):
+        self.value = value
+        self.watermark = watermark
+        self.nbytes = nbytes
+        self.rows = row_count(value)
+        self.created_at = time.time()
+        # Encoded response bodies rendered from value, by representation (format and content coding)
+        self.bodies = {}
+        # Representations whose body is memory-mapped from the shared dataset, not counted in nbytes
+        self.mapped = set()
+
+
+class ResponseCache:
+    """
+    In-process LRU of computed endpoint results keyed by route and parameters.
+    Entries are only served while the load watermark they were computed under is
+    current; when a load bumps it the whole cache is dropped. Least recently used
+    entries are evicted once the estimated size exceeds max_bytes. DataFrames are
+    stored compacted (see app/compact.py) and served from that form; the encoded
+    bodies rendered from an entry are kept with it and counted in its size, except
+    those memory-mapped from the shared dataset.
+    """
+    def __init__(
+        self,
+        max_bytes: int = CACHE_MAX_BYTES,
+        watermark_ttl: float = WATERMARK_TTL,
+        watermark_reader: Callable[[], str] = read_watermark,
+    ):
+        self.max_bytes = max_bytes
+        self.watermark_ttl = watermark_ttl
+        self._read_watermark = watermark_reader
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        # Striped locks so concurrent misses on one key compute it only once
+        self._key_locks = [asyncio.Lock() for _ in range(_KEY_LOCKS)]
+        self._watermark = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def watermark(self, force: bool = False) -> str:
+        """Current load watermark, re-read at most every watermark_ttl seconds (or now if force)."""
+        now = time.monotonic()
+        if not force and self._watermark is not None and now - self._checked_at < self.watermark_ttl:
+            return self._watermark
+        try:
+            watermark = self._read_watermark()
+        except Exception:
+            logger.exception("Error reading load watermark")
+            watermark = self._watermark or "0"
+        with self._lock:
+            if watermark != self._watermark:
+                self._entries.clear()
+                self._nbytes = 0
+                self._publish()
+            self._watermark = watermark
+            self._checked_at = now
+        return watermark
+
+    def etag(self, key: str, variant: str = "") -> str:
+        """Weak validator for one representation of key under the current watermark."""
+        digest = hashlib.sha1(f"{key}|{variant}|{self.watermark()}".encode()).hexdigest()[:20]
+        return f'W/"{digest}"'
+
+    def get(self, key: str) -> Optional[Any]:
+        watermark = self.watermark()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.watermark != watermark:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, value: Any, watermark: Optional[str] = None) -> Any:
+        """Store value's compact form under key and return it (also when it is too large to keep)."""
+        watermark = watermark or self.watermark()
+        value = compact_value(value)
+        nbytes = estimate_nbytes(value)
+        if nbytes > self.max_bytes:
+            return value
+        with self._lock:
+            if watermark != self._watermark:
+                # The data changed while this value was being computed
+                return value
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._nbytes -= old.nbytes
+            self._entries[key] = CacheEntry(value, watermark, nbytes)
+            self._nbytes += nbytes
+            self._evict()
+        return value
+
+    def _evict(self):
+        """Drop least recently used entries until under max_bytes; called with _lock held."""
+        while self._nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._nbytes -= evicted.nbytes
+        self._publish()
+
+    def _body(self, key: str, value: Any, representation: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.value is not value:
+                return None
+            return entry.bodies.get(representation)
+
+    async def get_or_encode(self, key: str, value: Any, representation: str, encode: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        The body await encode() builds from value, the cached value of key, kept with the entry so
+        it is built once per entry and representation. Bodies are sized with len().
+        """
+        body = self._body(key, value, representation)
+        if body is not None:
+            return body
+        async with self._key_locks[hash((key, representation)) % _KEY_LOCKS]:
+            body = self._body(key, value, representation)
+            if body is not None:
+                return body
+            body = await encode()
+            with self._lock:
+                entry = self._entries.get(key)
+                # Only attach it to the entry it was rendered from, and only if it fits
+                if entry is not None and entry.value is value and len(body) <= self.max_bytes:
+                    entry.bodies[representation] = body
+                    entry.nbytes += len(body)
+                    self._nbytes += len(body)
+                    self._evict()
+        return body
+
+    def attach_mapped(self, key: str, value: Any, representation: str, body: Any) -> bool:
+        """
+        Keep body with key's entry, if that still holds value, without counting it in the entry's size:
+        it is memory-mapped from the shared dataset (see app/shared.py), whose pages every worker shares.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.value is not value or representation in entry.bodies:
+                return False
+            entry.bodies[representation] = body
+            entry.mapped.add(representation)
+            return True
+
+    def _publish(self):
+        """Per-route size gauges for /metrics; called with _lock held."""
+        nbytes, entries = {}, {}
+        for key, entry in self._entries.items():
+            route = (key.split("?", 1)[0],)
+            nbytes[route] = nbytes.get(route, 0) + entry.nbytes
+            entries[route] = entries.get(route, 0) + 1
+        CACHE_BYTES.replace(nbytes)
+        CACHE_ENTRIES.replace(entries)
+
+    def watermark_expired(self) -> bool:
+        """True when the next watermark() call will query the database."""
+        return self._watermark is None or time.monotonic() - self._checked_at >= self.watermark_ttl
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self.get(key)
+        if entry is None:
+            async with self._key_locks[hash(key) % _KEY_LOCKS]:
+                entry = self.get(key)
+                if entry is None:
+                    self.misses += 1
+                    record_cache("miss")
+                    watermark = self.watermark()
+                    value = await compute()
+                    # Compacting and sizing a large frame walks every column
+                    return await run_cpu(self.put, key, value, watermark)
+        self.hits += 1
+        record_cache("hit")
+        return entry.value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self._checked_at = 0.0
+            self._publish()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "watermark": self._watermark,
+            }
+
+    def entries(self) -> list:
+        """Memory footprint of each entry (value plus bodies), largest first, for sizing RESPONSE_CACHE_MAX_MB and containers."""
+        with self._lock:
+            items = list(self._entries.items())
+        now = time.time()
+        report = []
+        for key, entry in items:
+            bodies, mapped = {}, {}
+            for representation, body in list(entry.bodies.items()):
+                (mapped if representation in entry.mapped else bodies)[representation] = len(body)
+            value_bytes = entry.nbytes - sum(bodies.values())
+            report.append({
+                "key": key,
+                "bytes": entry.nbytes,
+                "rows": entry.rows,
+                # Of the value alone; the encoded bodies are listed separately
+                "bytes_per_row": round(value_bytes / entry.rows, 1) if entry.rows else None,
+                "age_seconds": round(now - entry.created_at, 1),
+                "bodies": bodies,
+                # Shared with the other workers, so not in bytes
+                "mapped_bodies": mapped,
+            })
+        return sorted(report, key=lambda item: item["bytes"], reverse=True)
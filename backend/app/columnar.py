@@ -0,0 +1,379 @@
+"""
+Memory-mapped columnar copy of statcast_events for serving reads without the database.
+
+Each export writes a new generation directory holding one raw NumPy file per column, with rows
+sorted by game_date (stored as int32 days since 1970-01-01). Float columns keep NaN for NULL.
+String columns are dictionary-encoded as int32 codes (-1 for NULL) with the dictionary in
+manifest.json. The CURRENT file names the live generation and is swapped atomically, so readers
+never see a half-written export. Run python -m app.columnar to export by hand.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Date, Float, String, func, select
+from sqlalchemy.sql import Select, operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList, Grouping, Null
+
+from app.cache import WATERMARK_TTL
+from app.models import StatcastEvent, engine
+from app.watermark import read_watermark
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = os.getenv(
+    "COLUMNAR_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".columnar_store"),
+)
+STORE_VERSION = 1
+CURRENT_NAME = "CURRENT"
+MANIFEST_NAME = "manifest.json"
+# Finished generations kept on disk; older ones are deleted after an export
+KEEP_GENERATIONS = 2
+
+EPOCH = date(1970, 1, 1)
+FLOAT = "float"
+DATE = "date"
+DICTIONARY = "dictionary"
+_KINDS = {FLOAT: np.float64, DATE: np.int32, DICTIONARY: np.int32}
+
+
+def column_kinds() -> Dict[str, str]:
+    """Exported statcast_events columns (integer key columns are left to the database)."""
+    kinds = {}
+    for column in StatcastEvent.__table__.columns:
+        if isinstance(column.type, Float):
+            kinds[column.name] = FLOAT
+        elif isinstance(column.type, Date):
+            kinds[column.name] = DATE
+        elif isinstance(column.type, String):
+            kinds[column.name] = DICTIONARY
+    return kinds
+
+
+def database_name() -> str:
+    return engine.url.render_as_string(hide_password=True)
+
+
+def to_days(values) -> np.ndarray:
+    return (pd.to_datetime(pd.Series(values)).to_numpy(dtype="datetime64[D]") - np.datetime64(EPOCH, "D")).astype(np.int32)
+
+
+class _Encoder:
+    """Grows a string dictionary across export chunks."""
+    def __init__(self):
+        self.codes = {}
+
+    def encode(self, values: pd.Series) -> np.ndarray:
+        present = values.dropna()
+        for value in pd.unique(present):
+            self.codes.setdefault(value, len(self.codes))
+        return values.map(self.codes).fillna(-1).to_numpy(dtype=np.int32)
+
+    @property
+    def dictionary(self) -> list:
+        return list(self.codes)
+
+
+def write_current(directory: str, generation: str):
+    tmp_path = os.path.join(directory, CURRENT_NAME + ".tmp")
+    with open(tmp_path, "w") as f:
+        f.write(generation)
+    os.replace(tmp_path, os.path.join(directory, CURRENT_NAME))
+
+
+def read_current(directory: str) -> Optional[str]:
+    try:
+        with open(os.path.join(directory, CURRENT_NAME)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def export_store(directory: str = STORE_DIR) -> dict:
+    """
+    Write statcast_events to a new generation under directory, one season at a time, and make it
+    current. Returns the manifest. The load watermark is read first, so rows loaded during the
+    export leave the store marked stale until the next export.
+    """
+    started = time.perf_counter()
+    watermark = read_watermark()
+    kinds = column_kinds()
+    generation = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    path = os.path.join(directory, generation)
+    os.makedirs(path)
+    files = {name: open(os.path.join(path, f"{name}.bin"), "wb") for name in kinds}
+    encoders = {name: _Encoder() for name, kind in kinds.items() if kind == DICTIONARY}
+    rows = 0
+    try:
+        with engine.connect() as conn:
+            first, last = conn.execute(select(func.min(StatcastEvent.game_date), func.max(StatcastEvent.game_date))).one()
+            columns = [StatcastEvent.__table__.c[name] for name in kinds]
+            for season in range(first.year, last.year + 1) if first is not None else ():
+                statement = select(*columns).where(
+                    StatcastEvent.game_date >= date(season, 1, 1), StatcastEvent.game_date < date(season + 1, 1, 1)
+                )
+                df = pd.DataFrame.from_records(conn.execute(statement).all(), columns=list(kinds))
+                if df.empty:
+                    continue
+                days = to_days(df["game_date"])
+                order = np.argsort(days, kind="stable")
+                for name, kind in kinds.items():
+                    if kind == DATE:
+                        values = days
+                    elif kind == FLOAT:
+                        values = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64)
+                    else:
+                        values = encoders[name].encode(df[name])
+                    values[order].tofile(files[name])
+                rows += len(df)
+    finally:
+        for f in files.values():
+            f.close()
+
+    manifest = {
+        "version": STORE_VERSION,
+        "database": database_name(),
+        "watermark": watermark,
+        "rows": rows,
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+        "columns": {
+            name: {"kind": kind, **({"dictionary": encoders[name].dictionary} if kind == DICTIONARY else {})}
+            for name, kind in kinds.items()
+        },
+    }
+    with open(os.path.join(path, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f)
+    write_current(directory, generation)
+    remove_old_generations(directory, generation)
+    logger.info("Exported %d rows to columnar store %s in %.1fs", rows, path, time.perf_counter() - started)
+    return manifest
+
+
+def remove_old_generations(directory: str, current: str):
+    generations = sorted(name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name)))
+    # Open memory maps keep deleted files readable, so workers still on an old generation are unaffected
+    for name in generations[:-KEEP_GENERATIONS]:
+        if name != current:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+class Unsupported(Exception):
+    """The statement uses something the store cannot evaluate; run it on the database instead."""
+
+
+class StoreGeneration:
+    """One exported generation: read-only memory maps of every column."""
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            self.manifest = json.load(f)
+        if self.manifest["version"] != STORE_VERSION:
+            raise ValueError(f"Columnar store version {self.manifest['version']} is not {STORE_VERSION}")
+        self.rows = self.manifest["rows"]
+        self.watermark = self.manifest["watermark"]
+        self.kinds = {name: spec["kind"] for name, spec in self.manifest["columns"].items()}
+        self.columns = {
+            name: np.memmap(os.path.join(path, f"{name}.bin"), dtype=_KINDS[kind], mode="r", shape=(self.rows,))
+            if self.rows else np.empty(0, dtype=_KINDS[kind])
+            for name, kind in self.kinds.items()
+        }
+        # Dictionaries with None appended, so code -1 decodes to None
+        self.lookups = {
+            name: np.array(spec["dictionary"] + [None], dtype=object)
+            for name, spec in self.manifest["columns"].items() if spec["kind"] == DICTIONARY
+        }
+        self.codes = {name: {value: code for code, value in enumerate(spec["dictionary"])}
+                      for name, spec in self.manifest["columns"].items() if spec["kind"] == DICTIONARY}
+
+    def query(self, statement: Select) -> pd.DataFrame:
+        """Evaluate a plain select of statcast_events columns with simple predicates; raises Unsupported otherwise."""
+        table = StatcastEvent.__table__
+        if statement.get_final_froms() != [table] or statement._group_by_clauses or statement._order_by_clauses \
+                or statement._limit_clause is not None or statement._offset_clause is not None \
+                or statement._distinct or statement._having_criteria:
+            raise Unsupported("only plain selects from statcast_events")
+        names = []
+        for column in statement.selected_columns:
+            if getattr(column, "table", None) is not table or column.name not in self.kinds:
+                raise Unsupported(f"column {column}")
+            names.append(column.name)
+
+        conjuncts = []
+        if statement.whereclause is not None:
+            clause = _ungroup(statement.whereclause)
+            conjuncts = list(clause.clauses) if isinstance(clause, BooleanClauseList) and clause.operator is operators.and_ else [clause]
+        # Top-level game_date bounds become a binary search on the sorted date column
+        lo, hi = 0, self.rows
+        days = self.columns["game_date"]
+        rest = []
+        for clause in conjuncts:
+            clause = _ungroup(clause)
+            bound = self._date_bound(clause)
+            if bound is None:
+                rest.append(clause)
+                continue
+            op, day = bound
+            if op in (operators.ge, operators.gt, operators.eq):
+                lo = max(lo, int(np.searchsorted(days, day, side="left" if op is not operators.gt else "right")))
+            if op in (operators.le, operators.lt, operators.eq):
+                hi = min(hi, int(np.searchsorted(days, day, side="right" if op is not operators.lt else "left")))
+        hi = max(lo, hi)
+
+        mask = np.ones(hi - lo, dtype=bool)
+        for clause in rest:
+            mask &= self._mask(clause, lo, hi)
+        index = np.flatnonzero(mask) + lo
+        return pd.DataFrame({name: self._decode(name, index) for name in names}, columns=names)
+
+    def _date_bound(self, clause):
+        if isinstance(clause, BinaryExpression) and getattr(clause.left, "name", None) == "game_date" \
+                and clause.operator in (operators.ge, operators.gt, operators.le, operators.lt, operators.eq) \
+                and isinstance(clause.right, BindParameter) and isinstance(clause.right.effective_value, date):
+            return clause.operator, (clause.right.effective_value - EPOCH).days
+        return None
+
+    def _mask(self, clause, lo: int, hi: int) -> np.ndarray:
+        clause = _ungroup(clause)
+        if isinstance(clause, BooleanClauseList):
+            masks = [self._mask(item, lo, hi) for item in clause.clauses]
+            if clause.operator is operators.and_:
+                return np.logical_and.reduce(masks)
+            if clause.operator is operators.or_:
+                return np.logical_or.reduce(masks)
+            raise Unsupported(f"boolean operator {clause.operator}")
+        if not isinstance(clause, BinaryExpression) or getattr(clause.left, "table", None) is not StatcastEvent.__table__:
+            raise Unsupported(f"predicate {clause}")
+        name = clause.left.name
+        if name not in self.kinds:
+            raise Unsupported(f"column {name}")
+        values = self.columns[name][lo:hi]
+        kind = self.kinds[name]
+        op = clause.operator
+        present = values >= 0 if kind == DICTIONARY else ~np.isnan(values) if kind == FLOAT else np.ones(len(values), dtype=bool)
+        if op in (operators.is_, operators.is_not) and isinstance(clause.right, Null):
+            return ~present if op is operators.is_ else present
+        if not isinstance(clause.right, BindParameter):
+            raise Unsupported(f"predicate {clause}")
+        right = clause.right.effective_value
+        if op in (operators.in_op, operators.not_in_op):
+            targets = [self._encode_scalar(name, value) for value in right]
+            found = np.isin(values, [target for target in targets if target is not None])
+            return found if op is operators.in_op else present & ~found
+        target = self._encode_scalar(name, right)
+        if op is operators.eq:
+            return values == target if target is not None else np.zeros(len(values), dtype=bool)
+        if op is operators.ne:
+            return present & (values != target) if target is not None else present
+        if kind == DICTIONARY:
+            raise Unsupported("ordering comparison on a string column")
+        comparisons = {operators.gt: np.greater, operators.ge: np.greater_equal, operators.lt: np.less, operators.le: np.less_equal}
+        if op not in comparisons:
+            raise Unsupported(f"operator {op}")
+        return comparisons[op](values, target)
+
+    def _encode_scalar(self, name: str, value):
+        kind = self.kinds[name]
+        if kind == DICTIONARY:
+            return self.codes[name].get(value)
+        if kind == DATE:
+            if not isinstance(value, date):
+                value = datetime.strptime(str(value), "%Y-%m-%d").date()
+            return (value - EPOCH).days
+        return float(value)
+
+    def _decode(self, name: str, index: np.ndarray):
+        values = self.columns[name][index]
+        kind = self.kinds[name]
+        if kind == DICTIONARY:
+            return self.lookups[name][values]
+        if kind == DATE:
+            # Rows are sorted by date, so there are few distinct values to convert
+            unique, inverse = np.unique(values, return_inverse=True)
+            dates = np.array([EPOCH + timedelta(days=int(day)) for day in unique], dtype=object)
+            return dates[inverse]
+        return np.asarray(values)
+
+
+def _ungroup(clause):
+    while isinstance(clause, Grouping):
+        clause = clause.element
+    return clause
+
+
+class ColumnarStore:
+    """
+    The live generation under directory, served only while it was exported from this database and
+    its export watermark matches the load watermark (re-checked at most every watermark_ttl seconds).
+    """
+    def __init__(self, directory: str = STORE_DIR, watermark_reader=read_watermark, watermark_ttl: float = WATERMARK_TTL):
+        self.directory = directory
+        self.database = database_name()
+        self._read_watermark = watermark_reader
+        self.watermark_ttl = watermark_ttl
+        self._generation: Optional[StoreGeneration] = None
+        self._current = None
+        self._fresh = False
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[StoreGeneration]:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at >= self.watermark_ttl:
+                self._checked_at = now
+                name = read_current(self.directory)
+                if name is None:
+                    self._generation, self._current = None, None
+                elif name != self._current:
+                    try:
+                        self._generation = StoreGeneration(os.path.join(self.directory, name))
+                        self._current = name
+                    except (OSError, ValueError, KeyError):
+                        logger.exception("Error opening columnar store generation %s", name)
+                        self._generation, self._current = None, None
+                try:
+                    self._fresh = self._generation is not None and self._generation.manifest.get("database") == self.database \
+                        and self._generation.watermark == self._read_watermark()
+                except Exception:
+                    logger.exception("Error reading load watermark")
+                    self._fresh = False
+            return self._generation if self._fresh else None
+
+    def query(self, statement: Select) -> Optional[pd.DataFrame]:
+        """statement's rows from the store, or None when it is stale, missing or cannot evaluate statement."""
+        generation = self.current()
+        if generation is None:
+            return None
+        try:
+            return generation.query(statement)
+        except Unsupported as e:
+            logger.debug("Columnar store cannot serve statement (%s)", e)
+            return None
+
+    def status(self) -> dict:
+        generation = self.current()
+        return {
+            "directory": self.directory,
+            "generation": self._current,
+            "fresh": generation is not None,
+            "rows": generation.rows if generation is not None else None,
+            "watermark": generation.watermark if generation is not None else None,
+        }
+
+
+# Shared by the API process; opened lazily on first use
+columnar_store = ColumnarStore()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    manifest = export_store()
+    print(f"Exported {manifest['rows']} rows (watermark {manifest['watermark']}) to {STORE_DIR}")
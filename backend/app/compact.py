@@ -0,0 +1,106 @@
+from datetime import date, datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Dates held as int32 days since 1970-01-01 (Arrow date32), one quarter the size of date objects
+DATE32 = pd.ArrowDtype(pa.date32())
+# Strings are dictionary-encoded only when they repeat; unique-ish columns stay as they are
+MAX_CATEGORY_RATIO = 0.5
+# Leading rows checked on their own before a float column is checked in full
+SAMPLE_ROWS = 1024
+
+
+def _is_date_column(series: pd.Series) -> bool:
+    first = series.first_valid_index()
+    return first is not None and isinstance(series[first], date) and not isinstance(series[first], datetime)
+
+
+def _float32_exact(values: np.ndarray) -> bool:
+    """Whether float64 values are served unchanged from float32 (see widen_float32)."""
+    # Derived values usually fail within the first few rows, before the whole column is converted
+    for part in (values[:SAMPLE_ROWS], values):
+        if not np.array_equal(widen_float32(part.astype(np.float32)), part, equal_nan=True):
+            return False
+    return True
+
+
+def compact_column(series: pd.Series) -> Optional[pd.Series]:
+    """series as float32, date32 or categorical when that is smaller and serves the same values, else None."""
+    dtype = series.dtype
+    if dtype == np.float64:
+        # Measurements with a few decimals fit; derived values (drag_coefficient, ...) keep every digit
+        return series.astype(np.float32) if _float32_exact(series.to_numpy()) else None
+    if dtype == object and _is_date_column(series):
+        return pd.Series(pa.array(series.to_numpy(), type=pa.date32(), from_pandas=True), index=series.index,
+                         dtype=DATE32, name=series.name)
+    if dtype == object or isinstance(dtype, pd.StringDtype):
+        codes, uniques = pd.factorize(series)
+        if len(uniques) <= max(1, len(series) * MAX_CATEGORY_RATIO):
+            return pd.Series(pd.Categorical.from_codes(codes, categories=uniques), index=series.index, name=series.name)
+    return None
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    df with float32 numbers where that loses nothing, date32 dates and dictionary-encoded strings, for
+    holding in memory. Returns df itself when it is already compact, so compacting twice costs nothing.
+    """
+    changed = {}
+    for name in df.columns:
+        column = compact_column(df[name])
+        if column is not None:
+            changed[name] = column
+    if not changed:
+        return df
+    return df.assign(**changed)
+
+
+def compact_value(value):
+    """Compact the DataFrames in a cached value (a frame or a tuple starting with one)."""
+    if isinstance(value, pd.DataFrame):
+        return compact_frame(value)
+    if isinstance(value, tuple) and any(isinstance(item, pd.DataFrame) for item in value):
+        return tuple(compact_value(item) for item in value)
+    return value
+
+
+def widen_float32(values: np.ndarray) -> np.ndarray:
+    """
+    float32 values as float64, rounded to the 7 significant digits float32 holds, so a stored 86.3
+    is served as 86.3 rather than 86.30000305175781. NaN and inf pass through.
+    """
+    wide = values.astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        digits = np.clip(6 - np.floor(np.log10(np.abs(wide))), 0, 22)
+    scale = 10.0 ** np.nan_to_num(digits, nan=0.0, posinf=0.0, neginf=0.0)
+    finite = np.isfinite(wide)
+    wide[finite] = np.round(wide[finite] * scale[finite]) / scale[finite]
+    return wide
+
+
+def date32_days(series: pd.Series) -> np.ndarray:
+    """A DATE32 series as datetime64[D], NaT where missing; reads the int32 days without per-row objects."""
+    array = pa.array(series)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    days = array.cast(pa.int32()).fill_null(0).to_numpy().astype("datetime64[D]")
+    days[array.is_null().to_numpy(zero_copy_only=False)] = np.datetime64("NaT")
+    return days
+
+
+def expand_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """df with compact columns back in their usual dtypes (float64, date objects, strings)."""
+    changed = {}
+    for name in df.columns:
+        series = df[name]
+        if series.dtype == np.float32:
+            changed[name] = pd.Series(widen_float32(series.to_numpy()), index=df.index)
+        elif series.dtype == DATE32:
+            # datetime64[D] converts to datetime.date objects, and NaT to None
+            changed[name] = pd.Series(date32_days(series).astype(object), index=df.index, dtype=object)
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            changed[name] = series.astype(series.cat.categories.dtype)
+    return df.assign(**changed) if changed else df
@@ -0,0 +1,23 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.models import DB_POOL_SIZE
+
+# Threads for pandas/NumPy post-processing and serialization; most of that work releases the GIL
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(min(8, os.cpu_count() or 4))))
+# Concurrent raw-event queries; the rest of the pool stays free for cheap endpoints
+HEAVY_QUERY_SLOTS = int(os.getenv("HEAVY_QUERY_SLOTS", str(max(1, DB_POOL_SIZE - 2))))
+
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="deadball-cpu")
+heavy_queries = asyncio.Semaphore(HEAVY_QUERY_SLOTS)
+
+
+async def run_cpu(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run func on the bounded CPU executor without blocking the event loop (context vars carry over)."""
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(cpu_executor, call)
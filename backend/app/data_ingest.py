@@ -1,18 +1,146 @@
-from pybaseball import statcast
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Optional, Tuple
 import pandas as pd
 
-def fetch_statcast_data(start_date: str, end_date: str) -> pd.DataFrame:
-    """Fetch Statcast data for the given date range."""
-    try:
-        data = statcast(start_dt=start_date, end_dt=end_date)
-        if data is None or data.empty:
+# On-disk cache of fetched data; one Parquet file per game date plus a manifest
+CACHE_DIR = os.getenv("STATCAST_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".statcast_cache"))
+WINDOW_DAYS = int(os.getenv("STATCAST_WINDOW_DAYS", "7"))
+MAX_WORKERS = int(os.getenv("STATCAST_MAX_WORKERS", "4"))
+MANIFEST_NAME = "manifest.json"
+
+Fetcher = Callable[[str, str], Optional[pd.DataFrame]]
+Window = Tuple[date, date]
+
+
+class StatcastFetchError(RuntimeError):
+    """Raised when some windows could not be fetched; completed windows stay cached for the next run."""
+    def __init__(self, failures: dict):
+        self.failures = failures
+        details = "; ".join(f"{start}..{end}: {err}" for (start, end), err in sorted(failures.items()))
+        super().__init__(f"{len(failures)} Statcast window(s) failed: {details}")
+
+
+def _pybaseball_fetcher(start_dt: str, end_dt: str) -> Optional[pd.DataFrame]:
+    from pybaseball import statcast
+    # Windows are already fetched in parallel here, so keep pybaseball single-threaded and quiet
+    return statcast(start_dt=start_dt, end_dt=end_dt, verbose=False, parallel=False)
+
+
+def _parse_date(value) -> date:
+    return value if isinstance(value, date) else datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def split_windows(days: List[date], window_days: int = WINDOW_DAYS) -> List[Window]:
+    """Group sorted days into inclusive windows of consecutive days, each at most window_days long."""
+    windows = []
+    for day in days:
+        if windows and day == windows[-1][1] + timedelta(days=1) and (day - windows[-1][0]).days < window_days:
+            windows[-1] = (windows[-1][0], day)
+        else:
+            windows.append((day, day))
+    return windows
+
+
+class FetchManifest:
+    """Records which game dates are already cached on disk so an interrupted backfill can resume."""
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self.days = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.days = json.load(f).get("days", {})
+
+    def file_for(self, day: date) -> str:
+        return os.path.join(self.cache_dir, f"statcast_{day.isoformat()}.parquet")
+
+    def is_complete(self, day: date) -> bool:
+        entry = self.days.get(day.isoformat())
+        return entry is not None and (entry["rows"] == 0 or os.path.exists(self.file_for(day)))
+
+    def save_day(self, day: date, data: pd.DataFrame):
+        if not data.empty:
+            tmp_path = self.file_for(day) + ".tmp"
+            data.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self.file_for(day))
+        with self._lock:
+            self.days[day.isoformat()] = {"rows": len(data), "fetched_at": datetime.now().isoformat(timespec="seconds")}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"days": self.days}, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+    def read(self, day: date) -> pd.DataFrame:
+        if self.days[day.isoformat()]["rows"] == 0:
             return pd.DataFrame()
-        return data
-    except Exception as e:
-        print(f"Error fetching Statcast data: {e}")
+        return pd.read_parquet(self.file_for(day))
+
+
+def _fetch_window(window: Window, fetcher: Fetcher, manifest: FetchManifest) -> pd.DataFrame:
+    data = fetcher(window[0].isoformat(), window[1].isoformat())
+    if data is None:
+        data = pd.DataFrame()
+    # Persist each finished day; days reaching today are left uncached because they can still change
+    game_dates = pd.to_datetime(data["game_date"]).dt.date if not data.empty else pd.Series(dtype=object)
+    day = window[0]
+    while day <= window[1] and day < date.today():
+        manifest.save_day(day, data[game_dates == day].reset_index(drop=True) if not data.empty else data)
+        day += timedelta(days=1)
+    return data
+
+
+def fetch_statcast_data(
+    start_date: str,
+    end_date: str,
+    window_days: int = WINDOW_DAYS,
+    max_workers: int = MAX_WORKERS,
+    cache_dir: str = CACHE_DIR,
+    fetcher: Optional[Fetcher] = None,
+) -> pd.DataFrame:
+    """
+    Fetch Statcast data for the given date range.
+    Uncached days are grouped into windows of up to window_days days and fetched on a bounded
+    thread pool. Each finished day is cached as Parquet and recorded in a manifest, so later or
+    interrupted runs only fetch what is missing. Pass fetcher to replace pybaseball, e.g. in tests.
+    Raises StatcastFetchError after all windows were attempted if any of them failed.
+    """
+    fetcher = fetcher or _pybaseball_fetcher
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = FetchManifest(cache_dir)
+
+    start, end = _parse_date(start_date), _parse_date(end_date)
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    cached = [day for day in days if manifest.is_complete(day)]
+    windows = split_windows([day for day in days if not manifest.is_complete(day)], window_days)
+    if len(days) > 1:
+        print(f"Statcast: {len(cached)} of {len(days)} days cached, fetching {len(windows)} window(s)...")
+
+    parts = [manifest.read(day) for day in cached]
+    failures = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {pool.submit(_fetch_window, window, fetcher, manifest): window for window in windows}
+        for future in as_completed(futures):
+            window = futures[future]
+            try:
+                parts.append(future.result())
+            except Exception as e:
+                print(f"Error fetching Statcast data for {window[0]}..{window[1]}: {e}")
+                failures[window] = e
+    if failures:
+        raise StatcastFetchError(failures)
+
+    parts = [part for part in parts if not part.empty]
+    if not parts:
         return pd.DataFrame()
+    df = pd.concat(parts, ignore_index=True)
+    return df.sort_values("game_date", kind="stable", ignore_index=True)
 
 if __name__ == "__main__":
     # Example: fetch April 2023 data
     df = fetch_statcast_data("2023-04-01", "2023-04-30")
-    print(df.head()) 
\ No newline at end of file
+    print(df.head())
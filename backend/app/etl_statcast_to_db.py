@@ -1,53 +1,43 @@
-import pandas as pd
-from datetime import datetime
-from sqlalchemy.orm import Session
-from app.models import StatcastEvent, engine, Base
-from app.analytics import estimate_drag_coefficient
-from app.data_ingest import fetch_statcast_data
-
-# Define the columns to keep
-COLUMNS_TO_KEEP = [
-    'game_date', 'events', 'launch_speed', 'launch_angle', 'hit_distance_sc',
-    'pitch_type', 'release_speed', 'hc_x', 'hc_y', 'bb_type', 'home_team', 'stadium'
-]
+import logging
+import sys
+from app.data_ingest import CACHE_DIR, fetch_statcast_data
+from app.columnar import export_store
+from app.loader import prepare_events, load_events
+from app.schema import upgrade_schema
 
 # For testing: Only fetch all of 2015
 START_DATE = "2025-01-01"
 END_DATE = "2025-7-15"
 
-if __name__ == "__main__":
-    print(f"Fetching Statcast data from {START_DATE} to {END_DATE}...")
-    df = fetch_statcast_data(START_DATE, END_DATE)
+
+def main(start_date: str = START_DATE, end_date: str = END_DATE, fetcher=None, cache_dir: str = CACHE_DIR) -> int:
+    """Backfill [start_date, end_date]; returns the number of new rows. fetcher/cache_dir are for benchmarks and tests."""
+    print(f"Fetching Statcast data from {start_date} to {end_date}...")
+    df = fetch_statcast_data(start_date, end_date, fetcher=fetcher, cache_dir=cache_dir)
     if df.empty:
         print("No data fetched.")
-        exit(1)
+        return -1
     print(f"Fetched {len(df)} rows.")
 
-    # Only keep relevant columns (if present)
-    available_cols = [col for col in COLUMNS_TO_KEEP if col in df.columns]
-    df = df[available_cols]
-
     # Only keep batted balls (i.e., rows with a bb_type)
     df = df[df['bb_type'].notnull()]
 
-    # Calculate drag coefficient
-    df = estimate_drag_coefficient(df)
+    # Select columns, calculate drag coefficient and normalize types
+    df = prepare_events(df)
 
-    # Fill missing columns with None
-    for col in COLUMNS_TO_KEEP + ['drag_coefficient']:
-        if col not in df.columns:
-            df[col] = None
+    # Bulk load; rows already in the database are skipped
+    print(f"Loading {len(df)} records into the database...")
+    upgrade_schema()
+    inserted = load_events(df)
+    print(f"Inserted {inserted} new records.")
+    if inserted:
+        manifest = export_store()
+        print(f"Exported {manifest['rows']} rows to the columnar store.")
+    print("Done!")
+    return inserted
 
-    # Convert game_date to datetime.date
-    df['game_date'] = pd.to_datetime(df['game_date']).dt.date
 
-    # Prepare records for insertion
-    records = df.to_dict(orient='records')
-
-    # Insert into DB (bulk insert for speed)
-    print(f"Inserting {len(records)} records into the database (bulk insert)...")
-    Base.metadata.create_all(engine)
-    with Session(engine) as session:
-        session.bulk_insert_mappings(StatcastEvent, records)
-        session.commit()
-    print("Done!") 
\ No newline at end of file
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if main() < 0:
+        sys.exit(1)
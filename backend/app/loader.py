@@ -0,0 +1,189 @@
+import io
+from datetime import date
+from typing import Callable
+import pandas as pd
+from sqlalchemy import Table, bindparam, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from app.models import StatcastEvent, NATURAL_KEY, engine
+from app.analytics import add_derived_columns, estimate_drag_coefficient
+from app.rollups import refresh_daily_rollup, refresh_drag_sketches
+from app.schema import ensure_season_partitions
+from app.watermark import bump_watermark
+
+# Statcast columns stored in statcast_events
+COLUMNS_TO_KEEP = [
+    'game_date', 'game_pk', 'at_bat_number', 'pitch_number',
+    'events', 'launch_speed', 'launch_angle', 'hit_distance_sc',
+    'pitch_type', 'release_speed', 'hc_x', 'hc_y', 'bb_type', 'home_team', 'stadium'
+]
+# Computed by prepare_events
+DERIVED_COLUMNS = ['drag_coefficient', 'expected_distance', 'spray_angle']
+LOAD_COLUMNS = COLUMNS_TO_KEEP + DERIVED_COLUMNS
+INTEGER_COLUMNS = ['game_pk', 'at_bat_number', 'pitch_number']
+
+BATCH_SIZE = 50000
+# Databases load_events has a bulk insert path for
+SUPPORTED_DIALECTS = ("postgresql", "sqlite")
+STAGING_TABLE = "statcast_events_staging"
+DRAG_STAGING_TABLE = "statcast_drag_staging"
+# Inputs estimate_drag_coefficient needs, plus the columns that locate the row
+DRAG_INPUTS = ['id', 'game_date', 'launch_speed', 'launch_angle', 'hit_distance_sc']
+
+
+def prepare_events(df: pd.DataFrame) -> pd.DataFrame:
+    """Trim raw Statcast rows to the stored columns, add the derived columns and normalize types."""
+    available_cols = [col for col in COLUMNS_TO_KEEP if col in df.columns]
+    df = estimate_drag_coefficient(df[available_cols], verbose=True)
+
+    # Fill missing columns with None
+    for col in LOAD_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+    df = add_derived_columns(df)
+
+    df['game_date'] = pd.to_datetime(df['game_date']).dt.date
+    for col in INTEGER_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+
+    # Rows without a natural key can't be deduplicated, so they are not loaded
+    keyed = df[list(NATURAL_KEY)].notna().all(axis=1)
+    if not keyed.all():
+        print(f"Skipping {int((~keyed).sum())} rows with no game_pk/at_bat_number/pitch_number.")
+    return df.loc[keyed, LOAD_COLUMNS].reset_index(drop=True)
+
+
+def _copy_insert(conn: Connection, batch: pd.DataFrame) -> int:
+    """PostgreSQL: COPY the batch into a temp staging table, then insert the rows that are new."""
+    cols = ", ".join(LOAD_COLUMNS)
+    conn.exec_driver_sql(
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} AS "
+        f"SELECT {cols} FROM {StatcastEvent.__tablename__} WITH NO DATA"
+    )
+    conn.exec_driver_sql(f"TRUNCATE {STAGING_TABLE}")
+    buf = io.StringIO()
+    batch.to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    with conn.connection.cursor() as cur:
+        cur.copy_expert(f"COPY {STAGING_TABLE} ({cols}) FROM STDIN WITH (FORMAT csv)", buf)
+    result = conn.exec_driver_sql(
+        f"INSERT INTO {StatcastEvent.__tablename__} ({cols}) "
+        f"SELECT {cols} FROM {STAGING_TABLE} "
+        f"ON CONFLICT ({', '.join(NATURAL_KEY)}) DO NOTHING"
+    )
+    return result.rowcount
+
+
+def _insert_ignore(conn: Connection, batch: pd.DataFrame, insert) -> int:
+    """Portable path (SQLite, non-psycopg2 PostgreSQL): executemany INSERT ... ON CONFLICT DO NOTHING."""
+    table: Table = StatcastEvent.__table__
+    records = batch.astype(object).where(batch.notna(), None).to_dict(orient='records')
+    statement = insert(table).on_conflict_do_nothing(index_elements=list(NATURAL_KEY))
+    return conn.execute(statement, records).rowcount
+
+
+def _bulk_inserter() -> Callable[[Connection, pd.DataFrame], int]:
+    """The insert-or-skip path for the configured database; ValueError for one without a bulk loader."""
+    dialect = engine.dialect.name
+    if dialect == "postgresql" and engine.driver == "psycopg2":
+        return _copy_insert
+    if dialect == "postgresql":
+        return lambda conn, batch: _insert_ignore(conn, batch, pg_insert)
+    if dialect == "sqlite":
+        return lambda conn, batch: _insert_ignore(conn, batch, sqlite_insert)
+    raise ValueError(f"No bulk loader for database dialect '{dialect}'; supported: {', '.join(SUPPORTED_DIALECTS)}")
+
+
+def load_events(df: pd.DataFrame, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Idempotently load prepared events (see prepare_events), refresh the daily rollups and bump the watermark.
+    Rows whose natural key already exists are skipped, so overlapping backfills are safe.
+    Returns the number of rows inserted.
+    """
+    # Fail before any work is done, not inside the transaction
+    insert_batch = _bulk_inserter()
+    if df.empty:
+        return 0
+    inserted = 0
+    with engine.begin() as conn:
+        ensure_season_partitions(conn, pd.to_datetime(df['game_date']).dt.year.unique())
+        for start in range(0, len(df), batch_size):
+            batch = df.iloc[start:start + batch_size]
+            inserted += insert_batch(conn, batch)
+            print(f"Loaded batch {start // batch_size + 1}: {min(start + batch_size, len(df))}/{len(df)} rows")
+        # Refresh the daily rollup and drag sketches for just the dates we loaded
+        refresh_daily_rollup(conn, df['game_date'].min(), df['game_date'].max())
+        refresh_drag_sketches(conn, df['game_date'].min(), df['game_date'].max())
+        # Let API caches know the data changed
+        if inserted:
+            bump_watermark(conn, df['game_date'].max(), df['game_date'].min())
+    return inserted
+
+
+def _copy_update_drag(conn: Connection, batch: pd.DataFrame) -> int:
+    """PostgreSQL: COPY (id, game_date, drag_coefficient) into a temp table and update from it in one statement."""
+    conn.exec_driver_sql(
+        f"CREATE TEMP TABLE IF NOT EXISTS {DRAG_STAGING_TABLE} "
+        "(id integer, game_date date, drag_coefficient double precision)"
+    )
+    conn.exec_driver_sql(f"TRUNCATE {DRAG_STAGING_TABLE}")
+    buf = io.StringIO()
+    batch[['id', 'game_date', 'drag_coefficient']].to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    with conn.connection.cursor() as cur:
+        cur.copy_expert(f"COPY {DRAG_STAGING_TABLE} FROM STDIN WITH (FORMAT csv)", buf)
+    # game_date lets PostgreSQL prune to the season partition
+    result = conn.exec_driver_sql(
+        f"UPDATE {StatcastEvent.__tablename__} e SET drag_coefficient = s.drag_coefficient "
+        f"FROM {DRAG_STAGING_TABLE} s WHERE e.id = s.id AND e.game_date = s.game_date"
+    )
+    return result.rowcount
+
+
+def _update_drag(conn: Connection, batch: pd.DataFrame) -> int:
+    """Portable path: executemany UPDATE by id."""
+    table: Table = StatcastEvent.__table__
+    records = [
+        {"row_id": int(row_id), "cd": None if pd.isna(cd) else float(cd)}
+        for row_id, cd in zip(batch['id'], batch['drag_coefficient'])
+    ]
+    statement = update(table).where(table.c.id == bindparam("row_id")).values(drag_coefficient=bindparam("cd"))
+    return conn.execute(statement, records).rowcount
+
+
+def recompute_drag_coefficients(start_dt: date, end_dt: date, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Re-solve drag_coefficient for stored events with game dates in [start_dt, end_dt] using the current
+    estimate_drag_coefficient, then rebuild the daily rollups and drag sketches for those dates and bump
+    the watermark. Each season is one transaction, so an interrupted run can be repeated for the rest.
+    Returns the number of rows updated.
+    """
+    updated = 0
+    copy = engine.dialect.name == "postgresql" and engine.driver == "psycopg2"
+    for season in range(start_dt.year, end_dt.year + 1):
+        season_start, season_end = max(start_dt, date(season, 1, 1)), min(end_dt, date(season, 12, 31))
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(*(getattr(StatcastEvent, col) for col in DRAG_INPUTS)).where(
+                    StatcastEvent.game_date >= season_start,
+                    StatcastEvent.game_date <= season_end,
+                    # Rows the estimator can solve, and rows holding a value it may no longer give
+                    or_(
+                        StatcastEvent.drag_coefficient.isnot(None),
+                        StatcastEvent.launch_speed.isnot(None) & StatcastEvent.launch_angle.isnot(None) &
+                        StatcastEvent.hit_distance_sc.isnot(None),
+                    ),
+                )
+            ).all()
+            if not rows:
+                continue
+            df = estimate_drag_coefficient(pd.DataFrame.from_records(rows, columns=DRAG_INPUTS), verbose=True)
+            for start in range(0, len(df), batch_size):
+                batch = df.iloc[start:start + batch_size]
+                updated += _copy_update_drag(conn, batch) if copy else _update_drag(conn, batch)
+            refresh_daily_rollup(conn, season_start, season_end)
+            refresh_drag_sketches(conn, season_start, season_end)
+            bump_watermark(conn, df['game_date'].max(), df['game_date'].min())
+            print(f"Recomputed {len(df)} drag coefficients from {season_start} to {season_end}")
+    return updated
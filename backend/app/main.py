@@ -1,6 +1,19 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import time
+from datetime import datetime
+from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from .api import endpoints
+from .cache import WATERMARK_TTL, ResponseCache
+from .concurrency import run_cpu
+from .metrics import PROMETHEUS_MEDIA_TYPE, MetricsMiddleware, install_query_hooks, render_metrics
+from .models import async_engine, engine
+from .shared import SharedDataset
+from .xhr import load_model
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Deadball Tracker API")
 
@@ -14,26 +27,118 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Deadball-Rows", "X-Deadball-Queries", "X-Deadball-Cache"],
 )
+# Outermost, so it sees the full request including CORS handling
+app.add_middleware(MetricsMiddleware)
+install_query_hooks(engine)
+install_query_hooks(async_engine.sync_engine)
+
+# Parameter-keyed results for every read endpoint, invalidated by the load watermark
+app.state.CACHE = ResponseCache()
+# Full-history /exit_velocity_distance data, persisted so restarts and refreshes only fetch new rows
+app.state.DATASET = endpoints.exit_velocity_distance_dataset()
+# Progress of the background warm-up; the API reports ready once one has succeeded
+app.state.WARMUP = {"ready": False, "state": "pending"}
+app.state.REFRESH_TASK = None
+# Whether REFRESH_TASK ends with a full rebuild
+app.state.REFRESH_FULL = False
+app.state.FOLLOW_TASK = None
+# Compiled xHR grid, read from its artifact once at startup (None until one has been trained)
+app.state.XHR_MODEL = None
+
+async def refresh_cache(full: bool = False):
+    warmup = app.state.WARMUP
+    warmup.update(state="running", full=full, started_at=datetime.now().isoformat(timespec="seconds"), error=None)
+    started = time.perf_counter()
+    try:
+        dataset = await endpoints.warm_cache(app.state.CACHE, app.state.DATASET, full)
+    except Exception as e:
+        logger.exception("Error warming cache")
+        warmup.update(state="failed", error=str(e))
+    else:
+        warmup.update(state="done", ready=True, seconds=round(time.perf_counter() - started, 3), dataset=dataset)
+
+async def refresh_cache_after(previous: asyncio.Task, full: bool):
+    await previous
+    await refresh_cache(full)
 
-app.state.CACHE = {}
+def start_refresh(full: bool = False) -> asyncio.Task:
+    """
+    Run refresh_cache in the background and return its task. A request made while one is running
+    joins it, except that a full refresh behind an incremental one is queued to run after it.
+    """
+    task = app.state.REFRESH_TASK
+    if task is None or task.done():
+        task = app.state.REFRESH_TASK = asyncio.create_task(refresh_cache(full))
+        app.state.REFRESH_FULL = full
+    elif full and not app.state.REFRESH_FULL:
+        task = app.state.REFRESH_TASK = asyncio.create_task(refresh_cache_after(task, full))
+        app.state.REFRESH_FULL = True
+    return task
 
-def refresh_cache():
-    from .api.endpoints import fetch_exit_velocity_distance_data
-    app.state.CACHE["exit_velocity_distance"] = fetch_exit_velocity_distance_data("2015-01-01", None)
-    # Add more as needed
+async def follow_shared_dataset():
+    """Shared dataset mode: every CACHE_WATERMARK_TTL seconds, rebuild (loader) or re-attach (other workers) on change."""
+    dataset = app.state.DATASET
+    while True:
+        await asyncio.sleep(WATERMARK_TTL)
+        try:
+            if await dataset.poll():
+                # Entries were computed from the previous generation
+                app.state.CACHE.clear()
+                start_refresh()
+        except Exception:
+            logger.exception("Error following the shared dataset")
 
 @app.on_event("startup")
-def load_data():
-    refresh_cache()
+async def load_data():
+    app.state.XHR_MODEL = await run_cpu(load_model)
+    # Accept traffic right away; /ready turns 200 once the warm-up finishes
+    start_refresh()
+    if isinstance(app.state.DATASET, SharedDataset):
+        app.state.FOLLOW_TASK = asyncio.create_task(follow_shared_dataset())
+
+@app.on_event("shutdown")
+async def dispose_engine():
+    for task in (app.state.REFRESH_TASK, app.state.FOLLOW_TASK):
+        if task is not None and not task.done():
+            task.cancel()
+    await async_engine.dispose()
+
+@app.get("/ready")
+async def readiness():
+    """Readiness probe: 503 until the first cache warm-up has completed."""
+    return JSONResponse(status_code=200 if app.state.WARMUP["ready"] else 503, content=app.state.WARMUP)
 
 @app.get("/refresh_cache")
-def refresh_cache_endpoint():
-    refresh_cache()
-    return {"status": "Cache refreshed"}
+async def refresh_cache_endpoint(
+    full: bool = Query(False, description="Rebuild from the database instead of fetching only rows newer than the snapshot"),
+    wait: bool = Query(False, description="Respond when the refresh has finished instead of right away")
+):
+    running = app.state.REFRESH_TASK
+    task = start_refresh(full)
+    if wait:
+        await asyncio.shield(task)
+        return {"status": "Cache refreshed", **app.state.WARMUP, "cache": app.state.CACHE.stats()}
+    if running is not None and not running.done():
+        status = "Full cache refresh queued" if task is not running else "Cache refresh already running"
+    else:
+        status = "Cache refresh started"
+    return JSONResponse(status_code=202, content={"status": status, **app.state.WARMUP})
+
+@app.get("/cache_stats")
+async def cache_stats():
+    """Response cache totals plus each entry's estimated memory footprint, largest first."""
+    cache = app.state.CACHE
+    return {"summary": cache.stats(), "entries": cache.entries()}
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text exposition of request, phase, query, row, byte and cache metrics."""
+    return Response(content=render_metrics(), media_type=PROMETHEUS_MEDIA_TYPE)
 
 app.include_router(endpoints.router)
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Welcome to the Deadball Tracker API!"} 
\ No newline at end of file
@@ -0,0 +1,249 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Opt-in per-request profiling: send this header to get Server-Timing and row/cache headers back
+PROFILE_HEADER = "x-deadball-profile"
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PHASES = ("query", "transform", "serialize")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, labels)} {value:g}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def replace(self, values: dict):
+        """Set every series at once; series missing from values are dropped."""
+        with self._lock:
+            self._values = dict(values)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, labels)} {value:.17g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            counts, total = self._series.get(labels, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._series[labels] = (counts, total + value)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    bucket_labels = _label_text(self.labels, labels, 'le="' + le + '"')
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_label_text(self.labels, labels)} {total:g}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, labels)} {cumulative}")
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    "deadball_request_duration_seconds", "End-to-end request latency.", ("route", "method", "status")
+)
+PHASE_DURATION = Histogram(
+    "deadball_request_phase_seconds", "Request time spent per phase (query, transform, serialize).", ("route", "phase")
+)
+QUERY_DURATION = Histogram("deadball_db_query_duration_seconds", "Latency of individual SQL statements.", ("route",))
+ROWS = Counter("deadball_response_rows_total", "Rows returned by tabular endpoints.", ("route",))
+RESPONSE_BYTES = Counter("deadball_response_bytes_total", "Response body bytes sent.", ("route",))
+CACHE_RESULTS = Counter("deadball_cache_requests_total", "Response cache lookups by result.", ("route", "result"))
+CACHE_BYTES = Gauge("deadball_cache_bytes", "Estimated memory held by response cache entries, by route.", ("route",))
+CACHE_ENTRIES = Gauge("deadball_cache_entries", "Response cache entries, by route.", ("route",))
+REGISTRY = (REQUEST_DURATION, PHASE_DURATION, QUERY_DURATION, ROWS, RESPONSE_BYTES, CACHE_RESULTS, CACHE_BYTES, CACHE_ENTRIES)
+
+
+class RequestMetrics:
+    """Measurements collected while one request is handled."""
+    def __init__(self):
+        self.phases = {}
+        self.query_times = []
+        self.rows = None
+        self.cache = None
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("deadball_request_metrics", default=None)
+
+
+@contextmanager
+def phase(name: str):
+    """Time a block as one request phase; SQL time inside it is counted as query, not name."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    query_before = metrics.phases.get("query", 0.0)
+    try:
+        yield
+    finally:
+        query_inside = metrics.phases.get("query", 0.0) - query_before
+        metrics.add(name, max(0.0, time.perf_counter() - started - query_inside))
+
+
+def record_rows(count: int):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.rows = (metrics.rows or 0) + int(count)
+
+
+def record_cache(result: str):
+    """result is hit, miss or revalidated (answered 304 without a lookup)."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache = result
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("deadball_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["deadball_query_start"].pop()
+    metrics = _current.get()
+    if metrics is not None:
+        elapsed = time.perf_counter() - started
+        metrics.add("query", elapsed)
+        metrics.query_times.append(elapsed)
+
+
+def install_query_hooks(engine: Engine):
+    """Attribute SQL execution time on engine to the request being served."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _server_timing(metrics: RequestMetrics, total: float) -> str:
+    parts = [f"{name};dur={metrics.phases.get(name, 0.0) * 1000:.1f}" for name in PHASES]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, phase breakdown, rows, bytes and cache results.
+    Requests carrying the X-Deadball-Profile header also get Server-Timing, X-Deadball-Rows,
+    X-Deadball-Queries and X-Deadball-Cache response headers.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        profile = any(name.decode("latin-1").lower() == PROFILE_HEADER for name, _ in scope.get("headers", []))
+        status = {"code": 500}
+        sent = {"bytes": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if profile:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(metrics, time.perf_counter() - started).encode()))
+                    headers.append((b"x-deadball-queries", str(len(metrics.query_times)).encode()))
+                    if metrics.rows is not None:
+                        headers.append((b"x-deadball-rows", str(metrics.rows).encode()))
+                    if metrics.cache is not None:
+                        headers.append((b"x-deadball-cache", metrics.cache.encode()))
+                    message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                sent["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._observe(scope, metrics, status["code"], sent["bytes"], time.perf_counter() - started)
+
+    @staticmethod
+    def _observe(scope, metrics: RequestMetrics, status: int, nbytes: int, total: float):
+        route = getattr(scope.get("route"), "path", None) or "unmatched"
+        REQUEST_DURATION.observe((route, scope["method"], str(status)), total)
+        for name in PHASES:
+            if name in metrics.phases:
+                PHASE_DURATION.observe((route, name), metrics.phases[name])
+        for elapsed in metrics.query_times:
+            QUERY_DURATION.observe((route,), elapsed)
+        if metrics.rows is not None:
+            ROWS.inc((route,), metrics.rows)
+        RESPONSE_BYTES.inc((route,), nbytes)
+        if metrics.cache is not None:
+            CACHE_RESULTS.inc((route, metrics.cache))
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -1,5 +1,7 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, Float, String, Date
+from sqlalchemy import create_engine, make_url, Column, Integer, Float, String, Date, DateTime, Index, LargeBinary, UniqueConstraint, text
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -8,14 +10,65 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Connection pool per engine (ignored by SQLite, which keeps its default pool)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Server-side limit on API statements (PostgreSQL only); 0 disables it. The ETL's sync engine has none.
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "60000"))
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def pool_options(url: URL) -> dict:
+    if url.get_backend_name() == "sqlite":
+        return {}
+    return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT, "pool_pre_ping": True}
+
+
+def async_url(url: URL) -> URL:
+    """The same database through its asyncio driver (asyncpg, aiosqlite)."""
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def create_api_engine(url: URL):
+    """Async engine used by the API request handlers."""
+    url = async_url(url)
+    options = pool_options(url)
+    if url.get_backend_name() == "postgresql" and DB_STATEMENT_TIMEOUT_MS > 0:
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+    return create_async_engine(url, **options)
+
+
+engine = create_engine(DATABASE_URL, **pool_options(make_url(DATABASE_URL)))
+async_engine = create_api_engine(make_url(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# One Statcast pitch is identified by its game, plate appearance and pitch number.
+# game_date is included so the key stays valid on a table partitioned by date.
+NATURAL_KEY = ("game_date", "game_pk", "at_bat_number", "pitch_number")
+
 class StatcastEvent(Base):
     __tablename__ = "statcast_events"
-    id = Column(Integer, primary_key=True, index=True)
-    game_date = Column(Date)
+    # Indexes mirror the endpoint filters; see migrations/versions/0002 (which also partitions by season)
+    __table_args__ = (
+        UniqueConstraint(*NATURAL_KEY, name="uq_statcast_events_natural_key"),
+        Index("ix_statcast_events_game_date_drag", "game_date",
+              postgresql_where=text("drag_coefficient IS NOT NULL"), sqlite_where=text("drag_coefficient IS NOT NULL")),
+        Index("ix_statcast_events_game_date_launch", "game_date",
+              postgresql_where=text("launch_speed IS NOT NULL"), sqlite_where=text("launch_speed IS NOT NULL")),
+        Index("ix_statcast_events_bb_type_game_date", "bb_type", "game_date"),
+        Index("ix_statcast_events_pitch_type_game_date", "pitch_type", "game_date"),
+        Index("ix_statcast_events_events_game_date", "events", "game_date"),
+        # Keyset pagination order (migrations/versions/0005)
+        Index("ix_statcast_events_game_date_id", "game_date", "id"),
+    )
+    id = Column(Integer, primary_key=True)
+    game_date = Column(Date, nullable=False)
+    game_pk = Column(Integer)
+    at_bat_number = Column(Integer)
+    pitch_number = Column(Integer)
     events = Column(String)
     launch_speed = Column(Float)
     launch_angle = Column(Float)
@@ -27,4 +80,47 @@ class StatcastEvent(Base):
     hc_y = Column(Float)
     bb_type = Column(String)
     home_team = Column(String)
-    stadium = Column(String) 
\ No newline at end of file
+    stadium = Column(String)
+    # Derived at load time by analytics.add_derived_columns
+    expected_distance = Column(Float)
+    spray_angle = Column(Float)
+
+class StatcastDailyRollup(Base):
+    """Per-day, per-home-team batted-ball totals (see app/rollups.py)."""
+    __tablename__ = "statcast_daily_rollup"
+    game_date = Column(Date, primary_key=True)
+    home_team = Column(String, primary_key=True)  # '' when the event has no home_team
+    batted_balls = Column(Integer, nullable=False, default=0)
+    fly_line_drives = Column(Integer, nullable=False, default=0)
+    home_runs = Column(Integer, nullable=False, default=0)
+    # Drag sample used by /drag_vs_hr: 0.1 < Cd < 0.6 on fly balls, line drives and home runs
+    drag_sum = Column(Float, nullable=False, default=0.0)
+    drag_count = Column(Integer, nullable=False, default=0)
+    drag_home_runs = Column(Integer, nullable=False, default=0)
+
+
+class DragSketch(Base):
+    """Per-day, per-bb_type t-digest of drag_coefficient values (see app/sketch.py)."""
+    __tablename__ = "statcast_drag_sketch"
+    game_date = Column(Date, primary_key=True)
+    bb_type = Column(String, primary_key=True)  # '' when the event has no bb_type
+    count = Column(Integer, nullable=False, default=0)
+    sketch = Column(LargeBinary, nullable=False)
+
+
+class LoadWatermark(Base):
+    """Single-row marker bumped by every data load (see app/watermark.py)."""
+    __tablename__ = "statcast_load_watermark"
+    id = Column(Integer, primary_key=True)
+    load_batch_id = Column(Integer, nullable=False, default=0)
+    max_game_date = Column(Date)
+    updated_at = Column(DateTime)
+
+
+class LoadBatch(Base):
+    """Game dates written by one watermark bump; NULL min_game_date when unknown (see app/watermark.py)."""
+    __tablename__ = "statcast_load_batches"
+    load_batch_id = Column(Integer, primary_key=True)
+    min_game_date = Column(Date)
+    max_game_date = Column(Date)
+    loaded_at = Column(DateTime)
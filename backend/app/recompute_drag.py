@@ -0,0 +1,39 @@
+import argparse
+import logging
+from datetime import date
+from sqlalchemy import func, select
+from app.models import StatcastEvent, engine
+from app.columnar import export_store
+from app.loader import recompute_drag_coefficients
+from app.schema import upgrade_schema
+
+
+def main(start_date: str = None, end_date: str = None) -> int:
+    """
+    Re-solve drag_coefficient for events already in the database (all of them by default) and rebuild
+    the rollups, drag sketches and columnar store. Returns the number of rows updated.
+    """
+    upgrade_schema()
+    with engine.connect() as conn:
+        first, last = conn.execute(select(func.min(StatcastEvent.game_date), func.max(StatcastEvent.game_date))).one()
+    if first is None:
+        print("No events to recompute.")
+        return 0
+    start_dt = date.fromisoformat(start_date) if start_date else first
+    end_dt = date.fromisoformat(end_date) if end_date else last
+    print(f"Recomputing drag coefficients from {start_dt} to {end_dt}...")
+    updated = recompute_drag_coefficients(start_dt, end_dt)
+    print(f"Updated {updated} rows.")
+    if updated:
+        manifest = export_store()
+        print(f"Exported {manifest['rows']} rows to the columnar store.")
+    print("Done!")
+    return updated
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Re-solve stored drag coefficients with the current estimator.")
+    parser.add_argument("--start-date", help="First game date (YYYY-MM-DD), default the earliest loaded")
+    parser.add_argument("--end-date", help="Last game date (YYYY-MM-DD), default the latest loaded")
+    args = parser.parse_args()
+    main(args.start_date, args.end_date)
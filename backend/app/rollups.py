@@ -0,0 +1,113 @@
+from datetime import date
+import pandas as pd
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.engine import Connection
+from app.models import DragSketch, StatcastEvent, StatcastDailyRollup, engine
+from app.sketch import TDigest
+from app.schema import upgrade_schema
+from app.watermark import bump_watermark
+
+# Same predicate /drag_vs_hr has always applied to raw events
+DRAG_SAMPLE = (
+    StatcastEvent.drag_coefficient.isnot(None) &
+    (StatcastEvent.drag_coefficient > 0.1) &
+    (StatcastEvent.drag_coefficient < 0.6) &
+    (
+        (StatcastEvent.bb_type.in_(["fly_ball", "line_drive"])) |
+        (StatcastEvent.events == "home_run")
+    )
+)
+
+
+def _count_if(condition):
+    return func.sum(case((condition, 1), else_=0))
+
+
+def refresh_daily_rollup(conn: Connection, start_dt: date, end_dt: date) -> int:
+    """
+    Recompute statcast_daily_rollup for game dates in [start_dt, end_dt] from statcast_events.
+    Only the touched dates are rewritten, so a daily load costs one small GROUP BY.
+    """
+    home_team = func.coalesce(StatcastEvent.home_team, "")
+    is_home_run = StatcastEvent.events == "home_run"
+    rollup = (
+        select(
+            StatcastEvent.game_date,
+            home_team,
+            _count_if(StatcastEvent.bb_type.isnot(None)),
+            _count_if(StatcastEvent.bb_type.in_(["fly_ball", "line_drive"])),
+            _count_if(is_home_run),
+            func.coalesce(func.sum(case((DRAG_SAMPLE, StatcastEvent.drag_coefficient), else_=0.0)), 0.0),
+            _count_if(DRAG_SAMPLE),
+            _count_if(DRAG_SAMPLE & is_home_run),
+        )
+        .where(StatcastEvent.game_date >= start_dt, StatcastEvent.game_date <= end_dt)
+        .group_by(StatcastEvent.game_date, home_team)
+    )
+    conn.execute(
+        delete(StatcastDailyRollup).where(
+            StatcastDailyRollup.game_date >= start_dt,
+            StatcastDailyRollup.game_date <= end_dt,
+        )
+    )
+    result = conn.execute(
+        insert(StatcastDailyRollup).from_select(
+            [
+                StatcastDailyRollup.game_date,
+                StatcastDailyRollup.home_team,
+                StatcastDailyRollup.batted_balls,
+                StatcastDailyRollup.fly_line_drives,
+                StatcastDailyRollup.home_runs,
+                StatcastDailyRollup.drag_sum,
+                StatcastDailyRollup.drag_count,
+                StatcastDailyRollup.drag_home_runs,
+            ],
+            rollup,
+        )
+    )
+    return result.rowcount
+
+
+def refresh_drag_sketches(conn: Connection, start_dt: date, end_dt: date) -> int:
+    """
+    Rebuild the per-day, per-bb_type drag_coefficient sketches for game dates in [start_dt, end_dt].
+    Sketches merge cheaply, so /drag_coefficient_stats never has to scan raw events.
+    """
+    bb_type = func.coalesce(StatcastEvent.bb_type, "")
+    rows = conn.execute(
+        select(StatcastEvent.game_date, bb_type, StatcastEvent.drag_coefficient).where(
+            StatcastEvent.game_date >= start_dt,
+            StatcastEvent.game_date <= end_dt,
+            StatcastEvent.drag_coefficient.isnot(None),
+        )
+    ).all()
+    conn.execute(
+        delete(DragSketch).where(DragSketch.game_date >= start_dt, DragSketch.game_date <= end_dt)
+    )
+    if not rows:
+        return 0
+    df = pd.DataFrame.from_records(rows, columns=["game_date", "bb_type", "drag_coefficient"])
+    sketches = []
+    for (game_date, bb_type), group in df.groupby(["game_date", "bb_type"], sort=False):
+        digest = TDigest.from_values(group["drag_coefficient"].to_numpy(dtype=float))
+        sketches.append({"game_date": game_date, "bb_type": bb_type, "count": digest.count, "sketch": digest.to_bytes()})
+    conn.execute(insert(DragSketch), sketches)
+    return len(sketches)
+
+
+if __name__ == "__main__":
+    # Full rebuild, e.g. after the rollup tables are first created
+    upgrade_schema()
+    with engine.begin() as conn:
+        bounds = conn.execute(select(func.min(StatcastEvent.game_date), func.max(StatcastEvent.game_date))).one()
+        if bounds[0] is None:
+            print("No events to roll up.")
+        else:
+            print(f"Rebuilding daily rollup from {bounds[0]} to {bounds[1]}...")
+            rows = refresh_daily_rollup(conn, bounds[0], bounds[1])
+            # One season at a time keeps the raw drag values in memory bounded
+            sketches = 0
+            for season in range(bounds[0].year, bounds[1].year + 1):
+                sketches += refresh_drag_sketches(conn, max(bounds[0], date(season, 1, 1)), min(bounds[1], date(season, 12, 31)))
+            bump_watermark(conn, bounds[1], bounds[0])
+            print(f"Wrote {rows} rollup rows and {sketches} drag sketches.")
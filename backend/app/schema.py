@@ -0,0 +1,35 @@
+import os
+from typing import Iterable
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    return config
+
+
+def upgrade_schema(revision: str = "head"):
+    """Apply Alembic migrations up to revision (use instead of Base.metadata.create_all)."""
+    command.upgrade(alembic_config(), revision)
+
+
+def ensure_season_partitions(conn: Connection, seasons: Iterable[int]):
+    """Create missing per-season partitions of statcast_events (PostgreSQL only, no-op elsewhere)."""
+    if conn.dialect.name != "postgresql":
+        return
+    partitioned = conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'statcast_events'::regclass"
+    )).scalar()
+    if not partitioned:
+        return
+    for season in sorted(set(int(s) for s in seasons)):
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS statcast_events_{season} PARTITION OF statcast_events "
+            f"FOR VALUES FROM ('{season}-01-01') TO ('{season + 1}-01-01')"
+        ))
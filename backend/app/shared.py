@@ -0,0 +1,266 @@
+"""
+Full-history dataset shared by every uvicorn worker.
+
+With SHARED_DATASET_DIR set, the worker holding the loader lock builds the /exit_velocity_distance
+dataset (from the Parquet snapshot plus newer rows, see app/snapshot.py) and publishes it there as
+a generation directory of raw column files in the compact form the response cache stores, next to
+the response bodies encoded from it. Every worker, the loader included, serves read-only memory
+maps of the live generation, so the columns and bodies sit in memory once however many workers
+run. As in the columnar store, the CURRENT file names the live generation and is swapped
+atomically. If the loader exits, the next worker to refresh takes its lock over.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+from datetime import date, datetime
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from app.columnar import MANIFEST_NAME, read_current, remove_old_generations, write_current
+from app.compact import DATE32, compact_frame
+from app.concurrency import run_cpu
+from app.snapshot import SNAPSHOT_PATH, SnapshotDataset
+from app.watermark import read_watermark
+
+logger = logging.getLogger(__name__)
+
+SHARED_DATASET_DIR = os.getenv("SHARED_DATASET_DIR") or None
+SHARED_DATASET_VERSION = 1
+# How long a worker waits for the loader to publish the data it needs
+SHARED_DATASET_WAIT = float(os.getenv("SHARED_DATASET_WAIT", "900"))
+POLL_SECONDS = 1.0
+LOCK_NAME = "loader.lock"
+# Touched by a worker that wants the loader to rebuild from the database
+FULL_REFRESH_NAME = "FULL_REFRESH"
+
+# Encoded response bodies for a frame, by representation: {representation: (content, media_type, encoding)}
+RenderBodies = Callable[[pd.DataFrame], dict]
+
+ARRAY = "array"
+DATE = "date"
+CATEGORY = "category"
+
+
+def publish_frame(directory: str, frame: pd.DataFrame, metadata: dict, render_bodies: Optional[RenderBodies] = None) -> str:
+    """
+    Write frame, compacted, as a new generation under directory, with the bodies render_bodies encodes
+    from it, make it current and return its name.
+    """
+    frame = compact_frame(frame)
+    generation = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    path = os.path.join(directory, generation)
+    os.makedirs(path)
+    columns = {}
+    for name in frame.columns:
+        series = frame[name]
+        if series.dtype == DATE32:
+            array = pa.array(series)
+            if isinstance(array, pa.ChunkedArray):
+                array = array.combine_chunks()
+            values = array.cast(pa.int32()).fill_null(0).to_numpy()
+            if array.null_count:
+                # Arrow validity bitmap, used as is when attaching
+                with open(os.path.join(path, f"{name}.valid.bin"), "wb") as f:
+                    f.write(array.is_valid().buffers()[1].to_pybytes())
+            spec = {"kind": DATE, "nulls": bool(array.null_count)}
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.array.codes
+            spec = {"kind": CATEGORY, "dtype": values.dtype.str, "categories": series.cat.categories.tolist()}
+        else:
+            values = series.to_numpy()
+            if values.dtype == object:
+                raise ValueError(f"Column {name} has no fixed-width form to share")
+            spec = {"kind": ARRAY, "dtype": values.dtype.str}
+        np.ascontiguousarray(values).tofile(os.path.join(path, f"{name}.bin"))
+        columns[name] = spec
+    bodies = {}
+    for i, (representation, (content, media_type, encoding)) in enumerate((render_bodies(frame) if render_bodies else {}).items()):
+        with open(os.path.join(path, f"body{i}.bin"), "wb") as f:
+            f.write(content)
+        bodies[representation] = {"file": f"body{i}", "length": len(content), "media_type": media_type, "encoding": encoding}
+    manifest = {**metadata, "version": SHARED_DATASET_VERSION, "rows": len(frame), "columns": columns, "bodies": bodies}
+    with open(os.path.join(path, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f)
+    write_current(directory, generation)
+    remove_old_generations(directory, generation)
+    return generation
+
+
+def _map(path: str, name: str, dtype, length: int) -> np.ndarray:
+    if not length:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode="r", shape=(length,))
+
+
+def attach_bodies(path: str, manifest: dict) -> dict:
+    """
+    A published generation's bodies as {representation: (content, media_type, encoding)}, each content
+    a read-only memory map of its file.
+    """
+    return {
+        representation: (memoryview(_map(path, spec["file"], np.uint8, spec["length"])), spec["media_type"], spec["encoding"])
+        for representation, spec in manifest.get("bodies", {}).items()
+    }
+
+
+def attach_frame(path: str):
+    """(frame, manifest) for a published generation; the columns are memory maps, nothing is copied."""
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SHARED_DATASET_VERSION:
+        raise ValueError(f"Shared dataset version {manifest.get('version')} is not {SHARED_DATASET_VERSION}")
+    rows = manifest["rows"]
+
+    def column(name: str, dtype, length: int = rows) -> np.ndarray:
+        return _map(path, name, dtype, length)
+
+    data = {}
+    for name, spec in manifest["columns"].items():
+        if spec["kind"] == DATE:
+            validity = pa.py_buffer(column(f"{name}.valid", np.uint8, (rows + 7) // 8)) if spec["nulls"] else None
+            array = pa.Array.from_buffers(pa.date32(), rows, [validity, pa.py_buffer(column(name, np.int32))])
+            data[name] = pd.Series(pd.arrays.ArrowExtensionArray(array), copy=False)
+        elif spec["kind"] == CATEGORY:
+            data[name] = pd.Categorical.from_codes(
+                column(name, np.dtype(spec["dtype"])), categories=pd.Index(spec["categories"]), validate=False
+            )
+        else:
+            data[name] = column(name, np.dtype(spec["dtype"]))
+    return pd.DataFrame(data, columns=list(manifest["columns"]), copy=False), manifest
+
+
+class LoaderLock:
+    """Exclusive flock on directory/loader.lock, taken without blocking and held until the process exits."""
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, LOCK_NAME)
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        if self._file is None:
+            f = open(self.path, "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                return False
+            self._file = f
+            logger.info("Worker %d is the shared dataset loader", os.getpid())
+        return True
+
+
+class SharedDataset(SnapshotDataset):
+    """
+    A SnapshotDataset that one worker (the lock holder) builds and publishes under directory and
+    every worker serves from the published memory maps. Other workers never query for it: they wait
+    for the loader to publish the watermark they need, taking over if the loader has gone.
+    render_bodies, if given, encodes the response bodies published with each frame; the attached
+    ones are in bodies.
+    """
+    def __init__(self, fetch, start_date: date, database: str, path: str = SNAPSHOT_PATH,
+                 date_column: str = "game_date", directory: str = SHARED_DATASET_DIR,
+                 render_bodies: Optional[RenderBodies] = None):
+        super().__init__(fetch, start_date, database, path, date_column)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock = LoaderLock(directory)
+        self.render_bodies = render_bodies
+        self.generation: Optional[str] = None
+        self.bodies: dict = {}
+
+    async def _set_frame(self, frame: pd.DataFrame, watermark: str, source: str):
+        # Only the loader builds frames; publish them and serve the published copy like everyone else
+        await super()._set_frame(frame, watermark, source)
+        metadata = {
+            "database": self.database,
+            "start_date": self.start_date.isoformat(),
+            "watermark": watermark,
+            "max_game_date": self.max_game_date.isoformat() if self.max_game_date is not None else None,
+            "published_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        generation = await run_cpu(publish_frame, self.directory, self.frame, metadata, self.render_bodies)
+        logger.info("Published shared dataset generation %s (%d rows, watermark %s)", generation, len(self.frame), watermark)
+        self._attach()
+        self.source = source
+
+    def _attach(self) -> bool:
+        """Serve the live generation, attaching it if it changed; False when there is none usable."""
+        name = read_current(self.directory)
+        if name is None:
+            return False
+        if name == self.generation:
+            return True
+        try:
+            frame, manifest = attach_frame(os.path.join(self.directory, name))
+        except (OSError, ValueError, KeyError):
+            logger.exception("Error attaching shared dataset generation %s", name)
+            return False
+        if manifest.get("database") != self.database or manifest.get("start_date") != self.start_date.isoformat():
+            return False
+        self.frame, self.watermark, self.source = frame, manifest["watermark"], "shared"
+        self.bodies = attach_bodies(os.path.join(self.directory, name), manifest)
+        self.max_game_date = date.fromisoformat(manifest["max_game_date"]) if manifest["max_game_date"] else None
+        self.generation = name
+        logger.info("Attached shared dataset generation %s (%d rows, watermark %s)", name, len(frame), self.watermark)
+        return True
+
+    def _request_full(self):
+        open(os.path.join(self.directory, FULL_REFRESH_NAME), "a").close()
+
+    def _take_full_request(self) -> bool:
+        try:
+            os.remove(os.path.join(self.directory, FULL_REFRESH_NAME))
+        except FileNotFoundError:
+            return False
+        return True
+
+    async def refresh(self, watermark: str, full: bool = False) -> pd.DataFrame:
+        """
+        The dataset as of watermark. The loader builds and publishes it (see SnapshotDataset.refresh);
+        other workers attach the generation the loader publishes for it, or for a newer watermark.
+        A full refresh on another worker asks the loader for a rebuild and waits for the new generation.
+        """
+        deadline = time.monotonic() + SHARED_DATASET_WAIT
+        previous = self.generation
+        if full and not self.lock.acquire():
+            self._request_full()
+        while True:
+            if self.lock.acquire():
+                if not full and self._attach() and self.watermark == watermark:
+                    return self.frame
+                return await super().refresh(watermark, full or self._take_full_request())
+            if self._attach() and not (full and self.generation == previous) \
+                    and (self.watermark == watermark or self.watermark == await run_cpu(read_watermark)):
+                return self.frame
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"No shared dataset for watermark {watermark} after {SHARED_DATASET_WAIT:.0f}s")
+            await asyncio.sleep(POLL_SECONDS)
+
+    async def poll(self) -> bool:
+        """
+        Run periodically on every worker. The loader rebuilds when the load watermark moved or a full
+        rebuild was asked for; other workers attach a newly published generation. True when this
+        worker's frame changed.
+        """
+        if self.lock.acquire():
+            full = self._take_full_request()
+            watermark = await run_cpu(read_watermark)
+            if not full and self.frame is not None and watermark == self.watermark:
+                return False
+            await self.refresh(watermark, full)
+            return True
+        previous = self.generation
+        return self._attach() and self.generation != previous
+
+    def status(self) -> dict:
+        return {**super().status(), "shared": self.directory, "generation": self.generation, "loader": self.lock.held,
+                "bodies": {representation: len(body[0]) for representation, body in self.bodies.items()}}
@@ -0,0 +1,103 @@
+from typing import Iterable, Optional
+
+import numpy as np
+
+# Larger compression keeps more centroids (better tail accuracy, bigger sketches)
+COMPRESSION = 200
+
+
+class TDigest:
+    """
+    Mergeable quantile sketch (a merging t-digest with the k1 scale function).
+    Centroids are sorted (mean, weight) pairs; exact min, max, sum and count are kept
+    alongside so those statistics never degrade when sketches are merged.
+    """
+    def __init__(self, means: np.ndarray, weights: np.ndarray, minimum: float, maximum: float, total: float):
+        self.means = means
+        self.weights = weights
+        self.min = minimum
+        self.max = maximum
+        self.sum = total
+
+    @property
+    def count(self) -> int:
+        return int(round(self.weights.sum()))
+
+    @classmethod
+    def empty(cls) -> "TDigest":
+        return cls(np.empty(0), np.empty(0), np.nan, np.nan, 0.0)
+
+    @classmethod
+    def from_values(cls, values, compression: int = COMPRESSION) -> "TDigest":
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return cls.empty()
+        digest = cls(values, np.ones(len(values)), float(values.min()), float(values.max()), float(values.sum()))
+        return digest.compress(compression)
+
+    @classmethod
+    def merge(cls, digests: Iterable["TDigest"], compression: Optional[int] = COMPRESSION) -> "TDigest":
+        """Combine digests; compression=None keeps every centroid (most accurate for one-off queries)."""
+        digests = [d for d in digests if len(d.weights)]
+        if not digests:
+            return cls.empty()
+        merged = cls(
+            np.concatenate([d.means for d in digests]),
+            np.concatenate([d.weights for d in digests]),
+            min(d.min for d in digests),
+            max(d.max for d in digests),
+            sum(d.sum for d in digests),
+        )
+        return merged.compress(compression)
+
+    def compress(self, compression: Optional[int] = COMPRESSION) -> "TDigest":
+        """Merge neighbouring centroids so each spans at most one unit of the k1 scale."""
+        if compression is None or len(self.means) <= compression // 2:
+            order = np.argsort(self.means, kind="stable")
+            return TDigest(self.means[order], self.weights[order], self.min, self.max, self.sum)
+        order = np.argsort(self.means, kind="stable")
+        means, weights = self.means[order], self.weights[order]
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        groups = np.floor(k - k[0]).astype(np.int64)
+        new_weights = np.bincount(groups, weights=weights)
+        keep = new_weights > 0
+        new_means = np.bincount(groups, weights=weights * means)[keep] / new_weights[keep]
+        return TDigest(new_means, new_weights[keep], self.min, self.max, self.sum)
+
+    def _cdf_points(self):
+        # Piecewise-linear CDF through each centroid's midpoint, pinned at min and max
+        cumulative = np.cumsum(self.weights) - self.weights / 2
+        xs = np.concatenate([[self.min], self.means, [self.max]])
+        ws = np.concatenate([[0.0], cumulative, [self.weights.sum()]])
+        return xs, ws
+
+    def quantile(self, qs) -> np.ndarray:
+        """Approximate values at quantiles qs (0..1)."""
+        qs = np.clip(np.asarray(qs, dtype=float), 0.0, 1.0)
+        if not len(self.weights):
+            return np.full(qs.shape, np.nan)
+        xs, ws = self._cdf_points()
+        return np.interp(qs * ws[-1], ws, xs)
+
+    def histogram(self, bins: int, value_range: Optional[tuple] = None):
+        """Approximate counts over bins equal-width bins; returns (edges, counts)."""
+        lo, hi = value_range or (self.min, self.max)
+        edges = np.linspace(lo, hi, bins + 1) if len(self.weights) else np.array([])
+        if not len(self.weights):
+            return edges, np.array([], dtype=np.int64)
+        xs, ws = self._cdf_points()
+        cdf = np.interp(edges, xs, ws, left=0.0, right=ws[-1])
+        return edges, np.rint(np.diff(cdf)).astype(np.int64)
+
+    def to_bytes(self) -> bytes:
+        header = np.array([self.min, self.max, self.sum], dtype=np.float64)
+        return np.concatenate([header, self.means, self.weights]).astype(np.float64).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TDigest":
+        values = np.frombuffer(data, dtype=np.float64)
+        n = (len(values) - 3) // 2
+        return cls(values[3:3 + n].copy(), values[3 + n:].copy(), float(values[0]), float(values[1]), float(values[2]))
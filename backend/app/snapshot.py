@@ -0,0 +1,143 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import date
+from typing import Awaitable, Callable, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.compact import compact_frame
+from app.concurrency import run_cpu
+from app.watermark import earliest_change_since
+
+logger = logging.getLogger(__name__)
+
+# Parquet copy of the warmed full-history dataset so a restart does not re-query all of it
+SNAPSHOT_PATH = os.getenv(
+    "CACHE_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache_snapshot", "exit_velocity_distance.parquet"),
+)
+# Bump when the dataset's columns or meaning change; older snapshots are then ignored
+SNAPSHOT_VERSION = 1
+_METADATA_KEY = b"deadball_snapshot"
+
+Fetch = Callable[[date, date], Awaitable[pd.DataFrame]]
+
+
+def write_snapshot(path: str, df: pd.DataFrame, metadata: dict):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _METADATA_KEY: json.dumps(metadata).encode()})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Per process, so workers writing the same snapshot do not rename each other's file away
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str):
+    """(frame, metadata) from a snapshot file, or None if it is missing, unreadable or from another version."""
+    if not os.path.exists(path):
+        return None
+    try:
+        table = pq.read_table(path)
+        metadata = json.loads(table.schema.metadata[_METADATA_KEY])
+    except Exception:
+        logger.exception("Ignoring unreadable cache snapshot %s", path)
+        return None
+    if metadata.get("version") != SNAPSHOT_VERSION:
+        return None
+    return table.to_pandas(), metadata
+
+
+class SnapshotDataset:
+    """
+    A full-history frame (rows from start_date on) kept current by appending rows newer than its
+    latest game date instead of re-querying everything, and persisted to Parquet after each change.
+    The latest day is always re-read since it may have been loaded partially. Loads that wrote older
+    dates (backfills, recomputed drag coefficients) are re-read from the earliest date they wrote,
+    and the frame is rebuilt when that is unknown (see app/watermark.earliest_change_since).
+    """
+    def __init__(self, fetch: Fetch, start_date: date, database: str, path: str = SNAPSHOT_PATH, date_column: str = "game_date"):
+        self.fetch = fetch
+        self.start_date = start_date
+        # Identifies the source database so a snapshot is never topped up from another one
+        self.database = database
+        self.path = path
+        self.date_column = date_column
+        self.frame: Optional[pd.DataFrame] = None
+        self.max_game_date: Optional[date] = None
+        self.watermark: Optional[str] = None
+        self.source: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    async def _set_frame(self, frame: pd.DataFrame, watermark: str, source: str):
+        # Held compact, the same form the response cache stores, so the cache entry is this frame
+        frame = await run_cpu(compact_frame, frame)
+        self.max_game_date = await run_cpu(frame[self.date_column].max) if not frame.empty else None
+        self.frame, self.watermark, self.source = frame, watermark, source
+
+    async def _top_up_since(self) -> Optional[date]:
+        """First game date to re-read, or None when the frame has to be rebuilt from start_date."""
+        if self.max_game_date is None:
+            return None
+        changed = await run_cpu(earliest_change_since, self.watermark)
+        if changed is None or changed <= self.start_date:
+            return None
+        if changed < self.max_game_date:
+            logger.info("Loads since watermark %s wrote game dates from %s, before the latest cached %s",
+                        self.watermark, changed, self.max_game_date)
+        return min(changed, self.max_game_date)
+
+    def _top_up(self, recent: pd.DataFrame, since: date) -> pd.DataFrame:
+        kept = self.frame[self.frame[self.date_column] < since]
+        logger.info("Cache dataset topped up from %s: %d rows replaced by %d", since, len(self.frame) - len(kept), len(recent))
+        if recent.empty:
+            # An empty fetch has untyped columns, which would make the concatenated ones object
+            return kept.reset_index(drop=True)
+        return pd.concat([kept, recent], ignore_index=True)
+
+    async def load(self) -> bool:
+        snapshot = await run_cpu(read_snapshot, self.path)
+        if snapshot is None or snapshot[1].get("start_date") != self.start_date.isoformat() \
+                or snapshot[1].get("database") != self.database:
+            return False
+        frame, metadata = snapshot
+        await self._set_frame(frame, metadata["watermark"], "snapshot")
+        logger.info("Loaded cache snapshot %s (%d rows, watermark %s)", self.path, len(self.frame), self.watermark)
+        return True
+
+    async def refresh(self, watermark: str, full: bool = False) -> pd.DataFrame:
+        """The dataset as of watermark: unchanged if already there, else topped up (or rebuilt if full)."""
+        async with self._lock:
+            if self.frame is None and not full:
+                await self.load()
+            if not full and self.frame is not None and self.watermark == watermark:
+                return self.frame
+            today = date.today()
+            since = None if full else await self._top_up_since()
+            if since is None:
+                frame = await self.fetch(self.start_date, today)
+                source = "database"
+            else:
+                frame = await run_cpu(self._top_up, await self.fetch(since, today), since)
+                source = "incremental"
+            metadata = {"version": SNAPSHOT_VERSION, "watermark": watermark, "start_date": self.start_date.isoformat(),
+                        "database": self.database, "rows": len(frame)}
+            try:
+                await run_cpu(write_snapshot, self.path, frame, metadata)
+            except OSError:
+                logger.exception("Error writing cache snapshot %s", self.path)
+            await self._set_frame(frame, watermark, source)
+            return self.frame
+
+    def status(self) -> dict:
+        return {
+            "rows": None if self.frame is None else len(self.frame),
+            "max_game_date": self.max_game_date.isoformat() if self.max_game_date is not None else None,
+            "watermark": self.watermark,
+            "source": self.source,
+            "snapshot": self.path,
+        }
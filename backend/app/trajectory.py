@@ -0,0 +1,208 @@
+from functools import lru_cache
+
+import numpy as np
+
+# Constants for baseball physics
+BALL_MASS = 0.145  # kg
+BALL_DIAMETER = 0.073  # meters
+BALL_RADIUS = BALL_DIAMETER / 2
+BALL_AREA = np.pi * BALL_RADIUS ** 2  # m^2
+AIR_DENSITY = 1.2  # kg/m^3 (approximate, sea level, 20°C)
+GRAVITY = 9.8  # m/s^2
+CONTACT_HEIGHT = 0.9  # meters above the ground at contact
+
+# Drag deceleration is DRAG_FACTOR * Cd * speed^2
+DRAG_FACTOR = 0.5 * AIR_DENSITY * BALL_AREA / BALL_MASS
+
+TIME_STEP = 0.2  # seconds; with RK4 and Hermite landing interpolation the carry error is under 1 cm
+MAX_FLIGHT_TIME = 15.0  # seconds
+CD_MAX = 1.0
+TOLERANCE = 0.05  # meters of carry (Statcast distances are whole feet)
+MAX_ITERATIONS = 12
+CHUNK_SIZE = 20_000  # balls integrated together; small enough for the working set to stay in cache
+
+# Coarse carry table used for initial guesses
+TABLE_SPEEDS = np.arange(15.0, 66.0, 1.0)  # m/s
+TABLE_ANGLES = np.deg2rad(np.arange(0.0, 72.5, 2.5))
+TABLE_CDS = np.linspace(0.0, CD_MAX, 21)
+
+
+def _accelerations(vx: np.ndarray, vz: np.ndarray, k: np.ndarray):
+    drag = k * np.sqrt(vx * vx + vz * vz)
+    return -drag * vx, -GRAVITY - drag * vz
+
+
+def _hermite(p0, m0, p1, m1, tau, dt):
+    t2 = tau * tau
+    t3 = t2 * tau
+    return (2 * t3 - 3 * t2 + 1) * p0 + (t3 - 2 * t2 + tau) * dt * m0 + (3 * t2 - 2 * t3) * p1 + (t3 - t2) * dt * m1
+
+
+def _hermite_slope(p0, m0, p1, m1, tau, dt):
+    t2 = tau * tau
+    return (6 * t2 - 6 * tau) * p0 + (3 * t2 - 4 * tau + 1) * dt * m0 + (6 * tau - 6 * t2) * p1 + (3 * t2 - 2 * tau) * dt * m1
+
+
+def _landing_x(before: np.ndarray, after: np.ndarray, dt: float) -> np.ndarray:
+    # Cubic Hermite through both ends of the step (positions and velocities), solved for z = 0
+    x0, z0, vx0, vz0 = before
+    x1, z1, vx1, vz1 = after
+    tau = z0 / (z0 - z1)
+    for _ in range(3):
+        slope = _hermite_slope(z0, vz0, z1, vz1, tau, dt)
+        tau = np.clip(tau - _hermite(z0, vz0, z1, vz1, tau, dt) / slope, 0.0, 1.0)
+    return _hermite(x0, vx0, x1, vx1, tau, dt)
+
+
+def simulate_carry(launch_speed, launch_angle, cd, dt: float = TIME_STEP) -> np.ndarray:
+    """
+    Integrate drag-only trajectories for all balls in lockstep (RK4) until each lands.
+    launch_speed is in m/s and launch_angle in radians; returns carry distances in meters.
+    Balls still in the air after MAX_FLIGHT_TIME get NaN.
+    """
+    launch_speed = np.asarray(launch_speed, dtype=float)
+    launch_angle = np.asarray(launch_angle, dtype=float)
+    n = len(launch_speed)
+    k = np.broadcast_to(np.asarray(cd, dtype=float) * DRAG_FACTOR, (n,)).copy()
+    x = np.zeros(n)
+    z = np.full(n, CONTACT_HEIGHT)
+    vx = launch_speed * np.cos(launch_angle)
+    vz = launch_speed * np.sin(launch_angle)
+
+    distance = np.full(n, np.nan)
+    alive = np.arange(n)
+    half = dt / 2
+    t = 0.0
+    while len(alive) and t < MAX_FLIGHT_TIME:
+        ax1, az1 = _accelerations(vx, vz, k)
+        vx2, vz2 = vx + half * ax1, vz + half * az1
+        ax2, az2 = _accelerations(vx2, vz2, k)
+        vx3, vz3 = vx + half * ax2, vz + half * az2
+        ax3, az3 = _accelerations(vx3, vz3, k)
+        vx4, vz4 = vx + dt * ax3, vz + dt * az3
+        ax4, az4 = _accelerations(vx4, vz4, k)
+        new_x = x + (dt / 6) * (vx + 2 * vx2 + 2 * vx3 + vx4)
+        new_z = z + (dt / 6) * (vz + 2 * vz2 + 2 * vz3 + vz4)
+        new_vx = vx + (dt / 6) * (ax1 + 2 * ax2 + 2 * ax3 + ax4)
+        new_vz = vz + (dt / 6) * (az1 + 2 * az2 + 2 * az3 + az4)
+        t += dt
+
+        landed = new_z <= 0
+        if landed.any():
+            before = (x[landed], z[landed], vx[landed], vz[landed])
+            after = (new_x[landed], new_z[landed], new_vx[landed], new_vz[landed])
+            distance[alive[landed]] = _landing_x(before, after, dt)
+            keep = ~landed
+            alive, k = alive[keep], k[keep]
+            new_x, new_z, new_vx, new_vz = new_x[keep], new_z[keep], new_vx[keep], new_vz[keep]
+        x, z, vx, vz = new_x, new_z, new_vx, new_vz
+    return distance
+
+
+def vacuum_carry(launch_speed, launch_angle) -> np.ndarray:
+    """Closed-form carry (meters) with no drag from CONTACT_HEIGHT; the upper bound for any Cd >= 0."""
+    vx = launch_speed * np.cos(launch_angle)
+    vz = launch_speed * np.sin(launch_angle)
+    return vx * (vz + np.sqrt(vz * vz + 2 * GRAVITY * CONTACT_HEIGHT)) / GRAVITY
+
+
+@lru_cache(maxsize=1)
+def carry_table() -> np.ndarray:
+    """Carry for every (speed, angle, Cd) in the TABLE_* grids, shape (speeds, angles, cds)."""
+    speed, angle, cd = np.meshgrid(TABLE_SPEEDS, TABLE_ANGLES, TABLE_CDS, indexing="ij")
+    return simulate_carry(speed.ravel(), angle.ravel(), cd.ravel()).reshape(speed.shape)
+
+
+def _initial_guess(launch_speed, launch_angle, distance):
+    """Invert the bilinearly interpolated carry table; returns (Cd guess, dCarry/dCd) or NaN off the grid."""
+    table = carry_table()
+    fs = np.interp(launch_speed, TABLE_SPEEDS, np.arange(len(TABLE_SPEEDS)), left=np.nan, right=np.nan)
+    fa = np.interp(launch_angle, TABLE_ANGLES, np.arange(len(TABLE_ANGLES)), left=np.nan, right=np.nan)
+    on_grid = np.isfinite(fs) & np.isfinite(fa)
+    guess = np.full(len(distance), np.nan)
+    slope = np.full(len(distance), np.nan)
+    if not on_grid.any():
+        return guess, slope
+    fs, fa, target = fs[on_grid], fa[on_grid], distance[on_grid]
+    i = np.minimum(fs.astype(np.int64), len(TABLE_SPEEDS) - 2)
+    j = np.minimum(fa.astype(np.int64), len(TABLE_ANGLES) - 2)
+    ws, wa = (fs - i)[:, None], (fa - j)[:, None]
+    carry = (
+        (1 - ws) * (1 - wa) * table[i, j] + ws * (1 - wa) * table[i + 1, j]
+        + (1 - ws) * wa * table[i, j + 1] + ws * wa * table[i + 1, j + 1]
+    )
+    # Carry falls as Cd rises; find the table interval that brackets the target
+    level = np.clip((carry > target[:, None]).sum(axis=1), 1, len(TABLE_CDS) - 1)
+    upper = np.take_along_axis(carry, (level - 1)[:, None], axis=1)[:, 0]
+    lower = np.take_along_axis(carry, level[:, None], axis=1)[:, 0]
+    step = TABLE_CDS[1] - TABLE_CDS[0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        local_slope = (lower - upper) / step
+        estimate = TABLE_CDS[level - 1] + (target - upper) / local_slope
+    guess[on_grid] = estimate
+    slope[on_grid] = local_slope
+    return guess, slope
+
+
+def _solve_chunk(launch_speed, launch_angle, distance, tol, max_iter) -> np.ndarray:
+    n = len(launch_speed)
+    cd = np.full(n, np.nan)
+    # A ball that carried further than it could with no drag at all has no solution
+    candidates = np.flatnonzero(np.isfinite(distance) & (vacuum_carry(launch_speed, launch_angle) >= distance))
+    speed, angle, target = launch_speed[candidates], launch_angle[candidates], distance[candidates]
+
+    guess, slope = _initial_guess(speed, angle, target)
+    fallback = ~np.isfinite(guess) | (guess <= 0) | (guess >= CD_MAX)
+    guess = np.where(fallback, CD_MAX / 2, guess)
+    lo = np.zeros(len(candidates))
+    hi = np.full(len(candidates), CD_MAX)
+    prev_guess = np.full(len(candidates), np.nan)
+    prev_residual = np.full(len(candidates), np.nan)
+    active = np.arange(len(candidates))
+    for _ in range(max_iter):
+        if not len(active):
+            break
+        g = guess[active]
+        residual = simulate_carry(speed[active], angle[active], g) - target[active]
+        done = np.abs(residual) < tol
+        cd[candidates[active[done]]] = g[done]
+        # Carry falls as Cd rises, so a long residual means the true Cd is higher
+        too_far = residual > 0
+        lo[active] = np.where(too_far, g, lo[active])
+        hi[active] = np.where(too_far, hi[active], g)
+        # Secant slope once there are two iterates, the table's local slope before that
+        with np.errstate(divide="ignore", invalid="ignore"):
+            secant = (residual - prev_residual[active]) / (g - prev_guess[active])
+            step_slope = np.where(np.isfinite(secant) & (secant < 0), secant, slope[active])
+            proposal = g - residual / step_slope
+        inside = np.isfinite(proposal) & (proposal > lo[active]) & (proposal < hi[active])
+        prev_guess[active], prev_residual[active] = g, residual
+        guess[active] = np.where(inside, proposal, (lo[active] + hi[active]) / 2)
+        # Bracket collapsed onto 0 or CD_MAX: the carry needs a Cd outside the plausible range
+        collapsed = (hi[active] - lo[active]) < 1e-6
+        active = active[~done & ~collapsed & np.isfinite(residual)]
+    return cd
+
+
+def solve_drag_coefficient(
+    launch_speed,
+    launch_angle,
+    distance,
+    tol: float = TOLERANCE,
+    max_iter: int = MAX_ITERATIONS,
+    chunk_size: int = CHUNK_SIZE,
+) -> np.ndarray:
+    """
+    Find, per ball, the Cd in [0, CD_MAX] whose simulated carry matches distance (SI units,
+    angles in radians). Starts from the carry table and refines every ball at once with a
+    bracketed secant iteration, one lockstep RK4 pass per iteration. Balls are processed
+    chunk_size at a time to bound memory. NaN where no Cd reproduces the distance.
+    """
+    launch_speed = np.asarray(launch_speed, dtype=float)
+    launch_angle = np.asarray(launch_angle, dtype=float)
+    distance = np.asarray(distance, dtype=float)
+    cd = np.full(len(distance), np.nan)
+    for start in range(0, len(distance), chunk_size):
+        part = slice(start, start + chunk_size)
+        cd[part] = _solve_chunk(launch_speed[part], launch_angle[part], distance[part], tol, max_iter)
+    return cd
@@ -0,0 +1,65 @@
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Connection
+from app.models import LoadBatch, LoadWatermark, engine
+
+WATERMARK_ID = 1
+
+
+def bump_watermark(conn: Connection, max_game_date: Optional[date] = None, min_game_date: Optional[date] = None) -> int:
+    """
+    Advance the load batch id (and max game_date) after new data is written. Returns the new batch id.
+    Pass the earliest game date written as min_game_date so readers can tell which dates changed.
+    """
+    watermark = conn.execute(
+        select(LoadWatermark.load_batch_id, LoadWatermark.max_game_date).where(LoadWatermark.id == WATERMARK_ID)
+    ).first()
+    now = datetime.now()
+    batch_id = 1 if watermark is None else watermark.load_batch_id + 1
+    conn.execute(insert(LoadBatch).values(
+        load_batch_id=batch_id, min_game_date=min_game_date, max_game_date=max_game_date, loaded_at=now
+    ))
+    if watermark is None:
+        conn.execute(insert(LoadWatermark).values(
+            id=WATERMARK_ID, load_batch_id=1, max_game_date=max_game_date, updated_at=now
+        ))
+        return 1
+    if max_game_date is None or (watermark.max_game_date is not None and watermark.max_game_date > max_game_date):
+        max_game_date = watermark.max_game_date
+    conn.execute(update(LoadWatermark).where(LoadWatermark.id == WATERMARK_ID).values(
+        load_batch_id=batch_id, max_game_date=max_game_date, updated_at=now
+    ))
+    return batch_id
+
+
+def read_watermark() -> str:
+    """Opaque token that changes whenever a load bumps the watermark ("0" before the first load)."""
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(LoadWatermark.load_batch_id, LoadWatermark.max_game_date).where(LoadWatermark.id == WATERMARK_ID)
+        ).first()
+    if row is None:
+        return "0"
+    return f"{row.load_batch_id}:{row.max_game_date}"
+
+
+def earliest_change_since(watermark: str) -> Optional[date]:
+    """
+    Earliest game date written by the loads after watermark (a read_watermark token), or None when it
+    is unknown: a load that did not record its dates, or loads from before statcast_load_batches existed.
+    """
+    try:
+        since = int(watermark.split(":")[0])
+    except ValueError:
+        return None
+    with engine.connect() as conn:
+        current = conn.execute(select(LoadWatermark.load_batch_id).where(LoadWatermark.id == WATERMARK_ID)).scalar()
+        if current is None or current <= since:
+            return None
+        dates = conn.execute(
+            select(LoadBatch.min_game_date).where(LoadBatch.load_batch_id > since, LoadBatch.load_batch_id <= current)
+        ).scalars().all()
+    if len(dates) < current - since or any(d is None for d in dates):
+        return None
+    return min(dates)
@@ -0,0 +1,267 @@
+"""
+Expected home runs (xHR) per batted ball.
+
+A HistGradientBoostingClassifier is fit on launch_speed, launch_angle, spray angle (from hc_x/hc_y)
+and park (stadium, falling back to home_team), then compiled into a dense probability grid: one
+speed x angle x spray lattice per park plus an "unknown park" slice, and a speed x angle lattice for
+balls without hit coordinates. Scoring is a vectorized multilinear interpolation on that grid, so it
+costs a few array gathers per row instead of walking the trees. The grid, its axes and training
+metadata are saved as one .npz artifact; run python -m app.xhr to train and write it.
+"""
+import io
+import itertools
+import json
+import logging
+import os
+from datetime import date, datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from app.analytics import spray_angle
+from app.models import StatcastEvent, engine
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = os.getenv(
+    "XHR_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".models", "xhr_grid.npz"),
+)
+# Bump when the features, axes or artifact layout change; older artifacts are then ignored
+MODEL_VERSION = 1
+# Rows sampled for training; the model converges well before all of Statcast
+TRAIN_MAX_ROWS = int(os.getenv("XHR_TRAIN_MAX_ROWS", "2000000"))
+HOLDOUT_FRACTION = 0.1
+
+# Grid axes as (low, high, points); values outside are clamped to the edge, where HR odds are ~0
+AXES = {
+    "launch_speed": (60.0, 120.0, 41),
+    "launch_angle": (0.0, 60.0, 41),
+    "spray_angle": (-48.0, 48.0, 33),
+}
+
+
+def park_names(df: pd.DataFrame) -> pd.Series:
+    park = df["stadium"] if "stadium" in df.columns else pd.Series(None, index=df.index, dtype=object)
+    if "home_team" in df.columns:
+        park = park.fillna(df["home_team"])
+    return park
+
+
+def batted_balls_statement(start_dt: Optional[date] = None, end_dt: Optional[date] = None):
+    """Balls in play with launch data, with the columns the model scores."""
+    statement = select(
+        StatcastEvent.game_date,
+        StatcastEvent.launch_speed,
+        StatcastEvent.launch_angle,
+        StatcastEvent.hc_x,
+        StatcastEvent.hc_y,
+        StatcastEvent.stadium,
+        StatcastEvent.home_team,
+        StatcastEvent.events
+    ).where(
+        StatcastEvent.bb_type != None,
+        StatcastEvent.launch_speed != None,
+        StatcastEvent.launch_angle != None
+    )
+    if start_dt is not None:
+        statement = statement.where(StatcastEvent.game_date >= start_dt)
+    if end_dt is not None:
+        statement = statement.where(StatcastEvent.game_date <= end_dt)
+    return statement
+
+
+def _axis(low: float, high: float, points: int) -> np.ndarray:
+    return np.linspace(low, high, int(points))
+
+
+def _cell(values: np.ndarray, axis: np.ndarray):
+    """Lower grid index and interpolation weight of each value along a uniform axis."""
+    position = np.clip((values - axis[0]) / (axis[1] - axis[0]), 0, len(axis) - 1)
+    lower = np.minimum(position.astype(np.int64), len(axis) - 2)
+    return lower, position - lower
+
+
+def _interpolate(grid: np.ndarray, park: np.ndarray, cells: list) -> np.ndarray:
+    """Multilinear interpolation of grid[park, ...] at the given per-axis cells."""
+    # Gather from the flattened grid: the lower corner's offset plus a fixed stride per corner
+    strides = np.array(grid.strides) // grid.itemsize
+    flat = grid.reshape(-1)
+    base = park * strides[0]
+    for (lower, _), stride in zip(cells, strides[1:]):
+        base = base + lower * stride
+    result = np.zeros(len(park))
+    for corner in itertools.product((0, 1), repeat=len(cells)):
+        weight = np.ones(len(park))
+        for (_, frac), bit in zip(cells, corner):
+            weight *= frac if bit else 1.0 - frac
+        result += weight * flat[base + int(np.dot(corner, strides[1:]))]
+    return result
+
+
+class XhrModel:
+    """A compiled xHR grid. grid is (parks + 1, speed, angle, spray); the last park slice is the unknown park."""
+    def __init__(self, grid: np.ndarray, grid_no_spray: np.ndarray, parks, metadata: dict):
+        self.grid = grid
+        self.grid_no_spray = grid_no_spray
+        self.parks = pd.Index(parks)
+        self.metadata = metadata
+        self.axes = [_axis(*metadata["axes"][name]) for name in AXES]
+
+    @property
+    def trained_at(self) -> str:
+        return self.metadata["trained_at"]
+
+    def park_index(self, parks) -> np.ndarray:
+        # Factorize first so only the handful of distinct names are looked up
+        codes, names = pd.factorize(np.asarray(parks, dtype=object))
+        lookup = self.parks.get_indexer(names)
+        lookup = np.append(np.where(lookup < 0, len(self.parks), lookup), len(self.parks))
+        return lookup[codes]
+
+    def score(self, launch_speed, launch_angle, spray, parks) -> np.ndarray:
+        """HR probability per ball; NaN where launch_speed or launch_angle is missing."""
+        speed = np.asarray(launch_speed, dtype=float)
+        angle = np.asarray(launch_angle, dtype=float)
+        spray = np.asarray(spray, dtype=float)
+        park = self.park_index(parks)
+        result = np.full(len(speed), np.nan)
+        scored = np.isfinite(speed) & np.isfinite(angle)
+        for has_spray in (True, False):
+            rows = scored & (np.isfinite(spray) == has_spray)
+            if not rows.any():
+                continue
+            cells = [_cell(speed[rows], self.axes[0]), _cell(angle[rows], self.axes[1])]
+            if has_spray:
+                cells.append(_cell(spray[rows], self.axes[2]))
+            grid = self.grid if has_spray else self.grid_no_spray
+            result[rows] = _interpolate(grid, park[rows], cells)
+        return result
+
+    def score_frame(self, df: pd.DataFrame) -> np.ndarray:
+        return self.score(df["launch_speed"], df["launch_angle"], spray_angle(df["hc_x"], df["hc_y"]), park_names(df))
+
+    def save(self, path: str = MODEL_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer, grid=self.grid, grid_no_spray=self.grid_no_spray,
+            parks=np.array(self.parks, dtype=str), metadata=np.array(json.dumps(self.metadata)),
+        )
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+
+    def status(self) -> dict:
+        return {key: value for key, value in self.metadata.items() if key != "axes"}
+
+
+def load_model(path: str = MODEL_PATH) -> Optional[XhrModel]:
+    """The saved model, or None if it is missing, unreadable or from another MODEL_VERSION."""
+    if not os.path.exists(path):
+        logger.warning("No xHR model at %s; run python -m app.xhr to train one", path)
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as artifact:
+            metadata = json.loads(str(artifact["metadata"]))
+            if metadata.get("version") != MODEL_VERSION:
+                logger.warning("Ignoring xHR model %s from version %s", path, metadata.get("version"))
+                return None
+            model = XhrModel(artifact["grid"], artifact["grid_no_spray"], artifact["parks"].tolist(), metadata)
+    except Exception:
+        logger.exception("Ignoring unreadable xHR model %s", path)
+        return None
+    logger.info("Loaded xHR model %s (trained %s on %d rows)", path, model.trained_at, metadata["rows"])
+    return model
+
+
+def read_batted_balls(start_dt: Optional[date] = None, end_dt: Optional[date] = None) -> pd.DataFrame:
+    with engine.connect() as conn:
+        return pd.read_sql(batted_balls_statement(start_dt, end_dt), conn)
+
+
+def _features(speed, angle, spray, park_codes) -> np.ndarray:
+    return np.column_stack([speed, angle, spray, park_codes]).astype(float)
+
+
+def _compile(classifier, n_parks: int):
+    speed, angle, spray = (_axis(*AXES[name]) for name in AXES)
+    s, a, y = (axis.ravel() for axis in np.meshgrid(speed, angle, spray, indexing="ij"))
+    s2, a2 = (axis.ravel() for axis in np.meshgrid(speed, angle, indexing="ij"))
+    grid = np.empty((n_parks + 1, len(speed), len(angle), len(spray)), dtype=np.float32)
+    grid_no_spray = np.empty((n_parks + 1, len(speed), len(angle)), dtype=np.float32)
+    for code in range(n_parks + 1):
+        # The last slice is scored with the park missing, which the trees route like an average park
+        park = float(code) if code < n_parks else np.nan
+        grid[code] = classifier.predict_proba(_features(s, a, y, np.full(len(s), park)))[:, 1].reshape(grid.shape[1:])
+        grid_no_spray[code] = classifier.predict_proba(
+            _features(s2, a2, np.full(len(s2), np.nan), np.full(len(s2), park))
+        )[:, 1].reshape(grid_no_spray.shape[1:])
+    return grid, grid_no_spray
+
+
+def train_model(df: pd.DataFrame, seed: int = 0, max_rows: int = TRAIN_MAX_ROWS) -> XhrModel:
+    """Fit the classifier on batted balls (see batted_balls_statement) and compile it to an XhrModel."""
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    from sklearn.metrics import brier_score_loss, log_loss
+
+    df = df[df["launch_speed"].notna() & df["launch_angle"].notna()]
+    if len(df) > max_rows:
+        df = df.sample(max_rows, random_state=seed)
+    if df.empty:
+        raise ValueError("No batted balls to train the xHR model on")
+    parks = sorted(park_names(df).dropna().unique())
+    park_codes = pd.Index(parks).get_indexer(park_names(df)).astype(float)
+    park_codes[park_codes < 0] = np.nan
+    X = _features(df["launch_speed"], df["launch_angle"], spray_angle(df["hc_x"], df["hc_y"]), park_codes)
+    y = (df["events"] == "home_run").to_numpy()
+
+    holdout = np.random.default_rng(seed).random(len(df)) < HOLDOUT_FRACTION
+    classifier = HistGradientBoostingClassifier(
+        categorical_features=[3],
+        # More exit velocity never makes a home run less likely
+        monotonic_cst=[1, 0, 0, 0],
+        max_iter=300,
+        early_stopping=True,
+        random_state=seed,
+    )
+    classifier.fit(X[~holdout], y[~holdout])
+    grid, grid_no_spray = _compile(classifier, len(parks))
+
+    metadata = {
+        "version": MODEL_VERSION,
+        "trained_at": datetime.now().isoformat(timespec="seconds"),
+        "rows": int(len(df)),
+        "home_runs": int(y.sum()),
+        "first_game_date": str(df["game_date"].min()) if "game_date" in df.columns else None,
+        "last_game_date": str(df["game_date"].max()) if "game_date" in df.columns else None,
+        "parks": len(parks),
+        "iterations": int(classifier.n_iter_),
+        "axes": AXES,
+    }
+    model = XhrModel(grid, grid_no_spray, parks, metadata)
+    if holdout.any() and y[holdout].any():
+        # How much the grid gives up against the trees it was compiled from, on unseen rows
+        model_p = classifier.predict_proba(X[holdout])[:, 1]
+        grid_p = np.clip(model.score(X[holdout, 0], X[holdout, 1], X[holdout, 2], park_names(df)[holdout]), 1e-9, 1 - 1e-9)
+        metadata["holdout"] = {
+            "rows": int(holdout.sum()),
+            "log_loss": round(float(log_loss(y[holdout], model_p, labels=[False, True])), 5),
+            "grid_log_loss": round(float(log_loss(y[holdout], grid_p, labels=[False, True])), 5),
+            "brier": round(float(brier_score_loss(y[holdout], model_p)), 5),
+            "grid_brier": round(float(brier_score_loss(y[holdout], grid_p)), 5),
+            "home_runs": int(y[holdout].sum()),
+            "expected_home_runs": round(float(grid_p.sum()), 1),
+        }
+    return model
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    model = train_model(read_batted_balls())
+    model.save()
+    print(f"Trained xHR model on {model.metadata['rows']} batted balls: {model.metadata.get('holdout')}")
+    print(f"Saved to {MODEL_PATH}")
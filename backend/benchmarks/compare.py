@@ -0,0 +1,42 @@
+"""
+Compare two benchmark result files scenario by scenario.
+
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+import argparse
+import json
+
+
+def load_results(path: str) -> dict:
+    with open(path) as f:
+        report = json.load(f)
+    return {result["name"]: result for result in report["results"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=1.10,
+                        help="Flag scenarios whose median got slower by more than this ratio")
+    args = parser.parse_args(argv)
+
+    baseline, candidate = load_results(args.baseline), load_results(args.candidate)
+    print(f"{'scenario':<55} {'baseline ms':>12} {'candidate ms':>13} {'ratio':>7}")
+    regressions = 0
+    for name, result in candidate.items():
+        if name not in baseline:
+            print(f"{name:<55} {'-':>12} {result['median'] * 1000:13.1f}")
+            continue
+        before, after = baseline[name]["median"], result["median"]
+        ratio = after / before if before else float("inf")
+        flag = "  slower" if ratio > args.threshold else ""
+        regressions += bool(flag)
+        print(f"{name:<55} {before * 1000:12.1f} {after * 1000:13.1f} {ratio:7.2f}{flag}")
+    for name in baseline.keys() - candidate.keys():
+        print(f"{name:<55} {baseline[name]['median'] * 1000:12.1f} {'-':>13}")
+    print(f"{regressions} scenario(s) slower than {args.threshold:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Generate synthetic events and load them through the production loader.
+
+    python -m benchmarks.load --rows 1000000 --database sqlite:////tmp/deadball_bench.db
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Approximate number of rows (e.g. 1000000, 10000000)")
+    parser.add_argument("--database", default=os.getenv("BENCH_DATABASE_URL", "sqlite:////tmp/deadball_bench.db"),
+                        help="SQLAlchemy URL of a scratch database (SQLite file or local PostgreSQL)")
+    parser.add_argument("--first-season", type=int, default=2015)
+    parser.add_argument("--last-season", type=int, default=2024)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-days", type=int, default=30, help="Days generated and loaded per batch")
+    return parser.parse_args(argv)
+
+
+def store_dir_for(database: str) -> str:
+    """Columnar store directory for a benchmark database, so runs never share the app's own store."""
+    digest = hashlib.sha1(database.encode()).hexdigest()[:12]
+    return os.getenv("BENCH_STORE_DIR", os.path.join(tempfile.gettempdir(), f"deadball_bench_store_{digest}"))
+
+
+def load_synthetic(rows: int, seasons, seed: int = 0, chunk_days: int = 30) -> dict:
+    """Load about `rows` synthetic events into the configured database and export the columnar store; returns timing totals."""
+    from app.columnar import export_store
+    from app.loader import load_events, prepare_events
+    from app.schema import upgrade_schema
+    from benchmarks.synthetic import generate_events
+
+    upgrade_schema()
+    totals = {"rows": 0, "inserted": 0, "generate_seconds": 0.0, "prepare_seconds": 0.0, "load_seconds": 0.0}
+    started = time.perf_counter()
+    for raw in generate_events(rows, seasons, seed, chunk_days):
+        totals["generate_seconds"] += time.perf_counter() - started
+        started = time.perf_counter()
+        prepared = prepare_events(raw)
+        totals["prepare_seconds"] += time.perf_counter() - started
+        started = time.perf_counter()
+        totals["inserted"] += load_events(prepared)
+        totals["load_seconds"] += time.perf_counter() - started
+        totals["rows"] += len(raw)
+        print(f"Loaded {totals['rows']}/{rows} synthetic rows")
+        started = time.perf_counter()
+    export_store()
+    totals["export_seconds"] = time.perf_counter() - started
+    return totals
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # app.models builds its engine from DATABASE_URL at import time
+    os.environ["DATABASE_URL"] = args.database
+    os.environ["COLUMNAR_STORE_DIR"] = store_dir_for(args.database)
+    totals = load_synthetic(args.rows, range(args.first_season, args.last_season + 1), args.seed, args.chunk_days)
+    print(totals)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Run timed benchmark scenarios and write the results as JSON.
+
+    python -m benchmarks.run --database sqlite:////tmp/deadball_bench.db --output bench.json
+
+Load data first with python -m benchmarks.load. The ETL scenarios insert a week of new synthetic
+rows after the latest loaded date, so point this at a scratch database.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from benchmarks.load import store_dir_for
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database", default=os.getenv("BENCH_DATABASE_URL", "sqlite:////tmp/deadball_bench.db"),
+                        help="SQLAlchemy URL of the loaded scratch database")
+    parser.add_argument("--output", default="bench.json", help="Where to write the JSON results")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per scenario")
+    parser.add_argument("--drag-rows", type=int, default=1_000_000, help="Rows for the estimate_drag_coefficient scenario")
+    parser.add_argument("--etl-rows-per-day", type=int, default=3000, help="Synthetic rows per day fetched by the ETL scenarios")
+    parser.add_argument("--no-store", action="store_true", help="Serve every read from the database instead of the columnar store")
+    parser.add_argument("--only", default=None, help="Comma-separated scenario groups to run (routes, startup, analytics, etl)")
+    return parser.parse_args(argv)
+
+
+def time_scenario(
+    name: str,
+    group: str,
+    run: Callable[[], Optional[dict]],
+    repeat: int,
+    setup: Optional[Callable[[], None]] = None,
+    warmup: int = 0,
+) -> dict:
+    """Call run() warmup + repeat times (setup() untimed before each) and summarize the timed runs."""
+    timings = []
+    extra = {}
+    for i in range(warmup + repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        extra = run() or {}
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            timings.append(elapsed)
+    result = {
+        "name": name,
+        "group": group,
+        "runs": timings,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "max": max(timings),
+        **extra,
+    }
+    print(f"{name:<55} median {result['median'] * 1000:10.1f} ms")
+    return result
+
+
+# (scenario name, request path[, request headers]); every route in app/api/endpoints.py needs at least one entry.
+# The test client asks for gzip unless headers say otherwise.
+ROUTES = [
+    ("exit_velocity_distance records", "/exit_velocity_distance"),
+    ("exit_velocity_distance records identity", "/exit_velocity_distance", {"Accept-Encoding": "identity"}),
+    ("exit_velocity_distance columns", "/exit_velocity_distance?format=columns"),
+    ("exit_velocity_distance arrow", "/exit_velocity_distance?format=arrow"),
+    ("exit_velocity_distance grid", "/exit_velocity_distance?aggregate=grid"),
+    ("exit_velocity_distance stream ndjson", "/exit_velocity_distance?stream=ndjson"),
+    ("exit_velocity_distance one season", "/exit_velocity_distance?start_date=2024-01-01&end_date=2024-12-31"),
+    ("timeline", "/timeline"),
+    ("trig_explorer", "/trig_explorer"),
+    ("drag_vs_hr month", "/drag_vs_hr"),
+    ("drag_vs_hr day", "/drag_vs_hr?granularity=day"),
+    ("xhr_vs_actual month", "/xhr_vs_actual"),
+    ("expected_vs_actual_distance", "/expected_vs_actual_distance"),
+    ("expected_vs_actual_distance stream arrow", "/expected_vs_actual_distance?stream=arrow"),
+    ("expected_vs_actual_distance page", "/expected_vs_actual_distance?limit=10000"),
+    ("drag_coefficient_stats sketch", "/drag_coefficient_stats"),
+    ("drag_coefficient_stats exact", "/drag_coefficient_stats?exact=true"),
+    ("pitch_vs_exit_velocity", "/pitch_vs_exit_velocity"),
+    ("pitch_vs_exit_velocity FF hex", "/pitch_vs_exit_velocity?pitch_type=FF&aggregate=hex"),
+    ("spray_chart", "/spray_chart"),
+    ("dashboard", "/dashboard"),
+]
+
+
+def route_scenarios(client, repeat: int) -> list:
+    from app.api import endpoints
+    from app.main import app
+
+    covered = {route[1].split("?")[0] for route in ROUTES}
+    missing = sorted(route.path for route in endpoints.router.routes if route.path not in covered)
+    if missing:
+        print(f"Warning: no benchmark scenario for {', '.join(missing)}")
+
+    cache = app.state.CACHE
+
+    def request(path, headers=None):
+        def run():
+            response = client.get(path, headers=headers)
+            response.raise_for_status()
+            return {"status": response.status_code, "bytes": len(response.content),
+                    "wire_bytes": response.num_bytes_downloaded}
+        return run
+
+    results = []
+    for name, path, *headers in ROUTES:
+        headers = headers[0] if headers else None
+        results.append(time_scenario(f"GET {name} (cold)", "routes", request(path, headers), repeat, setup=cache.clear))
+        if "stream=" not in path:
+            results.append(time_scenario(f"GET {name} (cached)", "routes", request(path, headers), repeat, warmup=1))
+    return results
+
+
+def startup_scenarios(client, repeat: int) -> list:
+    from app.api import endpoints
+    from app.main import app
+
+    def refresh(path):
+        def run():
+            response = client.get(path)
+            response.raise_for_status()
+            return {"cache": response.json()["cache"], "dataset": response.json()["dataset"]}
+        return run
+
+    def restart():
+        # A new process: empty cache and no dataset in memory, only the snapshot file on disk
+        app.state.CACHE.clear()
+        app.state.DATASET = endpoints.exit_velocity_distance_dataset()
+
+    return [
+        time_scenario("refresh_cache full (cold start)", "startup", refresh("/refresh_cache?full=true&wait=true"), repeat),
+        time_scenario("refresh_cache from snapshot (restart)", "startup", refresh("/refresh_cache?wait=true"), repeat, setup=restart),
+        time_scenario("refresh_cache incremental (no new rows)", "startup", refresh("/refresh_cache?wait=true"), repeat),
+    ]
+
+
+def analytics_scenarios(repeat: int, rows: int) -> list:
+    import numpy as np
+    import pandas as pd
+    from app.analytics import estimate_drag_coefficient
+    from app.xhr import train_model
+    from benchmarks.synthetic import generate_events
+
+    df = pd.concat(generate_events(rows, seasons=(2024,), seed=1), ignore_index=True)
+
+    def run():
+        result = estimate_drag_coefficient(df)
+        return {"rows": len(df), "solved": int(result["drag_coefficient"].notna().sum())}
+    results = [time_scenario(f"estimate_drag_coefficient ({len(df)} rows)", "analytics", run, repeat)]
+
+    model = train_model(df)
+    batted = df[df["bb_type"].notna()]
+
+    def score():
+        return {"rows": len(batted), "xhr": float(np.nansum(model.score_frame(batted)))}
+    results.append(time_scenario(f"xhr score_frame ({len(batted)} rows)", "analytics", score, repeat))
+    return results
+
+
+def etl_scenarios(rows_per_day: int) -> list:
+    from app import etl_statcast_to_db, update_statcast_db
+    from benchmarks.synthetic import synthetic_fetcher
+
+    fetcher = synthetic_fetcher(rows_per_day)
+    latest = update_statcast_db.get_latest_game_date()
+    start = latest + timedelta(days=1)
+    results = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # A fresh week, then the same week again (everything already loaded)
+        for label in ("new rows", "rerun"):
+            def run():
+                inserted = etl_statcast_to_db.main(
+                    start.isoformat(), (start + timedelta(days=6)).isoformat(), fetcher=fetcher, cache_dir=cache_dir
+                )
+                return {"inserted": inserted}
+            results.append(time_scenario(f"etl_statcast_to_db 7 days ({label})", "etl", run, 1))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        end = update_statcast_db.get_latest_game_date() + timedelta(days=7)
+
+        def run():
+            return {"inserted": update_statcast_db.main(end.isoformat(), fetcher=fetcher, cache_dir=cache_dir)}
+        results.append(time_scenario("update_statcast_db 7 days", "etl", run, 1))
+    return results
+
+
+def environment(database: str) -> dict:
+    import numpy as np
+    import pandas as pd
+    import sqlalchemy
+    from sqlalchemy import func, select
+    from app.columnar import columnar_store
+    from app.models import StatcastEvent, engine
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    with engine.connect() as conn:
+        rows = conn.execute(select(func.count()).select_from(StatcastEvent)).scalar()
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "database": engine.url.render_as_string(hide_password=True),
+        "dialect": engine.dialect.name,
+        "statcast_events_rows": rows,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sqlalchemy": sqlalchemy.__version__,
+        "columnar_store": columnar_store.status(),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # app.models builds its engine from DATABASE_URL at import time
+    os.environ["DATABASE_URL"] = args.database
+    snapshot_dir = tempfile.TemporaryDirectory()
+    # An empty directory has no store, so every read falls back to the database
+    os.environ["COLUMNAR_STORE_DIR"] = snapshot_dir.name if args.no_store else store_dir_for(args.database)
+    os.environ["CACHE_SNAPSHOT_PATH"] = os.path.join(snapshot_dir.name, "exit_velocity_distance.parquet")
+    os.environ["XHR_MODEL_PATH"] = os.path.join(snapshot_dir.name, "xhr_grid.npz")
+    groups = set(args.only.split(",")) if args.only else {"routes", "startup", "analytics", "etl"}
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    report = {"environment": environment(args.database), "settings": vars(args), "results": []}
+    if "routes" in groups:
+        # /xhr_vs_actual needs a model, which the app loads at startup
+        from app.xhr import read_batted_balls, train_model
+        report["results"].append(time_scenario(
+            "xhr train_model", "analytics", lambda: train_model(read_batted_balls()).save(), 1
+        ))
+    # One event loop for the whole run, as under uvicorn (the async engine's pool is bound to it)
+    with TestClient(app) as client:
+        if "startup" in groups:
+            report["results"] += startup_scenarios(client, args.repeat)
+        if "routes" in groups:
+            report["results"] += route_scenarios(client, args.repeat)
+    if "analytics" in groups:
+        report["results"] += analytics_scenarios(args.repeat, args.drag_rows)
+    if "etl" in groups:
+        report["results"] += etl_scenarios(args.etl_rows_per_day)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
+    snapshot_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Synthetic Statcast batted-ball rows with plausible distributions, for benchmarks."""
+from datetime import date, timedelta
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.analytics import FEET_TO_METERS, MPH_TO_MPS
+from app.trajectory import simulate_carry
+
+SEASONS = tuple(range(2015, 2025))
+SEASON_START = (3, 28)
+SEASON_END = (9, 29)
+GAMES_PER_DAY = 15
+AT_BATS_PER_GAME = 99
+
+TEAMS = (
+    "ARI", "ATL", "BAL", "BOS", "CHC", "CWS", "CIN", "CLE", "COL", "DET", "HOU", "KC", "LAA", "LAD", "MIA",
+    "MIL", "MIN", "NYM", "NYY", "OAK", "PHI", "PIT", "SD", "SEA", "SF", "STL", "TB", "TEX", "TOR", "WSH",
+)
+# (pitch_type, share, mean release speed in mph)
+PITCHES = (
+    ("FF", 0.33, 94.0), ("SL", 0.17, 85.0), ("SI", 0.15, 93.0), ("CH", 0.11, 85.5), ("CU", 0.08, 79.0),
+    ("FC", 0.08, 89.0), ("ST", 0.04, 82.0), ("FS", 0.03, 86.0), ("KC", 0.01, 82.0),
+)
+# Non-HR outcomes per batted-ball type
+OUTCOMES = {
+    "ground_ball": (("field_out", 0.70), ("single", 0.22), ("double", 0.02), ("force_out", 0.04), ("grounded_into_double_play", 0.02)),
+    "line_drive": (("single", 0.45), ("field_out", 0.30), ("double", 0.20), ("triple", 0.02), ("sac_fly", 0.03)),
+    "fly_ball": (("field_out", 0.75), ("double", 0.10), ("single", 0.06), ("triple", 0.02), ("sac_fly", 0.07)),
+    "popup": (("field_out", 0.97), ("single", 0.03)),
+}
+# Statcast hit coordinates: home plate position and feet per coordinate unit
+HC_HOME = (125.42, 198.27)
+HC_FEET_PER_UNIT = 2.5
+
+
+def season_days(seasons=SEASONS) -> List[date]:
+    days = []
+    for season in seasons:
+        day, end = date(season, *SEASON_START), date(season, *SEASON_END)
+        while day <= end:
+            days.append(day)
+            day += timedelta(days=1)
+    return days
+
+
+def _choice(rng: np.random.Generator, options, n: int) -> np.ndarray:
+    labels = np.array([option[0] for option in options], dtype=object)
+    weights = np.array([option[1] for option in options], dtype=float)
+    return labels[rng.choice(len(labels), size=n, p=weights / weights.sum())]
+
+
+def synthesize_day_rows(days: List[date], rows_per_day: np.ndarray, rng: np.random.Generator) -> pd.DataFrame:
+    """Raw Statcast-shaped rows (as returned by pybaseball) for each day, rows_per_day[i] rows on days[i]."""
+    n = int(rows_per_day.sum())
+    game_date = np.repeat(np.array(days, dtype="datetime64[D]"), rows_per_day)
+    # Ordinal of each row within its day gives a unique natural key
+    ordinal = np.arange(n) - np.repeat(np.cumsum(rows_per_day) - rows_per_day, rows_per_day)
+    day_number = (game_date - np.datetime64("2000-01-01")).astype(np.int64)
+    game = ordinal % GAMES_PER_DAY
+
+    launch_speed = np.clip(rng.normal(89.0, 14.0, n), 20.0, 121.0)
+    launch_angle = np.clip(rng.normal(12.0, 27.0, n), -80.0, 85.0)
+    bb_type = np.select(
+        [launch_angle < 10, launch_angle < 25, launch_angle < 50],
+        ["ground_ball", "line_drive", "fly_ball"],
+        "popup",
+    ).astype(object)
+
+    # Airborne balls carry according to the drag model with per-ball scatter in Cd
+    airborne = launch_angle >= 5
+    distance = rng.uniform(5.0, 160.0, n)
+    carry = simulate_carry(
+        launch_speed[airborne] * MPH_TO_MPS, np.deg2rad(launch_angle[airborne]), np.clip(rng.normal(0.36, 0.05, airborne.sum()), 0.1, 0.6)
+    )
+    distance[airborne] = np.nan_to_num(carry, nan=50.0) / FEET_TO_METERS
+    distance = np.round(distance)
+
+    wall = rng.uniform(360.0, 420.0, n)
+    home_run = np.isin(bb_type, ["fly_ball", "line_drive"]) & (distance > wall) & (launch_angle > 15)
+    events = np.empty(n, dtype=object)
+    for kind, options in OUTCOMES.items():
+        rows = bb_type == kind
+        events[rows] = _choice(rng, options, int(rows.sum()))
+    events[home_run] = "home_run"
+
+    pitch_type = _choice(rng, PITCHES, n)
+    pitch_speed = {code: speed for code, _, speed in PITCHES}
+    release_speed = np.array([pitch_speed[code] for code in pitch_type]) + rng.normal(0.0, 2.5, n)
+
+    spray = np.deg2rad(np.clip(rng.normal(0.0, 22.0, n), -45.0, 45.0))
+    hc_x = HC_HOME[0] + distance / HC_FEET_PER_UNIT * np.sin(spray)
+    hc_y = HC_HOME[1] - distance / HC_FEET_PER_UNIT * np.cos(spray)
+
+    home_team = np.array(TEAMS, dtype=object)[(day_number * 7 + game * 2) % len(TEAMS)]
+    return pd.DataFrame({
+        "game_date": pd.to_datetime(game_date).strftime("%Y-%m-%d"),
+        "game_pk": 100000 + day_number * (GAMES_PER_DAY + 1) + game,
+        "at_bat_number": (ordinal // GAMES_PER_DAY) % AT_BATS_PER_GAME + 1,
+        "pitch_number": ordinal // (GAMES_PER_DAY * AT_BATS_PER_GAME) + 1,
+        "events": events,
+        "launch_speed": np.round(launch_speed, 1),
+        "launch_angle": np.round(launch_angle),
+        "hit_distance_sc": distance,
+        "pitch_type": pitch_type,
+        "release_speed": np.round(release_speed, 1),
+        "hc_x": np.round(hc_x, 2),
+        "hc_y": np.round(hc_y, 2),
+        "bb_type": bb_type,
+        "home_team": home_team,
+    })
+
+
+def generate_events(rows: int, seasons=SEASONS, seed: int = 0, chunk_days: int = 30) -> Iterator[pd.DataFrame]:
+    """
+    Yield about `rows` raw batted-ball rows spread evenly over the regular-season days of `seasons`,
+    chunk_days days per frame so 10M-row runs never hold everything in memory.
+    Output is reproducible for the same arguments.
+    """
+    days = season_days(seasons)
+    per_day = np.full(len(days), rows // len(days))
+    per_day[: rows % len(days)] += 1
+    for start in range(0, len(days), chunk_days):
+        rng = np.random.default_rng([seed, start])
+        yield synthesize_day_rows(days[start:start + chunk_days], per_day[start:start + chunk_days], rng)
+
+
+def synthetic_fetcher(rows_per_day: int = 500, seed: int = 0):
+    """A fetch_statcast_data fetcher returning synthetic rows for every day in the window."""
+    def fetch(start_dt: str, end_dt: str) -> Optional[pd.DataFrame]:
+        start, end = date.fromisoformat(start_dt), date.fromisoformat(end_dt)
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        rng = np.random.default_rng([seed, start.toordinal()])
+        return synthesize_day_rows(days, np.full(len(days), rows_per_day), rng)
+    return fetch
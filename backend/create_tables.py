@@ -1,6 +1,6 @@
-from app.models import Base, engine
- 
+from app.schema import upgrade_schema
+
 if __name__ == "__main__":
-    print("Creating tables...")
-    Base.metadata.create_all(engine)
-    print("Done.") 
\ No newline at end of file
+    print("Running migrations...")
+    upgrade_schema()
+    print("Done.")
@@ -0,0 +1,108 @@
+"""Baseline schema: statcast_events with its natural key, and statcast_daily_rollup
+
+Databases created earlier with Base.metadata.create_all are brought up to date
+in place (missing columns and the natural-key constraint are added). Their rows
+predate game_pk/at_bat_number/pitch_number, which cannot be recovered from the
+table, and rows with a NULL key never conflict, so reloading their dates would
+duplicate them. The upgrade stops while such rows exist; rerun it with
+PURGE_UNKEYED_EVENTS=1 to delete them, then reload those dates with the ETL.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NATURAL_KEY = ["game_date", "game_pk", "at_bat_number", "pitch_number"]
+KEY_COLUMNS = ("game_pk", "at_bat_number", "pitch_number")
+
+
+def purge_unkeyed_events(bind, existing: set):
+    """Delete (with PURGE_UNKEYED_EVENTS=1) or refuse to keep events without a full natural key."""
+    missing = [name for name in KEY_COLUMNS if name not in existing]
+    if missing:
+        where = ""
+    else:
+        where = " WHERE " + " OR ".join(f"{name} IS NULL" for name in NATURAL_KEY)
+    unkeyed = bind.execute(sa.text(f"SELECT count(*) FROM statcast_events{where}")).scalar()
+    if not unkeyed:
+        return
+    if os.getenv("PURGE_UNKEYED_EVENTS") != "1":
+        raise RuntimeError(
+            f"statcast_events has {unkeyed} rows without a natural key {tuple(NATURAL_KEY)}. "
+            "They cannot be backfilled and would be duplicated by the next overlapping load. "
+            "Rerun the upgrade with PURGE_UNKEYED_EVENTS=1 to delete them, then reload their dates with "
+            "app/etl_statcast_to_db.py (see README, Loading data)."
+        )
+    bind.execute(sa.text(f"DELETE FROM statcast_events{where}"))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if "statcast_events" not in tables:
+        op.create_table(
+            "statcast_events",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("game_date", sa.Date),
+            sa.Column("game_pk", sa.Integer),
+            sa.Column("at_bat_number", sa.Integer),
+            sa.Column("pitch_number", sa.Integer),
+            sa.Column("events", sa.String),
+            sa.Column("launch_speed", sa.Float),
+            sa.Column("launch_angle", sa.Float),
+            sa.Column("hit_distance_sc", sa.Float),
+            sa.Column("drag_coefficient", sa.Float),
+            sa.Column("pitch_type", sa.String),
+            sa.Column("release_speed", sa.Float),
+            sa.Column("hc_x", sa.Float),
+            sa.Column("hc_y", sa.Float),
+            sa.Column("bb_type", sa.String),
+            sa.Column("home_team", sa.String),
+            sa.Column("stadium", sa.String),
+            sa.UniqueConstraint(*NATURAL_KEY, name="uq_statcast_events_natural_key"),
+        )
+        op.create_index("ix_statcast_events_id", "statcast_events", ["id"])
+    else:
+        existing = {col["name"] for col in inspector.get_columns("statcast_events")}
+        purge_unkeyed_events(op.get_bind(), existing)
+        with op.batch_alter_table("statcast_events") as batch:
+            for name in ("game_pk", "at_bat_number", "pitch_number"):
+                if name not in existing:
+                    batch.add_column(sa.Column(name, sa.Integer))
+            constraints = {uc["name"] for uc in inspector.get_unique_constraints("statcast_events")}
+            if "uq_statcast_events_natural_key" not in constraints:
+                batch.create_unique_constraint("uq_statcast_events_natural_key", NATURAL_KEY)
+
+    if "statcast_daily_rollup" not in tables:
+        op.create_table(
+            "statcast_daily_rollup",
+            sa.Column("game_date", sa.Date, primary_key=True),
+            sa.Column("home_team", sa.String, primary_key=True),
+            sa.Column("batted_balls", sa.Integer, nullable=False),
+            sa.Column("fly_line_drives", sa.Integer, nullable=False),
+            sa.Column("home_runs", sa.Integer, nullable=False),
+            sa.Column("drag_sum", sa.Float, nullable=False),
+            sa.Column("drag_count", sa.Integer, nullable=False),
+            sa.Column("drag_home_runs", sa.Integer, nullable=False),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("statcast_daily_rollup")
+    op.drop_table("statcast_events")
@@ -0,0 +1,147 @@
+"""Range-partition statcast_events by season and add query-shaped indexes
+
+On PostgreSQL the table is rebuilt as PARTITION BY RANGE (game_date), with one
+partition per season and a default partition for anything outside them. The
+primary key becomes (id, game_date) because partition keys must be part of
+unique constraints. Other dialects keep a plain table.
+On every dialect game_date becomes NOT NULL (rows without one are dropped) and
+the separate index on id is dropped as redundant with the primary key.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FIRST_SEASON = 2015
+LAST_SEASON = 2030
+
+COLUMNS = """
+    game_date date NOT NULL,
+    game_pk integer,
+    at_bat_number integer,
+    pitch_number integer,
+    events varchar,
+    launch_speed double precision,
+    launch_angle double precision,
+    hit_distance_sc double precision,
+    drag_coefficient double precision,
+    pitch_type varchar,
+    release_speed double precision,
+    hc_x double precision,
+    hc_y double precision,
+    bb_type varchar,
+    home_team varchar,
+    stadium varchar
+"""
+COLUMN_NAMES = (
+    "id, game_date, game_pk, at_bat_number, pitch_number, events, launch_speed, launch_angle, "
+    "hit_distance_sc, drag_coefficient, pitch_type, release_speed, hc_x, hc_y, bb_type, home_team, stadium"
+)
+
+# (name, columns, partial-index predicate) matching the endpoint filters
+INDEXES = [
+    ("ix_statcast_events_game_date_drag", ["game_date"], "drag_coefficient IS NOT NULL"),
+    ("ix_statcast_events_game_date_launch", ["game_date"], "launch_speed IS NOT NULL"),
+    ("ix_statcast_events_bb_type_game_date", ["bb_type", "game_date"], None),
+    ("ix_statcast_events_pitch_type_game_date", ["pitch_type", "game_date"], None),
+    ("ix_statcast_events_events_game_date", ["events", "game_date"], None),
+]
+
+
+def _partition_postgresql() -> None:
+    bind = op.get_bind()
+    pk_name = sa.inspect(bind).get_pk_constraint("statcast_events")["name"]
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('statcast_events', 'id')")).scalar()
+
+    op.execute("ALTER TABLE statcast_events RENAME TO statcast_events_unpartitioned")
+    op.execute(f"ALTER TABLE statcast_events_unpartitioned RENAME CONSTRAINT {pk_name} TO statcast_events_unpartitioned_pkey")
+    op.execute(
+        "ALTER TABLE statcast_events_unpartitioned "
+        "RENAME CONSTRAINT uq_statcast_events_natural_key TO uq_statcast_events_unpartitioned_natural_key"
+    )
+    op.execute("ALTER INDEX IF EXISTS ix_statcast_events_id RENAME TO ix_statcast_events_unpartitioned_id")
+
+    op.execute(f"""
+        CREATE TABLE statcast_events (
+            id integer NOT NULL DEFAULT nextval('{sequence}'),
+            {COLUMNS},
+            CONSTRAINT statcast_events_pkey PRIMARY KEY (id, game_date),
+            CONSTRAINT uq_statcast_events_natural_key UNIQUE (game_date, game_pk, at_bat_number, pitch_number)
+        ) PARTITION BY RANGE (game_date)
+    """)
+    for season in range(FIRST_SEASON, LAST_SEASON + 1):
+        op.execute(
+            f"CREATE TABLE statcast_events_{season} PARTITION OF statcast_events "
+            f"FOR VALUES FROM ('{season}-01-01') TO ('{season + 1}-01-01')"
+        )
+    op.execute("CREATE TABLE statcast_events_default PARTITION OF statcast_events DEFAULT")
+
+    op.execute(
+        f"INSERT INTO statcast_events ({COLUMN_NAMES}) "
+        f"SELECT {COLUMN_NAMES} FROM statcast_events_unpartitioned WHERE game_date IS NOT NULL"
+    )
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY statcast_events.id")
+    op.execute("DROP TABLE statcast_events_unpartitioned")
+
+
+def _unpartition_postgresql() -> None:
+    bind = op.get_bind()
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('statcast_events', 'id')")).scalar()
+
+    op.execute("ALTER TABLE statcast_events RENAME TO statcast_events_partitioned")
+    op.execute("ALTER TABLE statcast_events_partitioned RENAME CONSTRAINT statcast_events_pkey TO statcast_events_partitioned_pkey")
+    op.execute(
+        "ALTER TABLE statcast_events_partitioned "
+        "RENAME CONSTRAINT uq_statcast_events_natural_key TO uq_statcast_events_partitioned_natural_key"
+    )
+    op.execute(f"""
+        CREATE TABLE statcast_events (
+            id integer NOT NULL DEFAULT nextval('{sequence}'),
+            {COLUMNS.replace("date NOT NULL", "date")},
+            CONSTRAINT statcast_events_pkey PRIMARY KEY (id),
+            CONSTRAINT uq_statcast_events_natural_key UNIQUE (game_date, game_pk, at_bat_number, pitch_number)
+        )
+    """)
+    op.execute(f"INSERT INTO statcast_events ({COLUMN_NAMES}) SELECT {COLUMN_NAMES} FROM statcast_events_partitioned")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY statcast_events.id")
+    op.execute("DROP TABLE statcast_events_partitioned")
+    op.create_index("ix_statcast_events_id", "statcast_events", ["id"])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        _partition_postgresql()
+    else:
+        op.execute("DELETE FROM statcast_events WHERE game_date IS NULL")
+        op.drop_index("ix_statcast_events_id", table_name="statcast_events", if_exists=True)
+        with op.batch_alter_table("statcast_events") as batch:
+            batch.alter_column("game_date", existing_type=sa.Date, nullable=False)
+    # On a partitioned table these are created on every partition automatically
+    for name, columns, where in INDEXES:
+        predicate = sa.text(where) if where else None
+        op.create_index(name, "statcast_events", columns, postgresql_where=predicate, sqlite_where=predicate)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, _, _ in INDEXES:
+        op.drop_index(name, table_name="statcast_events")
+    if op.get_bind().dialect.name == "postgresql":
+        _unpartition_postgresql()
+    else:
+        with op.batch_alter_table("statcast_events") as batch:
+            batch.alter_column("game_date", existing_type=sa.Date, nullable=True)
+        op.create_index("ix_statcast_events_id", "statcast_events", ["id"])
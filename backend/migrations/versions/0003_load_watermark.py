@@ -0,0 +1,34 @@
+"""Add statcast_load_watermark, bumped by every load to invalidate API caches
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "statcast_load_watermark",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("load_batch_id", sa.Integer, nullable=False),
+        sa.Column("max_game_date", sa.Date),
+        sa.Column("updated_at", sa.DateTime),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("statcast_load_watermark")
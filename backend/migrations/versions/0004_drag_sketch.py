@@ -0,0 +1,36 @@
+"""Add statcast_drag_sketch, per-day drag_coefficient t-digests
+
+Run `python -m app.rollups` afterwards to backfill sketches for existing events.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "statcast_drag_sketch",
+        sa.Column("game_date", sa.Date, primary_key=True),
+        sa.Column("bb_type", sa.String, primary_key=True),
+        sa.Column("count", sa.Integer, nullable=False),
+        sa.Column("sketch", sa.LargeBinary, nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("statcast_drag_sketch")
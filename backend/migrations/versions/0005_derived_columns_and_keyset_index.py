@@ -0,0 +1,65 @@
+"""Store derived physics on statcast_events and index (game_date, id) for keyset pages
+
+Adds expected_distance (vacuum carry in feet from launch_speed and launch_angle) and
+spray_angle (degrees from straight away center, from hc_x/hc_y). Existing rows are filled in
+here with one UPDATE; the loader computes both for new rows (app/analytics.add_derived_columns).
+On a large table the UPDATE rewrites every row, so run it outside peak hours.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+"""
+import math
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same formulas as app/analytics.py at the time of this revision
+EXPECTED_DISTANCE = (
+    "(launch_speed * 0.44704) * (launch_speed * 0.44704) * sin(2 * radians(launch_angle)) / 9.8 / 0.3048"
+)
+SPRAY_ANGLE = "degrees(atan2(hc_x - 125.42, 198.27 - hc_y))"
+
+
+def _ensure_sqlite_math(bind) -> None:
+    """Register the math functions on SQLite builds compiled without them."""
+    try:
+        bind.exec_driver_sql("SELECT sin(0), radians(0), degrees(0), atan2(0, 1)")
+    except sa.exc.OperationalError:
+        dbapi_connection = bind.connection.driver_connection
+        for name, func, args in (("sin", math.sin, 1), ("radians", math.radians, 1),
+                                 ("degrees", math.degrees, 1), ("atan2", math.atan2, 2)):
+            dbapi_connection.create_function(
+                name, args, lambda *values, func=func: None if None in values else func(*values), deterministic=True
+            )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    # On a partitioned table these are added to every partition automatically
+    op.add_column("statcast_events", sa.Column("expected_distance", sa.Float))
+    op.add_column("statcast_events", sa.Column("spray_angle", sa.Float))
+    if bind.dialect.name == "sqlite":
+        _ensure_sqlite_math(bind)
+    op.execute(
+        f"UPDATE statcast_events SET expected_distance = {EXPECTED_DISTANCE}, spray_angle = {SPRAY_ANGLE} "
+        "WHERE (launch_speed IS NOT NULL AND launch_angle IS NOT NULL) OR (hc_x IS NOT NULL AND hc_y IS NOT NULL)"
+    )
+    op.create_index("ix_statcast_events_game_date_id", "statcast_events", ["game_date", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_statcast_events_game_date_id", table_name="statcast_events")
+    op.drop_column("statcast_events", "spray_angle")
+    op.drop_column("statcast_events", "expected_distance")
@@ -0,0 +1,36 @@
+"""Add statcast_load_batches, the game-date range each watermark bump wrote
+
+Lets the cache snapshot re-read only what loads changed, including backfills of older dates.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "statcast_load_batches",
+        sa.Column("load_batch_id", sa.Integer, primary_key=True),
+        sa.Column("min_game_date", sa.Date),
+        sa.Column("max_game_date", sa.Date),
+        sa.Column("loaded_at", sa.DateTime),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("statcast_load_batches")
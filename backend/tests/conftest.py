@@ -0,0 +1,46 @@
+import os
+import tempfile
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+# app.models builds its engines from DATABASE_URL at import time, so point them (and every file the app
+# writes) at a scratch directory before any test imports the app; never at a real database
+SCRATCH_DIR = tempfile.mkdtemp(prefix="deadball-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH_DIR, 'deadball.db')}"
+os.environ["COLUMNAR_STORE_DIR"] = os.path.join(SCRATCH_DIR, "columnar_store")
+os.environ["CACHE_SNAPSHOT_PATH"] = os.path.join(SCRATCH_DIR, "snapshot", "exit_velocity_distance.parquet")
+os.environ["XHR_MODEL_PATH"] = os.path.join(SCRATCH_DIR, "models", "xhr_grid.npz")
+os.environ["STATCAST_CACHE_DIR"] = os.path.join(SCRATCH_DIR, "statcast_cache")
+os.environ.pop("SHARED_DATASET_DIR", None)
+# Read the load watermark on every request, so a load is seen by the next one
+os.environ["CACHE_WATERMARK_TTL"] = "0"
+
+# Synthetic events loaded into the scratch database (see benchmarks/synthetic.py)
+SEED_DAYS = [date(2024, 5, 1) + timedelta(days=i) for i in range(6)]
+SEED_ROWS_PER_DAY = 150
+
+
+@pytest.fixture(scope="session")
+def statcast_db():
+    """The scratch database, migrated and loaded with SEED_DAYS of synthetic events."""
+    from app.loader import load_events, prepare_events
+    from app.schema import upgrade_schema
+    from benchmarks.synthetic import synthesize_day_rows
+
+    upgrade_schema()
+    raw = synthesize_day_rows(SEED_DAYS, np.full(len(SEED_DAYS), SEED_ROWS_PER_DAY), np.random.default_rng(0))
+    load_events(prepare_events(raw))
+    return SEED_DAYS
+
+
+@pytest.fixture(scope="session")
+def client(statcast_db):
+    """A TestClient for the app over the scratch database, once its startup warm-up has finished."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        assert client.get("/refresh_cache", params={"wait": True}).status_code == 200
+        yield client
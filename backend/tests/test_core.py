@@ -0,0 +1,706 @@
+import asyncio
+import contextvars
+import functools
+import gzip
+import json
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from fastapi import HTTPException, Request
+from sqlalchemy import create_engine, delete, func, insert, select
+
+from app.analytics import bin_2d
+from app.cache import ResponseCache
+from app.columnar import ColumnarStore, export_store
+from app.concurrency import run_cpu
+from app.api import endpoints, streaming
+from app.api.endpoints import BinningParams, aggregate_scatter, decode_cursor, encode_cursor
+from app.api.serialization import IDENTITY, encode_json, frame_to_columns, negotiate_encoding
+from app.compact import compact_frame, expand_frame
+from app.data_ingest import MANIFEST_NAME, StatcastFetchError, fetch_statcast_data
+from app.loader import load_events, prepare_events
+from app.models import Base, DragSketch, StatcastDailyRollup, StatcastEvent, engine
+from app.rollups import refresh_daily_rollup, refresh_drag_sketches
+from app.shared import SharedDataset, attach_bodies, attach_frame, publish_frame
+from app.sketch import TDigest
+from app.snapshot import SnapshotDataset
+from app.trajectory import CD_MAX, TOLERANCE, simulate_carry, solve_drag_coefficient, vacuum_carry
+from app.watermark import bump_watermark, read_watermark
+from app.xhr import AXES, MODEL_VERSION, XhrModel, batted_balls_statement, load_model
+from benchmarks.synthetic import synthesize_day_rows
+
+
+def rank_error(values: np.ndarray, estimates: np.ndarray, qs: np.ndarray) -> np.ndarray:
+    """How far, in quantile terms, each estimate is from the quantile it was asked for."""
+    ordered = np.sort(values)
+    return np.abs(np.searchsorted(ordered, estimates) / len(ordered) - qs)
+
+
+def test_tdigest_quantiles():
+    values = np.random.default_rng(0).normal(0.35, 0.08, 100_000)
+    digest = TDigest.from_values(values)
+    qs = np.array([0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99])
+    assert len(digest.means) < 200
+    assert rank_error(values, digest.quantile(qs), qs).max() < 0.005
+    assert digest.count == len(values)
+    assert digest.min == values.min() and digest.max == values.max()
+    assert np.isclose(digest.sum, values.sum())
+
+
+def test_tdigest_merge():
+    rng = np.random.default_rng(1)
+    days = [rng.gamma(4.0, 0.08, rng.integers(50, 3000)) for _ in range(60)]
+    values = np.concatenate(days)
+    qs = np.array([0.05, 0.25, 0.5, 0.75, 0.95])
+    for compression in (200, None):
+        merged = TDigest.merge([TDigest.from_values(day) for day in days], compression=compression)
+        assert merged.count == len(values)
+        assert merged.min == values.min() and merged.max == values.max()
+        assert np.isclose(merged.sum, values.sum())
+        assert rank_error(values, merged.quantile(qs), qs).max() < 0.01
+    edges, counts = merged.histogram(20)
+    assert len(edges) == 21 and abs(int(counts.sum()) - len(values)) <= 20
+    assert TDigest.merge([TDigest.empty(), TDigest.from_values([np.nan])]).count == 0
+
+
+def test_tdigest_bytes_round_trip():
+    digest = TDigest.from_values(np.random.default_rng(2).uniform(0.1, 0.6, 5000))
+    restored = TDigest.from_bytes(digest.to_bytes())
+    assert np.array_equal(restored.means, digest.means) and np.array_equal(restored.weights, digest.weights)
+    assert (restored.min, restored.max, restored.sum) == (digest.min, digest.max, digest.sum)
+
+
+def test_solve_drag_coefficient_recovers_cd():
+    rng = np.random.default_rng(3)
+    n = 2000
+    speed = rng.uniform(30.0, 55.0, n)  # m/s
+    angle = np.deg2rad(rng.uniform(10.0, 45.0, n))
+    cd = rng.uniform(0.05, 0.6, n)
+    distance = simulate_carry(speed, angle, cd)
+    # Small chunks exercise the chunked path too
+    solved = solve_drag_coefficient(speed, angle, distance, chunk_size=512)
+    assert np.isfinite(solved).all()
+    assert np.abs(simulate_carry(speed, angle, solved) - distance).max() <= TOLERANCE
+    assert np.abs(solved - cd).max() < 0.01
+
+
+def test_solve_drag_coefficient_unreachable_distances():
+    speed = np.array([40.0, 40.0, 40.0])
+    angle = np.deg2rad([30.0, 30.0, 30.0])
+    # Beyond the vacuum carry (no Cd >= 0) and short of the carry at CD_MAX
+    too_far = vacuum_carry(speed[:1], angle[:1]) + 5.0
+    too_short = simulate_carry(speed[:1], angle[:1], np.array([CD_MAX])) - 5.0
+    distance = np.concatenate([too_far, too_short, simulate_carry(speed[:1], angle[:1], np.array([0.3]))])
+    solved = solve_drag_coefficient(speed, angle, distance)
+    assert np.isnan(solved[:2]).all()
+    assert abs(solved[2] - 0.3) < 0.01
+
+
+
+class FakeStatcast:
+    """Stands in for pybaseball: two pitches a day except on off days, failing for any window listed in fail."""
+    def __init__(self, off_days=(), fail=()):
+        self.off_days, self.fail, self.calls = set(off_days), set(fail), []
+
+    def __call__(self, start_dt, end_dt):
+        self.calls.append((start_dt, end_dt))
+        if (start_dt, end_dt) in self.fail:
+            raise ConnectionError("statcast timed out")
+        start, end = date.fromisoformat(start_dt), date.fromisoformat(end_dt)
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        rows = [(day.isoformat(), pitch) for day in days if day not in self.off_days for pitch in (1, 2)]
+        return pd.DataFrame(rows, columns=["game_date", "pitch_number"])
+
+
+def test_fetch_statcast_data_caches_and_resumes(tmp_path):
+    off_day = date(2024, 5, 4)
+    flaky = FakeStatcast(off_days=[off_day], fail=[("2024-05-04", "2024-05-06")])
+    with pytest.raises(StatcastFetchError) as info:
+        fetch_statcast_data("2024-05-01", "2024-05-06", window_days=3, max_workers=1, cache_dir=tmp_path, fetcher=flaky)
+    assert list(info.value.failures) == [(date(2024, 5, 4), date(2024, 5, 6))]
+    assert sorted(flaky.calls) == [("2024-05-01", "2024-05-03"), ("2024-05-04", "2024-05-06")]
+
+    # Only the failed window is fetched again
+    fetcher = FakeStatcast(off_days=[off_day])
+    df = fetch_statcast_data("2024-05-01", "2024-05-06", window_days=3, max_workers=1, cache_dir=tmp_path, fetcher=fetcher)
+    assert fetcher.calls == [("2024-05-04", "2024-05-06")]
+    assert len(df) == 10 and df["game_date"].is_monotonic_increasing
+    assert off_day.isoformat() not in set(df["game_date"])
+
+    manifest = json.loads((tmp_path / MANIFEST_NAME).read_text())["days"]
+    assert {day: entry["rows"] for day, entry in manifest.items()} == {
+        "2024-05-01": 2, "2024-05-02": 2, "2024-05-03": 2, "2024-05-04": 0, "2024-05-05": 2, "2024-05-06": 2,
+    }
+    assert sorted(path.name for path in tmp_path.glob("*.parquet")) == [
+        f"statcast_2024-05-0{day}.parquet" for day in (1, 2, 3, 5, 6)
+    ]
+
+    # A fully cached range (including the off day) never calls the fetcher
+    fetcher = FakeStatcast()
+    cached = fetch_statcast_data("2024-05-02", "2024-05-05", cache_dir=tmp_path, fetcher=fetcher)
+    assert fetcher.calls == [] and len(cached) == 6
+
+
+def test_fetch_statcast_data_raises_instead_of_returning_empty(tmp_path):
+    def down(start_dt, end_dt):
+        raise ConnectionError("statcast is down")
+
+    with pytest.raises(StatcastFetchError, match="statcast is down"):
+        fetch_statcast_data("2024-05-01", "2024-05-02", cache_dir=tmp_path, fetcher=down)
+    # Nothing was cached, so the next run fetches both days again
+    assert not (tmp_path / MANIFEST_NAME).exists()
+
+
+def test_refresh_daily_rollup_replaces_only_its_dates(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollup.db'}")
+    Base.metadata.create_all(engine)
+    events = [
+        # game_date, home_team, bb_type, events, drag_coefficient
+        (date(2024, 5, 1), "NYY", "fly_ball", "home_run", 0.30),
+        (date(2024, 5, 1), "NYY", "line_drive", "single", 0.40),
+        (date(2024, 5, 1), "NYY", "ground_ball", "field_out", 0.35),  # not in the drag sample
+        (date(2024, 5, 1), None, "fly_ball", "field_out", 0.70),  # outside (0.1, 0.6)
+        (date(2024, 5, 2), "BOS", "fly_ball", "home_run", 0.20),
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(StatcastEvent), [
+            {"game_date": d, "game_pk": 1, "at_bat_number": i, "pitch_number": 1, "home_team": team,
+             "bb_type": bb_type, "events": event, "drag_coefficient": cd}
+            for i, (d, team, bb_type, event, cd) in enumerate(events)
+        ])
+        assert refresh_daily_rollup(conn, date(2024, 5, 1), date(2024, 5, 2)) == 3
+        assert refresh_drag_sketches(conn, date(2024, 5, 1), date(2024, 5, 2)) == 4
+
+    def rollup(conn):
+        return {
+            (row.game_date, row.home_team): (row.batted_balls, row.fly_line_drives, row.home_runs,
+                                             round(row.drag_sum, 6), row.drag_count, row.drag_home_runs)
+            for row in conn.execute(select(StatcastDailyRollup))
+        }
+
+    with engine.begin() as conn:
+        assert rollup(conn) == {
+            (date(2024, 5, 1), "NYY"): (3, 2, 1, 0.7, 2, 1),
+            (date(2024, 5, 1), ""): (1, 1, 0, 0.0, 0, 0),
+            (date(2024, 5, 2), "BOS"): (1, 1, 1, 0.2, 1, 1),
+        }
+        # A reload of May 1 rewrites that day alone, without duplicating rows
+        conn.execute(delete(StatcastEvent).where(StatcastEvent.bb_type == "line_drive"))
+        conn.execute(delete(StatcastDailyRollup).where(StatcastDailyRollup.game_date == date(2024, 5, 2)))
+        refresh_daily_rollup(conn, date(2024, 5, 1), date(2024, 5, 1))
+        refresh_drag_sketches(conn, date(2024, 5, 1), date(2024, 5, 1))
+        assert rollup(conn) == {
+            (date(2024, 5, 1), "NYY"): (2, 1, 1, 0.3, 1, 1),
+            (date(2024, 5, 1), ""): (1, 1, 0, 0.0, 0, 0),
+        }
+        sketches = {(row.game_date, row.bb_type): row.count for row in conn.execute(select(DragSketch))}
+        assert sketches == {
+            (date(2024, 5, 1), "fly_ball"): 2,
+            (date(2024, 5, 1), "ground_ball"): 1,
+            (date(2024, 5, 2), "fly_ball"): 1,
+        }
+
+
+
+def test_load_events_skips_loaded_rows(statcast_db):
+    days = [date(2023, 6, 1), date(2023, 6, 2)]
+    events = prepare_events(synthesize_day_rows(days, np.array([40, 30]), np.random.default_rng(4)))
+
+    def stored():
+        with engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(StatcastEvent).where(StatcastEvent.game_date.in_(days))).scalar()
+
+    before = read_watermark()
+    assert load_events(events, batch_size=25) == 70
+    loaded = read_watermark()
+    assert loaded != before and stored() == 70
+    # A second load of the same batch inserts nothing and leaves caches valid
+    assert load_events(events, batch_size=25) == 0
+    assert read_watermark() == loaded and stored() == 70
+
+
+def test_cursor_round_trip():
+    for game_date, row_id in ((date(2024, 5, 1), 1), (pd.Timestamp("2015-04-05"), 123456789), (np.datetime64("2030-10-01"), np.int64(7))):
+        cursor = encode_cursor(game_date, row_id)
+        assert cursor.isascii() and "/" not in cursor and "+" not in cursor
+        assert decode_cursor(cursor) == (pd.Timestamp(game_date).date(), int(row_id))
+    for bad in ("not a cursor", encode_cursor(date(2024, 5, 1), 1)[:-4], "MjAyNC0wNS0wMQ=="):
+        with pytest.raises(HTTPException) as info:
+            decode_cursor(bad)
+        assert info.value.status_code == 400
+
+
+def test_frame_to_columns_keeps_numbers_in_numpy():
+    df = pd.DataFrame({
+        "game_date": [date(2024, 5, 1), None, date(2024, 5, 1)],
+        "launch_speed": [101.2, np.nan, np.inf],
+        "at_bat_number": [1, 2, 3],
+        "bb_type": ["fly_ball", None, "fly_ball"],
+    })
+    expected = {
+        "game_date": ["2024-05-01", None, "2024-05-01"],
+        "launch_speed": [101.2, None, None],
+        "at_bat_number": [1, 2, 3],
+        "bb_type": ["fly_ball", None, "fly_ball"],
+    }
+    for frame in (df, compact_frame(df)):
+        payload = frame_to_columns(frame)
+        # Numeric columns go to orjson as arrays, never as per-row Python objects
+        assert isinstance(payload["data"]["launch_speed"], np.ndarray)
+        assert isinstance(payload["data"]["at_bat_number"], np.ndarray)
+        assert json.loads(encode_json(payload))["data"] == expected
+
+
+def test_bin_2d_grid_and_hex():
+    # The NaN point is dropped; its drag and home run are not counted
+    cells = bin_2d(np.array([0.2, 0.7, 1.5, np.nan]), np.array([0.3, 0.1, 0.5, 1.0]), 1.0, 1.0,
+                   drag=np.array([0.3, np.nan, 0.4, 0.9]), home_run=np.array([True, False, False, True]))
+    assert cells.to_dict(orient="list") == {
+        "x": [0.5, 1.5], "y": [0.5, 0.5], "count": [2, 1], "drag_coefficient": [0.3, 0.4], "hr_rate": [0.5, 0.0],
+    }
+    # Hex centers alternate between the integer lattice and the one offset by half a bin
+    cells = bin_2d(np.array([0.05, -0.04, 0.52, 1.0]), np.array([0.02, 0.01, 0.48, 0.0]), 1.0, 1.0,
+                   drag=np.array([0.2, 0.4, 0.3, 0.5]), home_run=np.array([True, False, False, True]), shape="hex")
+    assert cells[["x", "y", "count", "hr_rate"]].to_dict(orient="list") == {
+        "x": [0.0, 0.5, 1.0], "y": [0.0, 0.5, 0.0], "count": [2, 1, 1], "hr_rate": [0.5, 0.0, 1.0],
+    }
+    assert np.allclose(cells["drag_coefficient"], [0.3, 0.3, 0.5])
+    assert list(bin_2d(np.array([np.nan]), np.array([1.0]), 1.0, 1.0).columns) == ["x", "y", "count", "drag_coefficient", "hr_rate"]
+
+
+def test_aggregate_scatter_rejects_tiny_bins():
+    df = pd.DataFrame({"launch_speed": [60.0, 90.0, 120.0], "hit_distance_sc": [100.0, 250.0, 400.0]})
+    binning = BinningParams("grid", 60, None, None, None, None, None, None)
+    cells, meta = aggregate_scatter(df, "launch_speed", "hit_distance_sc", binning, "grid")
+    assert meta["x_bin_size"] == 1.0 and cells["count"].sum() == 3
+    binning = BinningParams("grid", 60, 0.00001, None, None, None, None, None)
+    with pytest.raises(HTTPException) as info:
+        aggregate_scatter(df, "launch_speed", "hit_distance_sc", binning, "grid")
+    assert info.value.status_code == 400
+    # The same bin size is fine over a narrow enough zoom window
+    binning = BinningParams("grid", 60, 0.00001, None, 90.0, 90.001, None, None)
+    cells, meta = aggregate_scatter(df, "launch_speed", "hit_distance_sc", binning, "grid")
+    assert meta["points"] == 1 and len(cells) == 1
+
+
+def test_full_refresh_queues_behind_a_running_one(client, monkeypatch):
+    runs = []
+
+    async def slow_warm_cache(cache, dataset, full=False):
+        runs.append(full)
+        await asyncio.sleep(0.3)
+        return {"full": full}
+
+    monkeypatch.setattr(endpoints, "warm_cache", slow_warm_cache)
+    assert client.get("/refresh_cache").json()["status"] == "Cache refresh started"
+    assert client.get("/refresh_cache").json()["status"] == "Cache refresh already running"
+    assert client.get("/refresh_cache", params={"full": True}).json()["status"] == "Full cache refresh queued"
+    # Queued once, however often it is asked for; wait=true waits for the full refresh
+    assert client.get("/refresh_cache", params={"full": True}).json()["status"] == "Cache refresh already running"
+    done = client.get("/refresh_cache", params={"full": True, "wait": True}).json()
+    assert runs == [False, True]
+    assert done["state"] == "done" and done["full"] and done["dataset"] == {"full": True}
+
+
+
+def test_cached_and_streamed_rows_match(client, statcast_db):
+    def rows(records):
+        return sorted(tuple(sorted(row.items())) for row in records)
+
+    params = {"start_date": statcast_db[0].isoformat(), "end_date": statcast_db[-1].isoformat()}
+    streamed = client.get("/exit_velocity_distance", params={**params, "stream": "ndjson"}).text.splitlines()
+    streamed = rows(json.loads(line) for line in streamed)
+    assert len(streamed) > 100
+    # The second response is the stored body of the compact cache entry
+    for _ in range(2):
+        assert rows(client.get("/exit_velocity_distance", params=params).json()["data"]) == streamed
+    # The full-history snapshot dataset serves the same rows (other tests load other dates)
+    full_history = client.get("/exit_velocity_distance").json()["data"]
+    assert rows(row for row in full_history if params["start_date"] <= row["game_date"] <= params["end_date"]) == streamed
+    # drag_coefficient keeps every digit, not float32's seven
+    drag = [dict(row)["drag_coefficient"] for row in streamed]
+    assert any(value != float(f"{value:.7g}") for value in drag)
+
+
+def test_keyset_pages_join_up_to_the_unpaged_rows(client, statcast_db):
+    params = {"start_date": statcast_db[0].isoformat(), "end_date": statcast_db[-1].isoformat()}
+    unpaged = client.get("/exit_velocity_distance", params=params).json()["data"]
+    pages, cursor = [], None
+    while True:
+        page = client.get("/exit_velocity_distance", params={**params, "limit": 37, **({"cursor": cursor} if cursor else {})}).json()
+        pages.append(page["data"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+        assert len(page["data"]) == 37
+    # Many rows share a game_date, so pages end mid-day and the id tiebreak has to hold
+    assert len(unpaged) > len(statcast_db) * 37 and len(pages) == -(-len(unpaged) // 37)
+    paged = [row for page in pages for row in page]
+    assert paged == sorted(paged, key=lambda row: row["game_date"])
+    assert sorted(map(json.dumps, paged)) == sorted(map(json.dumps, unpaged))
+    # A limit past the end gives one page with no cursor
+    page = client.get("/exit_velocity_distance", params={**params, "limit": len(unpaged)}).json()
+    assert len(page["data"]) == len(unpaged) and page["next_cursor"] is None
+    for bad in ("not a cursor", "MjAyNC0wNS0wMQ=="):
+        assert client.get("/exit_velocity_distance", params={**params, "cursor": bad}).status_code == 400
+
+
+def test_streamed_ndjson_and_arrow_match_the_response(client, statcast_db, monkeypatch):
+    # Small batches, so each stream spans several server-side cursor fetches
+    monkeypatch.setattr(streaming, "iter_frames", functools.partial(streaming.iter_frames, batch_size=100))
+    params = {"start_date": statcast_db[0].isoformat(), "end_date": statcast_db[-1].isoformat()}
+    expected = client.get("/expected_vs_actual_distance", params=params).json()["data"]
+    assert len(expected) > 300
+
+    ndjson = client.get("/expected_vs_actual_distance", params={**params, "stream": "ndjson"})
+    assert ndjson.headers["content-type"] == streaming.NDJSON_MEDIA_TYPE
+    assert sorted(ndjson.text.splitlines()) == sorted(json.dumps(row, separators=(",", ":")) for row in expected)
+
+    arrow = client.get("/expected_vs_actual_distance", params={**params, "stream": "arrow"})
+    table = pa.ipc.open_stream(arrow.content).read_all()
+    assert table.schema.field("game_date").type == pa.date32() and table.schema.field("expected_distance").type == pa.float64()
+    streamed = table.to_pandas().assign(game_date=lambda df: df["game_date"].astype(str))
+    assert sorted(map(tuple, streamed.to_numpy().tolist())) == sorted(tuple(row.values()) for row in expected)
+
+    for extra in ({"stream": "csv"}, {"stream": "ndjson", "limit": 10}):
+        assert client.get("/expected_vs_actual_distance", params={**params, **extra}).status_code == 400
+    assert client.get("/exit_velocity_distance", params={**params, "stream": "ndjson", "aggregate": "grid"}).status_code == 400
+
+
+def test_response_cache_drops_entries_on_watermark_change():
+    watermark = ["1:2024-05-01"]
+    cache = ResponseCache(max_bytes=2000, watermark_ttl=0, watermark_reader=lambda: watermark[0])
+    computed = []
+
+    async def compute(n):
+        computed.append(n)
+        return {"data": list(range(n))}
+
+    async def get(key, n):
+        return await cache.get_or_compute(key, lambda: compute(n))
+
+    assert asyncio.run(get("a", 3)) == {"data": [0, 1, 2]}
+    assert asyncio.run(get("a", 3)) == {"data": [0, 1, 2]} and computed == [3]
+    etag = cache.etag("a", "records")
+    assert etag.startswith('W/"') and etag == cache.etag("a", "records") != cache.etag("a", "columns")
+    # A load drops every entry and every validator
+    watermark[0] = "2:2024-05-02"
+    assert cache.etag("a", "records") != etag
+    asyncio.run(get("a", 3))
+    assert computed == [3, 3] and (cache.hits, cache.misses) == (1, 2)
+    # Least recently used entries go first once max_bytes is exceeded
+    asyncio.run(get("b", 300))
+    asyncio.run(get("a", 3))
+    asyncio.run(get("c", 300))
+    assert cache.get("b") is None and cache.get("a") is not None and cache.stats()["bytes"] <= 2000
+
+
+def test_if_none_match_revalidates_until_the_next_load(client, statcast_db):
+    params = {"start_date": statcast_db[0].isoformat(), "end_date": statcast_db[-1].isoformat(), "granularity": "day"}
+    first = client.get("/drag_vs_hr", params=params)
+    assert first.status_code == 200 and len(first.json()["data"]) == len(statcast_db)
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+    for header in (etag, etag.removeprefix("W/"), f'"other", {etag}'):
+        revalidated = client.get("/drag_vs_hr", params=params, headers={"If-None-Match": header})
+        assert revalidated.status_code == 304 and revalidated.content == b"" and revalidated.headers["etag"] == etag
+    # Other parameters are another representation
+    assert client.get("/drag_vs_hr", params={**params, "granularity": "month"}, headers={"If-None-Match": etag}).status_code == 200
+
+    with engine.begin() as conn:
+        bump_watermark(conn)
+    after_load = client.get("/drag_vs_hr", params=params, headers={"If-None-Match": etag})
+    assert after_load.status_code == 200 and after_load.headers["etag"] != etag
+    assert after_load.json() == first.json()
+
+    assert client.get("/drag_vs_hr", params={**params, "granularity": "fortnight"}).status_code == 400
+    assert client.get("/drag_vs_hr", params={**params, "start_date": "2024-13-01"}).status_code == 400
+
+
+def test_metrics_and_profile_headers(client, statcast_db):
+    def samples():
+        text = client.get("/metrics").text
+        return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if not line.startswith("#")}
+
+    route = '{route="/pitch_vs_exit_velocity"}'
+    params = {"start_date": statcast_db[2].isoformat(), "end_date": statcast_db[3].isoformat(), "bb_type": "fly_ball"}
+    before = samples()
+    profiled = {"X-Deadball-Profile": "1"}
+    miss = client.get("/pitch_vs_exit_velocity", params=params, headers=profiled)
+    hit = client.get("/pitch_vs_exit_velocity", params=params, headers=profiled)
+    plain = client.get("/pitch_vs_exit_velocity", params=params)
+    rows = len(miss.json()["data"])
+    assert rows > 0 and miss.headers["x-deadball-rows"] == str(rows)
+    assert (miss.headers["x-deadball-cache"], hit.headers["x-deadball-cache"]) == ("miss", "hit")
+    assert [part.split(";")[0] for part in miss.headers["server-timing"].split(", ")] == ["query", "transform", "serialize", "total"]
+    # With CACHE_WATERMARK_TTL=0 a hit still reads the watermark, but runs no data query
+    assert int(hit.headers["x-deadball-queries"]) < int(miss.headers["x-deadball-queries"])
+    assert "server-timing" not in plain.headers
+
+    after = samples()
+    def delta(name):
+        return after.get(name, 0.0) - before.get(name, 0.0)
+    assert delta('deadball_request_duration_seconds_count{route="/pitch_vs_exit_velocity",method="GET",status="200"}') == 3
+    assert delta('deadball_cache_requests_total{route="/pitch_vs_exit_velocity",result="miss"}') == 1
+    assert delta('deadball_cache_requests_total{route="/pitch_vs_exit_velocity",result="hit"}') == 2
+    assert delta(f"deadball_response_rows_total{route}") == 3 * rows
+    # Bytes on the wire, so the gzip bodies the test client asks for
+    assert delta(f"deadball_response_bytes_total{route}") == sum(int(r.headers["content-length"]) for r in (miss, hit, plain))
+    assert delta(f"deadball_db_query_duration_seconds_count{route}") >= 1
+    assert after['deadball_cache_entries{route="pitch_vs_exit_velocity"}'] >= 1
+
+
+def test_read_frame_reads_in_batches_without_blocking_the_loop(client, statcast_db, monkeypatch):
+    monkeypatch.setattr(endpoints, "STREAM_BATCH_SIZE", 64)
+    statement = endpoints.expected_vs_actual_distance_statement(statcast_db[0], statcast_db[-1])
+    with engine.connect() as conn:
+        expected = pd.read_sql(statement, conn)
+    assert len(expected) > 4 * 64
+
+    async def read_concurrently():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        frames = await asyncio.gather(*(endpoints.read_frame(statement) for _ in range(3)))
+        ticker.cancel()
+        return frames, ticks
+
+    # On the app's event loop, where its async engine and semaphores live
+    frames, ticks = client.portal.call(read_concurrently)
+    assert ticks > 0
+    for frame in frames:
+        assert frame.equals(expected)
+    empty = client.portal.call(endpoints.read_frame, endpoints.expected_vs_actual_distance_statement(date(1999, 1, 1), date(1999, 1, 2)))
+    assert empty.empty and list(empty.columns) == list(expected.columns)
+
+    # CPU work carries the caller's context variables (e.g. the request's metrics) onto the executor
+    request = contextvars.ContextVar("request")
+
+    async def in_request():
+        request.set("GET /expected_vs_actual_distance")
+        return await run_cpu(request.get)
+
+    assert asyncio.run(in_request()) == "GET /expected_vs_actual_distance"
+
+
+def test_snapshot_dataset_tops_up_and_rebuilds(statcast_db, tmp_path):
+    start = date(2010, 4, 1)
+    table = pd.DataFrame({"game_date": [start + timedelta(days=i // 3) for i in range(12)], "launch_speed": np.arange(12.0) + 80.5})
+    fetches = []
+
+    async def fetch(start_dt, end_dt):
+        fetches.append(start_dt)
+        return table[(table["game_date"] >= start_dt) & (table["game_date"] <= end_dt)].reset_index(drop=True)
+
+    def load(dataset, full=False):
+        frame = asyncio.run(dataset.refresh(read_watermark(), full))
+        assert expand_frame(frame).equals(table), dataset.source
+        return dataset.source
+
+    def bump(*dates):
+        with engine.begin() as conn:
+            bump_watermark(conn, max(dates, default=None), min(dates, default=None))
+
+    path = str(tmp_path / "snapshot.parquet")
+    assert load(SnapshotDataset(fetch, start, "scratch", path)) == "database" and fetches == [start]
+    # A restart reads the snapshot; only rows from the latest cached day on are fetched after a load
+    dataset = SnapshotDataset(fetch, start, "scratch", path)
+    assert asyncio.run(dataset.load()) and dataset.source == "snapshot" and len(dataset.frame) == 12
+    table = pd.concat([table, pd.DataFrame({"game_date": [date(2010, 4, 5)], "launch_speed": [99.5]})], ignore_index=True)
+    bump(date(2010, 4, 5))
+    assert load(dataset) == "incremental" and fetches[-1] == date(2010, 4, 4)
+    # A backfill of an older day is re-read from that day
+    table.loc[table["game_date"] == date(2010, 4, 2), "launch_speed"] += 0.25
+    bump(date(2010, 4, 2))
+    assert load(dataset) == "incremental" and fetches[-1] == date(2010, 4, 2)
+    # Loads that did not record their dates, or full=true, rebuild from start_date
+    bump()
+    assert load(dataset) == "database" and fetches[-1] == start
+    assert load(dataset, full=True) == "database" and fetches[-1] == start
+    # Nothing loaded since: served as it is
+    calls = len(fetches)
+    assert load(dataset) == "database" and len(fetches) == calls
+    # A snapshot of another database is never topped up
+    assert not asyncio.run(SnapshotDataset(fetch, start, "elsewhere", path).load())
+
+
+def test_columnar_store_matches_sql(statcast_db, tmp_path):
+    def ordered(df):
+        return df.sort_values(list(df.columns), ignore_index=True)
+
+    start, end = statcast_db[1], statcast_db[-2]
+    statements = [
+        endpoints.exit_velocity_distance_statement(start, end, [StatcastEvent.events]),
+        endpoints.expected_vs_actual_distance_statement(start, end),
+        endpoints.pitch_vs_exit_velocity_statement(start, end, "FF,SL", None, 85, 100, 60, 120),
+        endpoints.pitch_vs_exit_velocity_statement(start, end, None, "ground_ball", 30, 110, 40, 130),
+        endpoints.dashboard_statement(start, end, list(endpoints.DASHBOARD_VIEWS)),
+        batted_balls_statement(start, end),
+        select(StatcastEvent.game_date, StatcastEvent.home_team).where(StatcastEvent.game_date == end,
+                                                                       StatcastEvent.stadium.is_(None)),
+    ]
+    manifest = export_store(str(tmp_path))
+    store = ColumnarStore(str(tmp_path), watermark_ttl=0)
+    assert store.status()["fresh"] and store.status()["rows"] == manifest["rows"]
+    with engine.connect() as conn:
+        for statement in statements:
+            expected = pd.read_sql(statement, conn)
+            served = store.query(statement)
+            assert served is not None and len(served) == len(expected) > 0
+            pd.testing.assert_frame_equal(ordered(served), ordered(expected), check_dtype=False)
+    # Statements it cannot evaluate, and a store older than the latest load, go to the database
+    paged = endpoints.PageParams(10, None).apply(endpoints.expected_vs_actual_distance_statement(start, end))
+    assert store.query(paged) is None
+    with engine.begin() as conn:
+        bump_watermark(conn)
+    assert store.query(statements[0]) is None and not store.status()["fresh"]
+
+
+def test_xhr_grid_interpolates_and_survives_save_and_load(tmp_path):
+    # A grid linear in every axis, with a per-park offset: multilinear interpolation reproduces it exactly
+    speed, angle, spray = (np.linspace(*AXES[name]) for name in AXES)
+    offsets = np.array([0.0, 0.1, 0.2])  # two parks and the unknown park
+    linear = speed[:, None, None] / 1000 + angle[None, :, None] / 100 + spray[None, None, :] / 10000
+    grid = offsets[:, None, None, None] + linear
+    grid_no_spray = offsets[:, None, None] + speed[:, None] / 1000 + angle[None, :] / 100
+    metadata = {"version": MODEL_VERSION, "trained_at": "2024-05-07T00:00:00", "rows": 1, "axes": AXES}
+    model = XhrModel(grid, grid_no_spray, ["Fenway Park", "Wrigley Field"], metadata)
+
+    def expected(s, a, y, offset):
+        s, a = np.clip(s, 60, 120), np.clip(a, 0, 60)
+        return offset + s / 1000 + a / 100 + (0 if np.isnan(y) else np.clip(y, -48, 48) / 10000)
+
+    balls = [
+        (60.0, 0.0, -48.0, "Fenway Park"),  # grid corner
+        (104.25, 27.9, 11.1, "Wrigley Field"),  # between grid points
+        (130.0, -10.0, 90.0, "Fenway Park"),  # clamped to the edges
+        (98.0, 30.0, 5.0, "Coors Field"),  # a park the model has not seen
+        (98.0, 30.0, np.nan, "Wrigley Field"),  # no hit coordinates
+        (np.nan, 30.0, 5.0, "Fenway Park"),  # no launch speed
+    ]
+    s, a, y, parks = (list(column) for column in zip(*balls))
+    scores = model.score(s, a, y, parks)
+    park_offsets = {"Fenway Park": 0.0, "Wrigley Field": 0.1}
+    want = [expected(*ball[:3], park_offsets.get(ball[3], 0.2)) for ball in balls[:-1]]
+    np.testing.assert_allclose(scores[:-1], want, rtol=1e-12)
+    assert np.isnan(scores[-1])
+
+    path = str(tmp_path / "models" / "xhr_grid.npz")
+    model.save(path)
+    loaded = load_model(path)
+    assert loaded is not None and list(loaded.parks) == list(model.parks)
+    np.testing.assert_array_equal(loaded.score(s, a, y, parks), scores)
+    assert loaded.status() == {key: value for key, value in metadata.items() if key != "axes"}
+
+    XhrModel(grid, grid_no_spray, [], dict(metadata, version=MODEL_VERSION + 1)).save(path)
+    assert load_model(path) is None
+    assert load_model(str(tmp_path / "missing.npz")) is None
+
+
+def test_negotiate_encoding():
+    def negotiate(accept_encoding):
+        return negotiate_encoding(Request({"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]}))
+
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("GZIP;q=0.5") == "gzip"
+    assert negotiate("*") in ("br", "zstd", "gzip")
+    for refused in ("", "deflate", "identity;q=1, gzip;q=0", "*;q=0", "gzip;q=oops"):
+        assert negotiate(refused) == IDENTITY
+
+
+def test_compressed_bodies_are_cached_and_match_identity(client, statcast_db):
+    params = {"start_date": statcast_db[1].isoformat(), "end_date": statcast_db[-1].isoformat()}
+
+    def raw(accept_encoding):
+        with client.stream("GET", "/expected_vs_actual_distance", params=params,
+                           headers={"Accept-Encoding": accept_encoding}) as response:
+            assert response.status_code == 200
+            return response.headers.get("content-encoding"), b"".join(response.iter_raw())
+
+    encoding, plain = raw("identity;q=1, gzip;q=0")
+    assert encoding is None and len(json.loads(plain)["data"]) > 300
+    encoding, compressed = raw("gzip")
+    assert encoding == "gzip" and len(compressed) < len(plain)
+    assert gzip.decompress(compressed) == plain
+    # Repeats are served from the bodies stored with the cache entry, byte for byte
+    assert raw("gzip") == ("gzip", compressed) and raw("identity") == (None, plain)
+    entry = next(entry for entry in client.get("/cache_stats").json()["entries"]
+                 if "expected_vs_actual_distance" in entry["key"] and params["start_date"] in entry["key"])
+    assert sorted(entry["bodies"].values()) == sorted([len(compressed), len(plain)])
+
+
+def test_shared_dataset_publishes_and_attaches(statcast_db, tmp_path):
+    start, end = statcast_db[0], statcast_db[-1]
+
+    async def fetch(start_dt, end_dt):
+        statement = endpoints.exit_velocity_distance_statement(start_dt, min(end_dt, end), [StatcastEvent.events])
+        with engine.connect() as conn:
+            return pd.read_sql(statement, conn)
+
+    frame = asyncio.run(fetch(start, end))
+    frame.loc[len(frame)] = {"game_date": None, "launch_speed": 101.5, "events": None}
+    compact = compact_frame(frame)
+    assert isinstance(compact["events"].dtype, pd.CategoricalDtype)
+
+    directory = str(tmp_path / "published")
+    generation = publish_frame(directory, frame, {"database": "scratch"}, endpoints.exit_velocity_distance_bodies)
+    path = str(tmp_path / "published" / generation)
+    attached, manifest = attach_frame(path)
+    assert manifest["rows"] == len(frame) and manifest["database"] == "scratch"
+    pd.testing.assert_frame_equal(expand_frame(attached), expand_frame(compact), check_dtype=False)
+    bodies = attach_bodies(path, manifest)
+    assert {name: (bytes(content), *rest) for name, (content, *rest) in bodies.items()} == \
+        endpoints.exit_velocity_distance_bodies(compact)
+
+    # One loader publishes, a second worker on the same directory attaches what it published
+    def dataset():
+        return SharedDataset(fetch, start, "scratch", str(tmp_path / "snapshot.parquet"),
+                             directory=str(tmp_path / "shared"), render_bodies=endpoints.exit_velocity_distance_bodies)
+
+    loader, worker = dataset(), dataset()
+    watermark = read_watermark()
+    asyncio.run(loader.refresh(watermark))
+    assert loader.lock.held and loader.source == "database"
+    asyncio.run(worker.refresh(watermark))
+    assert not worker.lock.held and worker.source == "shared" and worker.generation == loader.generation
+    assert expand_frame(worker.frame).equals(expand_frame(loader.frame))
+    assert worker.bodies.keys() == loader.bodies.keys()
+    assert all(bytes(worker.bodies[name][0]) == bytes(loader.bodies[name][0]) for name in worker.bodies)
+    # After a load the loader republishes and the worker switches to the new generation
+    assert not asyncio.run(worker.poll())
+    with engine.begin() as conn:
+        bump_watermark(conn)
+    previous = loader.generation
+    assert asyncio.run(loader.poll()) and loader.generation != previous
+    assert asyncio.run(worker.poll()) and worker.generation == loader.generation and worker.watermark == read_watermark()
+
+
+def test_dashboard_views_match_their_endpoints(client, statcast_db):
+    params = {"start_date": statcast_db[0].isoformat(), "end_date": statcast_db[-1].isoformat()}
+    dashboard = client.get("/dashboard", params={**params, "granularity": "day"}).json()
+    assert sorted(dashboard["views"]) == sorted(endpoints.DASHBOARD_VIEWS) and dashboard["rows_scanned"] > 0
+    standalone = {
+        "exit_velocity_distance": {"aggregate": "grid", "resolution": 60},
+        "pitch_vs_exit_velocity": {"aggregate": "grid", "resolution": 60},
+        "drag_vs_hr": {"granularity": "day"},
+        "drag_coefficient_stats": {"exact": True},
+    }
+    for view, extra in standalone.items():
+        expected = client.get(f"/{view}", params={**params, **extra}).json()
+        got = dashboard["views"][view]
+        assert got.keys() <= expected.keys(), view
+        for key, value in got.items():
+            # The one-scan sums may add up in another order, so compare floats to rounding
+            if key == "data":
+                pd.testing.assert_frame_equal(pd.DataFrame(value), pd.DataFrame(expected[key]), obj=view)
+            else:
+                assert value == pytest.approx(expected[key], rel=1e-12), (view, key)